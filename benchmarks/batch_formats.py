@@ -0,0 +1,56 @@
+"""
+Generation time and memory per row of one batch built by get_fake_data_for_insertion
+as pandas DataFrame and as pyarrow RecordBatch, plus time of encoding the batch into COPY CSV.
+
+Usage: python benchmarks/batch_formats.py [number_of_rows]
+"""
+import sys
+from time import perf_counter
+from datetime import datetime, date
+from fake_data_generator.columns_generator import get_columns_info_with_set_generators, get_fake_data_for_insertion
+from fake_data_generator.columns_generator.arrow_batches import BATCH_FORMATS
+from fake_data_generator.sources_formats.copy_loader import get_csv_for_copy
+
+NUMBER_OF_INTERVALS = 99
+
+
+def get_continuous_column_info_dict(data_type, low, high):
+    step = (high - low) / NUMBER_OF_INTERVALS
+    return {'type': 'CONTINUES',
+            'data_type': data_type,
+            'intervals': [(low + index * step, low + (index + 1) * step) for index in range(NUMBER_OF_INTERVALS)],
+            'probabilities': [1 / NUMBER_OF_INTERVALS] * NUMBER_OF_INTERVALS}
+
+
+RICH_COLUMNS_INFO_DICT = {
+    'amount': get_continuous_column_info_dict('decimal(19,2)', 0, 10 ** 6),
+    'counter': get_continuous_column_info_dict('bigint', 0, 10 ** 6),
+    'birthday': get_continuous_column_info_dict('date', date(1940, 1, 1).toordinal(), date(2020, 1, 1).toordinal()),
+    'created': get_continuous_column_info_dict('timestamp', datetime(2000, 1, 1).timestamp(), datetime(2023, 1, 1).timestamp()),
+    'passport': {'type': 'STRING_FROM_REGEX', 'data_type': 'varchar(11)', 'common_regex': '[0-9]{4}[ ][0-9]{6}'},
+    'gender': {'type': 'CATEGORICAL', 'data_type': 'varchar(1)', 'values': ['M', 'F', None], 'probabilities': [0.45, 0.45, 0.1]},
+}
+
+
+def get_memory_usage(batch):
+    if hasattr(batch, 'nbytes'):
+        return batch.nbytes
+    return batch.memory_usage(deep=True, index=False).sum()
+
+
+def main(number_of_rows):
+    print(f'{"format":<10}{"generation, rows/sec":>22}{"bytes/row":>12}{"csv encoding, rows/sec":>25}')
+    for batch_format in BATCH_FORMATS:
+        columns_info = get_columns_info_with_set_generators(RICH_COLUMNS_INFO_DICT, batch_format=batch_format)
+        start = perf_counter()
+        batch = get_fake_data_for_insertion(number_of_rows, columns_info, batch_format)
+        generation_time = perf_counter() - start
+        start = perf_counter()
+        get_csv_for_copy(batch)
+        encoding_time = perf_counter() - start
+        print(f'{batch_format:<10}{number_of_rows / generation_time:>22,.0f}{get_memory_usage(batch) / number_of_rows:>12.1f}'
+              f'{number_of_rows / encoding_time:>25,.0f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
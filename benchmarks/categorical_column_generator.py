@@ -0,0 +1,59 @@
+"""
+Rows/sec of get_generator_for_categorical_column for different numbers of categories and batch sizes,
+before (numpy choice with probabilities validated and cumulated on every batch) and after (alias table built once).
+Every case generates at most MAX_NUMBER_OF_BATCHES batches, time of building the alias table is included.
+
+Usage: python benchmarks/categorical_column_generator.py [number_of_rows]
+"""
+import sys
+from time import perf_counter
+from numpy.random import default_rng
+from pandas import Series
+from fake_data_generator.columns_generator.generators import get_generator_for_categorical_column
+from fake_data_generator.columns_generator.random_states import ColumnRandomState
+
+NUMBERS_OF_CATEGORIES = [2, 100, 10 ** 4, 10 ** 6]
+BATCH_SIZES = [100, 10 ** 5]
+MAX_NUMBER_OF_BATCHES = 100
+
+
+def get_values_and_probabilities(number_of_categories):
+    probabilities = 1 / default_rng(0).zipf(1.5, number_of_categories).astype(float)
+    return [f'value_{index}' for index in range(number_of_categories)], (probabilities / probabilities.sum()).tolist()
+
+
+def generate_with_choice(values, probabilities, number_of_batches, batch_size):
+    random_state = ColumnRandomState()
+    for _ in range(number_of_batches):
+        fake_series = Series(random_state.get_generator().choice(a=values, p=probabilities, size=batch_size, replace=True), dtype=object)
+        fake_series.where(fake_series.notna(), None)
+
+
+def generate_with_alias_table(values, probabilities, number_of_batches, batch_size):
+    generator = get_generator_for_categorical_column(values, probabilities)
+    next(generator)
+    for _ in range(number_of_batches):
+        generator.send(batch_size)
+
+
+def measure(func, *args):
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def main(number_of_rows):
+    print(f'{"categories":>12}{"batch size":>12}{"before, rows/sec":>20}{"after, rows/sec":>20}{"speedup":>10}')
+    for number_of_categories in NUMBERS_OF_CATEGORIES:
+        values, probabilities = get_values_and_probabilities(number_of_categories)
+        for batch_size in BATCH_SIZES:
+            number_of_batches = max(1, min(number_of_rows // batch_size, MAX_NUMBER_OF_BATCHES))
+            args = (values, probabilities, number_of_batches, batch_size)
+            number_of_rows_in_case = number_of_batches * batch_size
+            before = number_of_rows_in_case / measure(generate_with_choice, *args)
+            after = number_of_rows_in_case / measure(generate_with_alias_table, *args)
+            print(f'{number_of_categories:>12,}{batch_size:>12,}{before:>20,.0f}{after:>20,.0f}{after / before:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
@@ -0,0 +1,70 @@
+"""
+Rows/sec of get_generator_for_continuous_column for each of the CONVERTERS_FROM_FLOAT types,
+before (per-row random.uniform + python converter) and after (vectorized numpy engine).
+
+Usage: python benchmarks/continuous_column_generator.py [number_of_rows]
+"""
+import sys
+from time import perf_counter
+from datetime import datetime, date
+from decimal import Decimal
+from random import uniform
+from numpy.random import choice
+from pandas import Series
+from fake_data_generator.columns_generator.generators import get_generator_for_continuous_column
+
+PER_ROW_CONVERTERS_FROM_FLOAT = {
+    'int': lambda: int,
+    'decimal': lambda precision=0: (lambda x: Decimal(str(round(x, precision)))) if precision != 0 else (lambda x: Decimal(int(x))),
+    'date': lambda: lambda x: date.fromordinal(int(x)),
+    'datetime': lambda date_flag=False: (lambda x: datetime.fromtimestamp(x).replace(hour=0, minute=0, second=0, microsecond=0)) if date_flag else datetime.fromtimestamp,
+}
+
+CASES = [
+    ('int', (0, 10 ** 6), {}),
+    ('decimal', (0, 10 ** 6), {'precision': 2}),
+    ('decimal', (0, 10 ** 6), {'precision': 0}),
+    ('date', (date(1940, 1, 1).toordinal(), date(2020, 1, 1).toordinal()), {}),
+    ('datetime', (datetime(2000, 1, 1).timestamp(), datetime(2023, 1, 1).timestamp()), {}),
+    ('datetime', (datetime(2000, 1, 1).timestamp(), datetime(2023, 1, 1).timestamp()), {'date_flag': True}),
+]
+NUMBER_OF_INTERVALS = 99
+
+
+def get_intervals_and_probabilities(low, high):
+    step = (high - low) / NUMBER_OF_INTERVALS
+    intervals = [(low + index * step, low + (index + 1) * step) for index in range(NUMBER_OF_INTERVALS)]
+    return intervals, [1 / NUMBER_OF_INTERVALS] * NUMBER_OF_INTERVALS
+
+
+def generate_per_row(intervals, probabilities, output_data_type, params, output_size):
+    applied_func = PER_ROW_CONVERTERS_FROM_FLOAT[output_data_type](**params)
+    fake_sample = map(lambda interval_index: applied_func(uniform(intervals[interval_index][0], intervals[interval_index][1])),
+                      choice(a=len(intervals), size=output_size, p=probabilities, replace=True))
+    return Series(fake_sample)
+
+
+def generate_vectorized(intervals, probabilities, output_data_type, params, output_size):
+    generator = get_generator_for_continuous_column(intervals, probabilities, output_data_type, params)
+    next(generator)
+    return generator.send(output_size)
+
+
+def measure(func, *args):
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def main(number_of_rows):
+    print(f'{"type":<10}{"params":<22}{"before, rows/sec":>20}{"after, rows/sec":>20}{"speedup":>10}')
+    for output_data_type, (low, high), params in CASES:
+        intervals, probabilities = get_intervals_and_probabilities(low, high)
+        args = (intervals, probabilities, output_data_type, params, number_of_rows)
+        before = number_of_rows / measure(generate_per_row, *args)
+        after = number_of_rows / measure(generate_vectorized, *args)
+        print(f'{output_data_type:<10}{str(params):<22}{before:>20,.0f}{after:>20,.0f}{after / before:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6)
@@ -0,0 +1,101 @@
+"""
+Benchmark suite: rows/sec and peak memory of every generator type across batch sizes, cost of profiling functions
+against sample size, end-to-end generate_table_from_profile into SQLite, local Postgres and file sinks and import time of the package.
+Results are written as json, --compare prints ratios of rows/sec (of import time for import_time) to results of another run
+(for example, of previous version).
+
+Usage: python -m benchmarks.suite [--sections generators profiling end_to_end import_time] [--number-of-rows N] [--batch-sizes 100 10000]
+                                  [--sample-sizes 1000 100000] [--postgres-url URL] [--cases NAME ...]
+                                  [--output results.json] [--compare previous_results.json]
+"""
+import sys
+import json
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from importlib.metadata import version, PackageNotFoundError
+from loguru import logger
+from benchmarks.suite.generators import run_generator_benchmarks
+from benchmarks.suite.profiling import run_profiling_benchmarks
+from benchmarks.suite.end_to_end import run_end_to_end_benchmarks
+from benchmarks.suite.import_time import run_import_time_benchmarks
+
+SECTIONS = ['generators', 'profiling', 'end_to_end', 'import_time']
+DEPENDENCIES = ['numpy', 'pandas', 'pyarrow', 'sqlalchemy', 'faker']
+
+
+def get_version(package_name):
+    try:
+        return version(package_name)
+    except PackageNotFoundError:
+        return None
+
+
+def get_environment():
+    return {'fake_table_data_generator': get_version('fake_table_data_generator'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            **{package_name: get_version(package_name) for package_name in DEPENDENCIES}}
+
+
+def get_result_key(result):
+    return result['section'], result['case'], json.dumps(result['parameters'], sort_keys=True)
+
+
+def print_header():
+    print(f'{"section":<12}{"case":<42}{"parameters":<80}{"rows/sec":>14}{"seconds":>10}{"peak memory, MB":>17}{"vs previous":>13}')
+
+
+def print_result(result, previous_result=None):
+    ratio = ''
+    if previous_result is not None and previous_result['rows_per_second'] and result['rows_per_second']:
+        ratio = f'{result["rows_per_second"] / previous_result["rows_per_second"]:.2f}x'
+    elif previous_result is not None and result['rows_per_second'] is None and result['seconds'] > 0:
+        ratio = f'{previous_result["seconds"] / result["seconds"]:.2f}x'
+    print(f'{result["section"]:<12}{result["case"]:<42}{json.dumps(result["parameters"]):<80}'
+          f'{result["rows_per_second"] or 0:>14,.0f}{result["seconds"]:>10.3f}{result["peak_memory_bytes"] / 2 ** 20:>17.1f}{ratio:>13}',
+          flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of fake_data_generator')
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    parser.add_argument('--cases', nargs='+', default=None, help='names of generator, profiling or sink cases to run (all by default)')
+    parser.add_argument('--number-of-rows', type=int, default=10 ** 5)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 10 ** 4, 10 ** 5])
+    parser.add_argument('--sample-sizes', type=int, nargs='+', default=[10 ** 3, 10 ** 4, 10 ** 5])
+    parser.add_argument('--postgres-url', default=None, help='sqlalchemy URL of local Postgres, Postgres is skipped if not given')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help='json file with results of another run')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    key_to_previous_result = {}
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            key_to_previous_result = {get_result_key(result): result for result in json.load(file)['results']}
+
+    results = []
+    print_header()
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = {'generators': lambda: run_generator_benchmarks(args.number_of_rows, args.batch_sizes, args.cases),
+                      'profiling': lambda: run_profiling_benchmarks(args.sample_sizes, args.cases),
+                      'end_to_end': lambda: run_end_to_end_benchmarks(args.number_of_rows, args.batch_sizes, directory,
+                                                                      args.postgres_url, args.cases),
+                      'import_time': lambda: run_import_time_benchmarks(args.cases)}
+        for section in args.sections:
+            for result in benchmarks[section]():
+                print_result(result, key_to_previous_result.get(get_result_key(result)))
+                results.append(result)
+
+    with open(args.output, 'w') as file:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                   'environment': get_environment(),
+                   'arguments': vars(args),
+                   'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import sqlalchemy
+from decimal import Decimal
+from datetime import datetime, date
+from fake_data_generator.sources_formats import generate_table_from_profile, FileSink
+from fake_data_generator.sources_formats.file_sinks import FILE_FORMATS
+from fake_data_generator.sources_formats.profile_files import save_profile
+from benchmarks.suite.generators import get_continuous_column_info_dict, get_categorical_column_info_dict
+from benchmarks.suite.measurements import get_result
+
+PROFILE = {
+    'id': {'type': 'INCREMENTAL_ID', 'data_type': 'bigint'},
+    'gender': {'type': 'CATEGORICAL', 'data_type': 'varchar(1)', 'values': ['M', 'F', None], 'probabilities': [0.45, 0.45, 0.1]},
+    'city': get_categorical_column_info_dict(1000),
+    'amount': get_continuous_column_info_dict('decimal(19,2)', 0, 10 ** 6),
+    'birthday': get_continuous_column_info_dict('date', date(1940, 1, 1).toordinal(), date(2020, 1, 1).toordinal()),
+    'created': get_continuous_column_info_dict('timestamp', datetime(2000, 1, 1).timestamp(), datetime(2023, 1, 1).timestamp()),
+    'passport': {'type': 'STRING_FROM_REGEX', 'data_type': 'varchar(11)', 'common_regex': '[0-9]{4}[ ][0-9]{6}'},
+    'email': {'type': 'EMAIL', 'data_type': 'varchar', 'pool_size': 10 ** 4},
+}
+
+
+def get_sqlite_engine(directory):
+    sqlite3.register_adapter(Decimal, str)
+    return sqlalchemy.create_engine(f'sqlite:///{os.path.join(directory, "benchmark.db")}')
+
+
+def get_sinks(directory, postgres_url=None):
+    """
+    Returns (sink name, function creating conn, table name, parameters of generate_table_from_profile) for every destination:
+    SQLite database file, local Postgres (if postgres_url is given) with both insertion methods and every file format.
+    """
+    sinks = [('sqlite', lambda: get_sqlite_engine(directory), 'main.benchmark', {})]
+    if postgres_url is not None:
+        for insertion_method in ['insert', 'copy']:
+            sinks.append((f'postgres_{insertion_method}', lambda: sqlalchemy.create_engine(postgres_url), 'public.fdg_benchmark',
+                          {'insertion_method': insertion_method}))
+    for file_format in FILE_FORMATS:
+        sinks.append((f'file_{file_format}', lambda file_format=file_format: FileSink(os.path.join(directory, file_format), file_format),
+                      'main.benchmark', {}))
+    return sinks
+
+
+def run_end_to_end_benchmarks(number_of_rows, batch_sizes, directory, postgres_url=None, case_names=None,
+                              batch_formats=('pandas', 'arrow')):
+    """
+    Yields rows/sec and peak memory of generate_table_from_profile from binary profile into every sink.
+    Tables are dropped before every run, so runs do not depend on each other.
+    """
+    profile_path = os.path.join(directory, 'benchmark_profile.arrow')
+    save_profile(PROFILE, profile_path)
+    for sink_name, get_conn, dest_table_name_with_schema, parameters in get_sinks(directory, postgres_url):
+        if case_names is not None and sink_name not in case_names:
+            continue
+        for batch_format in batch_formats:
+            for batch_size in batch_sizes:
+                def generate_table():
+                    conn = get_conn()
+                    if isinstance(conn, sqlalchemy.engine.base.Engine):
+                        with conn.begin() as connection:
+                            connection.execute(sqlalchemy.text(f'DROP TABLE IF EXISTS {dest_table_name_with_schema}'))
+                    generate_table_from_profile(conn, dest_table_name_with_schema, number_of_rows, profile_path,
+                                                batch_size=batch_size, batch_format=batch_format, seed=0, **parameters)
+                    if isinstance(conn, sqlalchemy.engine.base.Engine):
+                        conn.dispose()
+
+                yield get_result('end_to_end', sink_name, {'batch_size': batch_size, 'batch_format': batch_format, **parameters},
+                                 number_of_rows, generate_table)
+
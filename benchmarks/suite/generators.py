@@ -0,0 +1,86 @@
+import sqlalchemy
+from datetime import datetime, date
+from numpy import arange
+from fake_data_generator.columns_generator import get_columns_info_with_set_generators, get_fake_data_for_insertion
+from fake_data_generator.columns_generator.arrow_batches import BATCH_FORMATS
+from fake_data_generator.columns_generator.random_states import RandomState
+from benchmarks.suite.measurements import get_result
+
+NUMBER_OF_INTERVALS = 99
+NUMBER_OF_FOREIGN_KEYS = 10 ** 5
+
+
+def get_continuous_column_info_dict(data_type, low, high):
+    step = (high - low) / NUMBER_OF_INTERVALS
+    return {'type': 'CONTINUES',
+            'data_type': data_type,
+            'intervals': [(low + index * step, low + (index + 1) * step) for index in range(NUMBER_OF_INTERVALS)],
+            'probabilities': [1 / NUMBER_OF_INTERVALS] * NUMBER_OF_INTERVALS}
+
+
+def get_categorical_column_info_dict(number_of_values):
+    return {'type': 'CATEGORICAL',
+            'data_type': 'varchar',
+            'values': [f'value_{index}' for index in range(number_of_values)],
+            'probabilities': [1 / number_of_values] * number_of_values}
+
+
+GENERATOR_CASES = {
+    'categorical_10': {'col': get_categorical_column_info_dict(10)},
+    'categorical_100000': {'col': get_categorical_column_info_dict(10 ** 5)},
+    'continuous_int': {'col': get_continuous_column_info_dict('bigint', 0, 10 ** 6)},
+    'continuous_decimal': {'col': get_continuous_column_info_dict('decimal(19,2)', 0, 10 ** 6)},
+    'continuous_date': {'col': get_continuous_column_info_dict('date', date(1940, 1, 1).toordinal(), date(2020, 1, 1).toordinal())},
+    'continuous_timestamp': {'col': get_continuous_column_info_dict('timestamp', datetime(2000, 1, 1).timestamp(),
+                                                                    datetime(2023, 1, 1).timestamp())},
+    'string_from_regex_fixed_length': {'col': {'type': 'STRING_FROM_REGEX', 'data_type': 'varchar(11)',
+                                               'common_regex': '[0-9]{4}[ ][0-9]{6}'}},
+    'string_from_regex_variable_length': {'col': {'type': 'STRING_FROM_REGEX', 'data_type': 'varchar',
+                                                  'common_regex': '[a-z]{3,10}[0-9]*'}},
+    'current_timestamp': {'col': {'type': 'CURRENT_TIMESTAMP', 'data_type': 'timestamp'}},
+    'fio_in_upper_case': {'col': {'type': 'FIO_IN_UPPER_CASE', 'data_type': 'varchar'}},
+    'fio_only_starting_with_upper_case': {'col': {'type': 'FIO_ONLY_STARTING_WITH_UPPER_CASE', 'data_type': 'varchar'}},
+    'fio_only_starting_with_upper_case_pool': {'col': {'type': 'FIO_ONLY_STARTING_WITH_UPPER_CASE', 'data_type': 'varchar',
+                                                       'pool_size': 10 ** 4}},
+    'email': {'col': {'type': 'EMAIL', 'data_type': 'varchar'}},
+    'email_pool': {'col': {'type': 'EMAIL', 'data_type': 'varchar', 'pool_size': 10 ** 4}},
+    'incremental_id': {'col': {'type': 'INCREMENTAL_ID', 'data_type': 'bigint'}},
+    'foreign_key_uniform': {'col': {'type': 'FOREIGN_KEY', 'data_type': 'bigint',
+                                    'foreign_key_table_name': 'main.parent', 'foreign_key_column_name': 'id'}},
+    'foreign_key_observed': {'col': {'type': 'FOREIGN_KEY', 'data_type': 'bigint', 'distribution': 'observed',
+                                     'foreign_key_table_name': 'main.parent', 'foreign_key_column_name': 'id',
+                                     'fan_out_values': [0, 1, 10], 'fan_out_probabilities': [0.5, 0.4, 0.1]}},
+    'joint_3_columns': {'col_a': {'type': 'JOINT', 'data_type': 'varchar', 'columns': ['col_a', 'col_b', 'col_c'],
+                                  'dimensions': [{'values': ['M', 'F']}, {'intervals': [[150, 170], [170, 190]]},
+                                                 {'intervals': [[40, 70], [70, 100]]}],
+                                  'cells': [[0, 0, 0], [0, 1, 1], [1, 0, 0], [1, 1, 1]],
+                                  'probabilities': [0.2, 0.3, 0.35, 0.15]},
+                        'col_b': {'type': 'JOINT', 'data_type': 'decimal(5,2)', 'joint_column_name': 'col_a'},
+                        'col_c': {'type': 'JOINT', 'data_type': 'decimal(5,2)', 'joint_column_name': 'col_a'}},
+}
+
+
+def generate_batches(columns_info_with_set_generators, number_of_batches, batch_size, batch_format):
+    for _ in range(number_of_batches):
+        get_fake_data_for_insertion(batch_size, columns_info_with_set_generators, batch_format)
+
+
+def run_generator_benchmarks(number_of_rows, batch_sizes, case_names=None):
+    """
+    Yields rows/sec and peak memory of every generator type for every batch size and batch format,
+    each case generates number_of_rows rows (at least one batch). Foreign keys are taken from memory, not from a table.
+    """
+    conn = sqlalchemy.create_engine('sqlite://')
+    provided_foreign_keys = {('main.parent', 'id'): arange(NUMBER_OF_FOREIGN_KEYS)}
+    for case_name, rich_columns_info_dict in GENERATOR_CASES.items():
+        if case_names is not None and case_name not in case_names:
+            continue
+        for batch_format in BATCH_FORMATS:
+            for batch_size in batch_sizes:
+                columns_info_with_set_generators = get_columns_info_with_set_generators(rich_columns_info_dict, conn, 'main.benchmark',
+                                                                                       batch_format, RandomState(0), provided_foreign_keys)
+                number_of_batches = max(1, number_of_rows // batch_size)
+                yield get_result('generators', case_name, {'batch_size': batch_size, 'batch_format': batch_format},
+                                 number_of_batches * batch_size, generate_batches,
+                                 columns_info_with_set_generators, number_of_batches, batch_size, batch_format)
+
@@ -0,0 +1,48 @@
+import sys
+import json
+import subprocess
+from statistics import median
+
+NUMBER_OF_RUNS = 5
+IMPORT_TIME_CASES = ['fake_data_generator', 'fake_data_generator.columns_generator', 'fake_data_generator.cli']
+LAZY_DEPENDENCIES = ['pyspark', 'scipy', 'sqlalchemy', 'faker', 'rstr']
+IMPORT_SCRIPT = '''
+import sys, json, resource
+from time import perf_counter
+start = perf_counter()
+import {module_name}
+seconds = perf_counter() - start
+print(json.dumps({{'seconds': seconds,
+                  'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                  'number_of_modules': len(sys.modules),
+                  'imported_dependencies': [name for name in {lazy_dependencies} if name in sys.modules]}}))
+'''
+
+
+def measure_import(module_name):
+    """
+    Imports module in a fresh interpreter, so that time does not depend on modules imported by the benchmark itself.
+    """
+    output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(module_name=module_name, lazy_dependencies=LAZY_DEPENDENCIES)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_import_time_benchmarks(case_names=None, number_of_runs=NUMBER_OF_RUNS):
+    """
+    Yields median time of importing modules of the package in a fresh interpreter, peak memory of the interpreter
+    and heavy dependencies which were imported (they are expected to be imported only when they are used).
+    """
+    for module_name in IMPORT_TIME_CASES:
+        if case_names is not None and module_name not in case_names:
+            continue
+        measurements = [measure_import(module_name) for _ in range(number_of_runs)]
+        yield {'section': 'import_time',
+               'case': module_name,
+               'parameters': {'number_of_runs': number_of_runs},
+               'number_of_rows': None,
+               'seconds': median(measurement['seconds'] for measurement in measurements),
+               'rows_per_second': None,
+               'peak_memory_bytes': max(measurement['max_rss_bytes'] for measurement in measurements),
+               'number_of_modules': measurements[-1]['number_of_modules'],
+               'imported_dependencies': measurements[-1]['imported_dependencies']}
@@ -0,0 +1,34 @@
+import gc
+import tracemalloc
+from time import perf_counter
+
+
+def measure_time(func, *args):
+    gc.collect()
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def measure_peak_memory(func, *args):
+    """
+    Peak of memory allocated by python objects and numpy arrays while func runs (pyarrow buffers are not traced).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def get_result(section, case, parameters, number_of_rows, func, *args):
+    seconds = measure_time(func, *args)
+    return {'section': section,
+            'case': case,
+            'parameters': parameters,
+            'number_of_rows': number_of_rows,
+            'seconds': seconds,
+            'rows_per_second': number_of_rows / seconds if seconds > 0 else None,
+            'peak_memory_bytes': measure_peak_memory(func, *args)}
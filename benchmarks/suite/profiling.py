@@ -0,0 +1,72 @@
+import pandas as pd
+from datetime import datetime, timedelta
+from numpy.random import default_rng
+from fake_data_generator.columns_generator.accumulators import ColumnAccumulator
+from fake_data_generator.columns_generator.info_for_columns import \
+    get_info_for_categorical_column, get_info_for_continuous_column, get_info_for_string_column, get_string_class_matchings
+from fake_data_generator.columns_generator.rich_info import get_string_column_class
+from fake_data_generator.sources_formats.helper_functions import get_correct_column_values
+from benchmarks.suite.measurements import get_result
+
+NUMBER_OF_INTERVALS = 20
+DEFAULT_NUMBER_OF_INTERVALS = 99
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов']
+FIRST_NAMES = ['Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Артем', 'Илья']
+MIDDLE_NAMES = ['Александрович', 'Дмитриевич', 'Сергеевич', 'Андреевич', 'Алексеевич', 'Ильич']
+EMAIL_DOMAINS = ['example.com', 'example.org', 'mail.ru', 'yandex.ru']
+
+
+def get_sample(sample_size):
+    generator = default_rng(0)
+    return pd.DataFrame({
+        'gender': generator.choice(['M', 'F', None], size=sample_size, p=[0.45, 0.45, 0.1]),
+        'amount': generator.lognormal(8, 1, size=sample_size).round(2),
+        'created': pd.Series([datetime(2000, 1, 1) + timedelta(seconds=int(seconds))
+                              for seconds in generator.integers(0, 23 * 365 * 86400, size=sample_size)]),
+        'passport': pd.Series([f'{first:04d} {second:06d}' for first, second in zip(generator.integers(0, 10 ** 4, size=sample_size),
+                                                                                     generator.integers(0, 10 ** 6, size=sample_size))]),
+        'fio': pd.Series([f'{last_name} {first_name} {middle_name}' for last_name, first_name, middle_name in
+                          zip(generator.choice(LAST_NAMES, size=sample_size), generator.choice(FIRST_NAMES, size=sample_size),
+                              generator.choice(MIDDLE_NAMES, size=sample_size))]),
+        'email': pd.Series([f'user{number}@{domain}' for number, domain in zip(generator.integers(0, sample_size, size=sample_size),
+                                                                               generator.choice(EMAIL_DOMAINS, size=sample_size))]),
+    })
+
+
+def update_accumulator(column_values, data_type):
+    accumulator = ColumnAccumulator(data_type)
+    accumulator.update(column_values)
+    return accumulator
+
+
+PROFILING_CASES = {
+    'get_info_for_categorical_column': lambda sample: get_info_for_categorical_column(sample['gender']),
+    'get_info_for_continuous_column_float': lambda sample: get_info_for_continuous_column(sample['amount'], 'float', NUMBER_OF_INTERVALS),
+    'get_info_for_continuous_99_intervals': lambda sample: get_info_for_continuous_column(sample['amount'], 'float',
+                                                                                                DEFAULT_NUMBER_OF_INTERVALS),
+    'get_info_for_continuous_column_datetime': lambda sample: get_info_for_continuous_column(sample['created'], 'datetime',
+                                                                                            NUMBER_OF_INTERVALS),
+    'get_info_for_string_column': lambda sample: get_info_for_string_column(sample['passport']),
+    'get_string_class_matchings': lambda sample: get_string_class_matchings(sample['passport'].tolist()),
+    'column_accumulator_categorical': lambda sample: update_accumulator(sample['gender'], 'varchar(1)'),
+    'column_accumulator_continuous': lambda sample: update_accumulator(sample['amount'], 'decimal(19,2)').continuous.
+                                                    get_intervals_and_probabilities(NUMBER_OF_INTERVALS),
+    'column_accumulator_string': lambda sample: update_accumulator(sample['passport'], 'varchar(11)').string.get_common_regex(),
+    'column_accumulator_email': lambda sample: update_accumulator(sample['email'], 'varchar').string.string_class_matchings,
+    'get_string_column_class_fio': lambda sample: get_string_column_class(sample['fio']),
+    'get_string_column_class_passport': lambda sample: get_string_column_class(sample['passport']),
+    'get_correct_column_values_timestamp': lambda sample: get_correct_column_values(sample['created'], 'timestamp'),
+}
+
+
+def run_profiling_benchmarks(sample_sizes, case_names=None):
+    """
+    Yields time and peak memory of profiling functions (get_info_for_* and accumulators used by generate_table_profile)
+    for samples of different sizes, rows/sec is the number of sampled rows processed per second.
+    """
+    for sample_size in sample_sizes:
+        sample = get_sample(sample_size)
+        for case_name, profiling_func in PROFILING_CASES.items():
+            if case_names is not None and case_name not in case_names:
+                continue
+            yield get_result('profiling', case_name, {'sample_size': sample_size}, sample_size, profiling_func, sample)
@@ -1,10 +1,6 @@
-import sys
-from loguru import logger
 from fake_data_generator.columns_generator import \
     Column, CategoricalColumn, ContinuousColumn, StringFromRegexColumn, CurrentTimestampColumn, \
-    ForeignKeyColumn, IncrementalIDColumn, MultipleColumns
+    FioInUpperCaseColumn, FioOnlyStartingWithUpperCaseColumn, EmailColumn, \
+    ForeignKeyColumn, IncrementalIDColumn, MultipleColumns, JointColumns
 from fake_data_generator.sources_formats import \
-    generate_fake_table, generate_table_profile, generate_table_from_profile
-
-logger.remove(0)
-logger.add(sys.stdout, format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>{message}</cyan>")
+    generate_fake_table, generate_table_profile, generate_table_from_profile, generate_tables_from_profiles, FileSink, GenerationMetrics
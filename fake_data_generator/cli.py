@@ -0,0 +1,90 @@
+"""
+Console entry point running profiling and generation jobs from json config, so that several tables are processed
+by one process paying interpreter and import overhead once.
+
+Usage: fake_data_generator config.json [--jobs NAME ...] [--log-level INFO]
+"""
+import sys
+import json
+import argparse
+from time import perf_counter
+from loguru import logger
+
+LOG_FORMAT = '<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>{message}</cyan>'
+JOB_FUNCTION_NAMES = ['generate_table_profile', 'generate_fake_table', 'generate_table_from_profile', 'generate_tables_from_profiles']
+FUNCTION_NAMES_WITH_METRICS = ['generate_fake_table', 'generate_table_from_profile', 'generate_tables_from_profiles']
+
+
+def configure_logger(level='INFO'):
+    logger.remove()
+    logger.add(sys.stdout, format=LOG_FORMAT, level=level)
+
+
+def get_conn(conn_config):
+    """
+    conn_config is sqlalchemy URL, 'spark' for Spark session with Hive support or dict of FileSink parameters.
+    """
+    if conn_config is None:
+        return None
+    if isinstance(conn_config, dict):
+        from fake_data_generator.sources_formats.file_sinks import FileSink
+        return FileSink(**conn_config)
+    if conn_config == 'spark':
+        from pyspark.sql import SparkSession
+        return SparkSession.builder.enableHiveSupport().getOrCreate()
+    from sqlalchemy import create_engine
+    return create_engine(conn_config)
+
+
+def run_job(job, default_conn_config=None, metrics=None):
+    """
+    job is dict with name of the function (function), optional conn (by default conn of config)
+    and optional job name (name), the rest of keys are passed to the function as parameters.
+    """
+    job_parameters = {key: value for key, value in job.items() if key not in ['function', 'conn', 'name']}
+    if job.get('function') not in JOB_FUNCTION_NAMES:
+        raise ValueError(f'Function of job must be one of {JOB_FUNCTION_NAMES}, got {job.get("function")}')
+    from fake_data_generator import sources_formats
+    if metrics is not None and job['function'] in FUNCTION_NAMES_WITH_METRICS:
+        job_parameters['metrics'] = metrics
+    conn = get_conn(job.get('conn', default_conn_config))
+    try:
+        getattr(sources_formats, job['function'])(conn=conn, **job_parameters)
+    finally:
+        if hasattr(conn, 'dispose'):
+            conn.dispose()
+
+
+def run_config(config, job_names=None):
+    """
+    Runs jobs of config one by one. config is dict with list of jobs, optional conn used by jobs without their own conn
+    and optional prometheus_file_path for GenerationMetrics of all generation jobs.
+    """
+    metrics = None
+    if config.get('prometheus_file_path') is not None:
+        from fake_data_generator.sources_formats.metrics import GenerationMetrics
+        metrics = GenerationMetrics(prometheus_file_path=config['prometheus_file_path'])
+    jobs = [job for job in config['jobs'] if job_names is None or job.get('name') in job_names]
+    for job_index, job in enumerate(jobs):
+        job_name = job.get('name', job['function'])
+        logger.info(f'Start job {job_name} ({job_index + 1} of {len(jobs)}).')
+        start_time = perf_counter()
+        run_job(job, config.get('conn'), metrics)
+        logger.info(f'Job {job_name} was finished in {perf_counter() - start_time:.3f}s.')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='fake_data_generator', description='Runs profiling and generation jobs from json config')
+    parser.add_argument('config_path', help='json file with conn, jobs and optional prometheus_file_path')
+    parser.add_argument('--jobs', nargs='+', default=None, help='names of jobs to run (all by default)')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+
+    configure_logger(args.log_level)
+    with open(args.config_path, 'r') as file:
+        config = json.load(file)
+    run_config(config, args.jobs)
+
+
+if __name__ == '__main__':
+    main()
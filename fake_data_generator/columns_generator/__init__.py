@@ -1,7 +1,8 @@
 from fake_data_generator.columns_generator.column import \
     Column, CategoricalColumn, ContinuousColumn, StringFromRegexColumn, CurrentTimestampColumn, \
-    ForeignKeyColumn, IncrementalIDColumn, MultipleColumns
+    FioInUpperCaseColumn, FioOnlyStartingWithUpperCaseColumn, EmailColumn, \
+    ForeignKeyColumn, IncrementalIDColumn, MultipleColumns, JointColumns
 from fake_data_generator.columns_generator.rich_info import \
-    get_rich_column_info, get_columns_info_with_set_generators
+    get_rich_column_info, get_rich_joint_columns_info, get_columns_info_with_set_generators
 from fake_data_generator.columns_generator.get_fake_data_for_insertion import \
     get_fake_data_for_insertion
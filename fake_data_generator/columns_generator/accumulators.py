@@ -0,0 +1,386 @@
+import math
+from numpy import arange, bincount, concatenate, floor, full, generic, int64, isnan, nan, uint64, union1d, unique, where, zeros
+from pandas import DataFrame, Series, Index, concat, factorize
+from pandas.util import hash_array
+from fake_data_generator.columns_generator.info_for_columns import \
+    get_input_data_type, get_float_values_without_null, get_correct_categorical_values, \
+    get_info_for_binned_continuous_column, update_common_pattern, merge_common_patterns, get_common_regex, \
+    get_string_class_matchings, is_string_class_decided
+
+DEFAULT_MAX_NUMBER_OF_CATEGORIES = 100000
+DEFAULT_NUMBER_OF_BINS = 2048
+DEFAULT_NUMBER_OF_JOINT_BINS = 256
+
+
+def get_value_hashes(values):
+    """
+    64-bit hashes of Index of distinct values. Integral floats are hashed as ints, since chunks of integer column with nulls are floats.
+    """
+    values = values.to_numpy()
+    if values.dtype.kind == 'f' and len(values) != 0 and (values == floor(values)).all() and abs(values).max() < 2 ** 63:
+        values = values.astype(int64)
+    return hash_array(values, categorize=False)
+
+
+class CategoricalAccumulator:
+    """
+    Frequency sketch of at most max_number_of_values most frequent values.
+    When there are more distinct values, values with counts not larger than the count of the first value not fitting into sketch
+    are dropped. Counts of kept values are not decreased, so probabilities are normalized among kept values
+    (counts of values dropped earlier and seen again miss their earlier occurrences).
+    If stop_on_overflow is set, counts are dropped completely on overflow, since column is not categorical anyway.
+    The number of unique values is counted exactly by hashes of values whether counts are dropped or not,
+    hashes of chunks are deduplicated once they outnumber already deduplicated ones.
+    """
+    def __init__(self, max_number_of_values: int = DEFAULT_MAX_NUMBER_OF_CATEGORIES, stop_on_overflow: bool = True):
+        self.max_number_of_values = max_number_of_values
+        self.stop_on_overflow = stop_on_overflow
+        self.value_counts = Series(dtype=float)
+        self.number_of_values = 0
+        self.number_of_nulls = 0
+        self.is_overflowed = False
+        self.value_hashes = zeros(0, dtype=uint64)
+        self.new_value_hashes = []
+        self.number_of_unhashed_unique_values = 0
+
+    def update(self, column_values):
+        column_values_without_null = column_values.dropna()
+        value_counts = column_values_without_null.value_counts()
+        self.add_value_counts(value_counts=value_counts,
+                              number_of_values=len(column_values_without_null),
+                              number_of_nulls=len(column_values) - len(column_values_without_null),
+                              value_hashes=get_value_hashes(value_counts.index))
+
+    def add_value_counts(self, value_counts, number_of_values, number_of_nulls=0, is_overflowed=False,
+                         value_hashes=None, number_of_unique_values=None):
+        """
+        value_hashes are hashes of all distinct added values including ones not present in value_counts,
+        if they are not given (e.g. for Spark aggregations), number_of_unique_values is added to the number of unique values.
+        """
+        self.number_of_values += number_of_values
+        self.number_of_nulls += number_of_nulls
+        self.is_overflowed = self.is_overflowed or is_overflowed
+        if value_hashes is not None:
+            self.add_value_hashes(value_hashes)
+        else:
+            self.number_of_unhashed_unique_values += number_of_unique_values if number_of_unique_values is not None else len(value_counts)
+        if not (self.is_overflowed and self.stop_on_overflow):
+            if self.value_counts.empty:
+                self.value_counts = value_counts.astype(float)
+            else:
+                self.value_counts = self.value_counts.add(value_counts, fill_value=0)
+            if len(self.value_counts) > self.max_number_of_values:
+                threshold = self.value_counts.nlargest(self.max_number_of_values + 1).iloc[-1]
+                self.value_counts = self.value_counts[self.value_counts > threshold]
+                self.is_overflowed = True
+        if self.is_overflowed and self.stop_on_overflow:
+            self.value_counts = Series(dtype=float)
+
+    def add_value_hashes(self, value_hashes):
+        self.new_value_hashes.append(value_hashes)
+        if sum(len(new_value_hashes) for new_value_hashes in self.new_value_hashes) > len(self.value_hashes):
+            self.deduplicate_value_hashes()
+
+    def deduplicate_value_hashes(self):
+        if self.new_value_hashes:
+            self.value_hashes = unique(concatenate([self.value_hashes] + self.new_value_hashes))
+            self.new_value_hashes = []
+
+    def merge(self, other):
+        self.add_value_counts(other.value_counts, other.number_of_values, other.number_of_nulls, other.is_overflowed,
+                              concatenate([other.value_hashes] + other.new_value_hashes), other.number_of_unhashed_unique_values)
+
+    def get_number_of_unique_values(self):
+        if not self.is_overflowed:
+            return len(self.value_counts)
+        self.deduplicate_value_hashes()
+        return len(self.value_hashes) + self.number_of_unhashed_unique_values
+
+    def get_values_and_probabilities(self):
+        value_counts = self.value_counts
+        if self.number_of_nulls > 0:
+            value_counts = Series(value_counts.to_list() + [float(self.number_of_nulls)],
+                                  index=Index(value_counts.index.to_list() + [None], dtype=object))
+        value_counts = value_counts.sort_values(ascending=False, kind='stable')
+        values = get_correct_categorical_values(value_counts.index.tolist())
+        probabilities = (value_counts / value_counts.sum()).to_list()
+        return values, probabilities
+
+
+def get_bin_width_exponent(min_value, max_value, number_of_bins):
+    span = max_value - min_value
+    if span == 0:
+        span = max(abs(max_value), 1.0)
+    return math.ceil(math.log2(span / (number_of_bins - 2)))
+
+
+def coarsen_bins(first_bin_index, bin_counts, number_of_halvings):
+    if number_of_halvings == 0:
+        return first_bin_index, bin_counts
+    factor = 2 ** number_of_halvings
+    new_first_bin_index = first_bin_index // factor
+    new_bin_indices = (first_bin_index + arange(len(bin_counts))) // factor - new_first_bin_index
+    return new_first_bin_index, bincount(new_bin_indices, weights=bin_counts)
+
+
+class ContinuousAccumulator:
+    """
+    Streaming histogram of at most number_of_bins bins of width 2 ** bin_width_exponent aligned to zero.
+    Histograms of different widths are merged by halving the number of bins of the finer one
+    (adjacent bins are always merged into one bin of the coarser histogram), so merge is associative and exact.
+    """
+    def __init__(self, number_of_bins: int = DEFAULT_NUMBER_OF_BINS):
+        self.number_of_bins = number_of_bins
+        self.bin_width_exponent = None
+        self.first_bin_index = None
+        self.bin_counts = None
+        self.number_of_values = 0
+        self.min_value = math.inf
+        self.max_value = -math.inf
+
+    def update(self, float_values):
+        if len(float_values) == 0:
+            return
+        min_value, max_value = float_values.min(), float_values.max()
+        bin_width_exponent = get_bin_width_exponent(min_value, max_value, self.number_of_bins)
+        bin_indices = floor(float_values / 2.0 ** bin_width_exponent).astype(int64)
+        first_bin_index = int(bin_indices.min())
+        self.add_histogram(bin_width_exponent=bin_width_exponent,
+                           first_bin_index=first_bin_index,
+                           bin_counts=bincount(bin_indices - first_bin_index).astype(float),
+                           min_value=min_value,
+                           max_value=max_value)
+
+    def add_histogram(self, bin_width_exponent, first_bin_index, bin_counts, min_value, max_value):
+        number_of_values = bin_counts.sum()
+        if number_of_values == 0:
+            return
+        if self.number_of_values == 0:
+            self.bin_width_exponent, self.first_bin_index, self.bin_counts = bin_width_exponent, first_bin_index, bin_counts
+        else:
+            common_bin_width_exponent = max(self.bin_width_exponent, bin_width_exponent)
+            histograms = [coarsen_bins(self.first_bin_index, self.bin_counts, common_bin_width_exponent - self.bin_width_exponent),
+                          coarsen_bins(first_bin_index, bin_counts, common_bin_width_exponent - bin_width_exponent)]
+            new_first_bin_index = min(histogram[0] for histogram in histograms)
+            new_last_bin_index = max(histogram[0] + len(histogram[1]) - 1 for histogram in histograms)
+            number_of_halvings = 0
+            while (new_last_bin_index >> number_of_halvings) - (new_first_bin_index >> number_of_halvings) + 1 > self.number_of_bins:
+                number_of_halvings += 1
+            histograms = [coarsen_bins(*histogram, number_of_halvings) for histogram in histograms]
+            new_first_bin_index >>= number_of_halvings
+            new_last_bin_index >>= number_of_halvings
+            new_bin_counts = zeros(new_last_bin_index - new_first_bin_index + 1)
+            for histogram_first_bin_index, histogram_bin_counts in histograms:
+                offset = histogram_first_bin_index - new_first_bin_index
+                new_bin_counts[offset:offset + len(histogram_bin_counts)] += histogram_bin_counts
+            self.bin_width_exponent = common_bin_width_exponent + number_of_halvings
+            self.first_bin_index, self.bin_counts = new_first_bin_index, new_bin_counts
+        self.number_of_values += number_of_values
+        self.min_value = min(self.min_value, min_value)
+        self.max_value = max(self.max_value, max_value)
+
+    def merge(self, other):
+        if other.number_of_values != 0:
+            self.add_histogram(other.bin_width_exponent, other.first_bin_index, other.bin_counts, other.min_value, other.max_value)
+
+    def get_intervals_and_probabilities(self, number_of_intervals: int):
+        bin_width = 2.0 ** self.bin_width_exponent
+        bin_centers = (self.first_bin_index + arange(len(self.bin_counts)) + 0.5) * bin_width
+        bin_centers = bin_centers.clip(self.min_value, self.max_value)
+        return get_info_for_binned_continuous_column(bin_centers, self.bin_counts, self.min_value, self.max_value,
+                                                     number_of_intervals)
+
+
+class StringAccumulator:
+    """
+    Incremental per-position character classes merger and counter of strings matching FIO and email regexes.
+    If max_number_of_strings (upper bound of the number of strings of all updates, e.g. sample size) is given,
+    regexes stop being matched as soon as the class of strings is decided (see is_string_class_decided).
+    """
+    def __init__(self, max_number_of_strings: int = None):
+        self.common_pattern = {}
+        self.string_class_matchings = [0, 0, 0]
+        self.number_of_strings = 0
+        self.max_number_of_strings = max_number_of_strings
+
+    def update(self, strings):
+        string_counts = strings.dropna().value_counts()
+        number_of_strings = int(string_counts.sum())
+        update_common_pattern(self.common_pattern, string_counts.index)
+
+        def is_decided(string_class_matchings, number_of_evaluated_classes, number_of_strings_left):
+            return is_string_class_decided(
+                [matchings + other_matchings for matchings, other_matchings in zip(self.string_class_matchings, string_class_matchings)],
+                number_of_evaluated_classes, number_of_strings_left, self.number_of_strings + number_of_strings, self.max_number_of_strings)
+        self.add_string_class_matchings(get_string_class_matchings(string_counts.index, string_counts.to_numpy(),
+                                                                   is_decided if self.max_number_of_strings is not None else None),
+                                        number_of_strings)
+
+    def add_string_class_matchings(self, string_class_matchings, number_of_strings):
+        self.string_class_matchings = [matchings + other_matchings for matchings, other_matchings
+                                       in zip(self.string_class_matchings, string_class_matchings)]
+        self.number_of_strings += number_of_strings
+
+    def merge(self, other):
+        merge_common_patterns(self.common_pattern, other.common_pattern)
+        self.add_string_class_matchings(other.string_class_matchings, other.number_of_strings)
+
+    def get_common_regex(self):
+        return get_common_regex(self.common_pattern)
+
+
+class ColumnAccumulator:
+    """
+    Single-pass mergeable profile of column: values are fed in chunks with update()
+    and partial profiles of several chunks, workers or partitions are combined with merge().
+    """
+    def __init__(self,
+                 column_data_type: str,
+                 max_number_of_categories: int = DEFAULT_MAX_NUMBER_OF_CATEGORIES,
+                 number_of_bins: int = DEFAULT_NUMBER_OF_BINS,
+                 stop_on_overflow: bool = True,
+                 max_number_of_strings: int = None):
+        self.input_data_type = get_input_data_type(column_data_type)
+        self.categorical = CategoricalAccumulator(max_number_of_categories, stop_on_overflow)
+        self.continuous = ContinuousAccumulator(number_of_bins) if self.input_data_type is not None else None
+        self.string = StringAccumulator(max_number_of_strings) if column_data_type == 'string' or 'varchar' in column_data_type else None
+
+    def update(self, column_values):
+        self.categorical.update(column_values)
+        if self.continuous is not None:
+            self.continuous.update(get_float_values_without_null(column_values, self.input_data_type))
+        if self.string is not None:
+            self.string.update(column_values)
+        return self
+
+    def merge(self, other):
+        self.categorical.merge(other.categorical)
+        if self.continuous is not None:
+            self.continuous.merge(other.continuous)
+        if self.string is not None:
+            self.string.merge(other.string)
+        return self
+
+    def get_number_of_unique_values(self):
+        return self.categorical.get_number_of_unique_values()
+
+    def get_number_of_values(self):
+        return self.categorical.number_of_values
+
+
+def get_joint_bin_keys(keys, bin_width_exponent, new_bin_width_exponent):
+    if bin_width_exponent is None:
+        return floor(keys / 2.0 ** new_bin_width_exponent)
+    return floor(keys / 2.0 ** (new_bin_width_exponent - bin_width_exponent))
+
+
+class JointAccumulator:
+    """
+    Streaming joint histogram of a group of columns: counts of combinations of values of the columns (nulls included).
+    Numeric column keeps exact values while it has at most number_of_bins distinct values, after that its values are replaced
+    with indices of bins of width 2 ** bin_width_exponent aligned to zero, which are only merged later, as in ContinuousAccumulator.
+    Other columns keep exact values, so they should have few distinct values.
+    """
+    def __init__(self,
+                 column_names: list,
+                 column_data_types: list,
+                 number_of_bins: int = DEFAULT_NUMBER_OF_JOINT_BINS):
+        self.column_names = column_names
+        self.input_data_types = [get_input_data_type(column_data_type) for column_data_type in column_data_types]
+        self.number_of_bins = number_of_bins
+        self.bin_width_exponents = [None] * len(column_names)
+        self.min_values = [math.inf] * len(column_names)
+        self.max_values = [-math.inf] * len(column_names)
+        self.cell_counts = None
+
+    def update(self, table_data_chunk_df):
+        cell_keys = {}
+        min_values, max_values = [], []
+        for index, (column_name, input_data_type) in enumerate(zip(self.column_names, self.input_data_types)):
+            column_values = table_data_chunk_df[column_name]
+            if input_data_type is None:
+                cell_keys[index] = column_values.astype(object).values
+                min_values.append(math.inf)
+                max_values.append(-math.inf)
+                continue
+            float_values = full(len(column_values), nan)
+            float_values[column_values.notna().values] = get_float_values_without_null(column_values, input_data_type)
+            float_values_without_null = float_values[~isnan(float_values)]
+            min_values.append(float_values_without_null.min() if len(float_values_without_null) != 0 else math.inf)
+            max_values.append(float_values_without_null.max() if len(float_values_without_null) != 0 else -math.inf)
+            cell_keys[index] = float_values
+        cell_counts = DataFrame(cell_keys).groupby(list(cell_keys), dropna=False, sort=False).size().rename('count').reset_index()
+        self.add_cell_counts(cell_counts, [None] * len(self.column_names), min_values, max_values)
+        return self
+
+    def add_cell_counts(self, cell_counts, bin_width_exponents, min_values, max_values):
+        """
+        cell_counts is DataFrame with column of keys per column of the group (numbered in the order of columns) and column count.
+        Keys of numeric columns are exact float values if bin width exponent is None and bin indices otherwise.
+        """
+        if len(cell_counts) == 0:
+            return
+        if self.cell_counts is None:
+            self.cell_counts = cell_counts.iloc[:0]
+        cell_counts = cell_counts.copy()
+        for index, input_data_type in enumerate(self.input_data_types):
+            if input_data_type is None:
+                continue
+            self.min_values[index] = min(self.min_values[index], min_values[index])
+            self.max_values[index] = max(self.max_values[index], max_values[index])
+            if self.bin_width_exponents[index] is None and bin_width_exponents[index] is None:
+                exact_values = union1d(self.cell_counts[index].dropna().values, cell_counts[index].dropna().values)
+                if len(exact_values) <= self.number_of_bins:
+                    continue
+            new_bin_width_exponent = max([bin_width_exponent for bin_width_exponent in [self.bin_width_exponents[index], bin_width_exponents[index]]
+                                          if bin_width_exponent is not None] +
+                                         [get_bin_width_exponent(self.min_values[index], self.max_values[index], self.number_of_bins)])
+            self.cell_counts[index] = get_joint_bin_keys(self.cell_counts[index].astype(float), self.bin_width_exponents[index],
+                                                         new_bin_width_exponent)
+            cell_counts[index] = get_joint_bin_keys(cell_counts[index].astype(float), bin_width_exponents[index], new_bin_width_exponent)
+            self.bin_width_exponents[index] = new_bin_width_exponent
+        self.cell_counts = concat([self.cell_counts, cell_counts], ignore_index=True) \
+            .groupby(list(range(len(self.column_names))), dropna=False, sort=False)['count'].sum().reset_index()
+
+    def merge(self, other):
+        if other.cell_counts is not None:
+            self.add_cell_counts(other.cell_counts, other.bin_width_exponents, other.min_values, other.max_values)
+        return self
+
+    def get_dimension(self, index, number_of_intervals):
+        """
+        Returns dimension of joint histogram for column and index of dimension value for every cell.
+        Bins of numeric column are joined into at most number_of_intervals intervals of roughly equal mass.
+        """
+        keys = self.cell_counts[index]
+        if self.input_data_types[index] is None:
+            value_indices, values = factorize(keys)
+            values = [value.item() if isinstance(value, generic) else value for value in values]
+            if (value_indices == -1).any():
+                value_indices = where(value_indices == -1, len(values), value_indices)
+                values.append(None)
+            return {'values': values}, value_indices
+        bin_width_exponent = self.bin_width_exponents[index]
+        if bin_width_exponent is None:
+            value_indices, values = factorize(keys, sort=True)
+            return {'intervals': [[value, value] for value in values.tolist()]}, value_indices
+        bin_counts = self.cell_counts.groupby(index)['count'].sum()
+        mass_before_bins = (bin_counts.cumsum() - bin_counts) / bin_counts.sum()
+        interval_indices, _ = factorize(floor(mass_before_bins.values * number_of_intervals).astype(int64), sort=True)
+        bin_width = 2.0 ** bin_width_exponent
+        bins = Series(bin_counts.index.values, index=interval_indices)
+        lower_bounds = (bins.groupby(level=0).min() * bin_width).clip(self.min_values[index], self.max_values[index])
+        upper_bounds = ((bins.groupby(level=0).max() + 1) * bin_width).clip(self.min_values[index], self.max_values[index])
+        value_indices = keys.map(Series(interval_indices, index=bin_counts.index)).fillna(-1).astype(int64).values
+        return {'intervals': [list(bounds) for bounds in zip(lower_bounds.tolist(), upper_bounds.tolist())]}, value_indices
+
+    def get_dimensions_cells_and_probabilities(self, number_of_intervals: int):
+        dimensions, cell_value_indices = [], {}
+        for index in range(len(self.column_names)):
+            dimension, cell_value_indices[index] = self.get_dimension(index, number_of_intervals)
+            dimensions.append(dimension)
+        cell_counts = DataFrame(cell_value_indices).assign(count=self.cell_counts['count'].values) \
+            .groupby(list(cell_value_indices), sort=True)['count'].sum()
+        cells = [list(map(int, cell if isinstance(cell, tuple) else (cell,))) for cell in cell_counts.index.tolist()]
+        probabilities = (cell_counts / cell_counts.sum()).tolist()
+        return dimensions, cells, probabilities
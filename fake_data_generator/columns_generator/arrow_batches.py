@@ -0,0 +1,52 @@
+import re
+import pyarrow as pa
+from numpy import empty, int64, ndarray
+from pandas import concat
+
+BATCH_FORMATS = ['pandas', 'arrow']
+
+
+def get_arrow_type(data_type):
+    if data_type is None:
+        return None
+    elif 'decimal' in data_type or 'numeric' in data_type:
+        precision_and_scale = re.search(r'\((\d+),\s*(\d+)\)', data_type)
+        if precision_and_scale is None:
+            return None
+        return pa.decimal128(*map(int, precision_and_scale.groups()))
+    elif 'int' in data_type:
+        return pa.int64()
+    elif 'date' == data_type:
+        return pa.date32()
+    elif 'timestamp' in data_type:
+        return pa.timestamp('us')
+    elif data_type == 'string' or 'char' in data_type or data_type == 'text':
+        return pa.large_string()
+
+
+def get_decimal128_array(scaled_values, arrow_type):
+    """
+    Builds decimal128 array straight from int64 values multiplied by 10 ** scale:
+    every value is stored as two little-endian 64-bit words, the high one is the sign extension of the low one.
+    """
+    words = empty((len(scaled_values), 2), dtype=int64)
+    words[:, 0] = scaled_values
+    words[:, 1] = scaled_values >> 63
+    return pa.Array.from_buffers(arrow_type, len(scaled_values), [None, pa.py_buffer(words)])
+
+
+def to_arrow_array(column_values, arrow_type=None):
+    if isinstance(column_values, pa.Array):
+        return column_values
+    if isinstance(column_values, ndarray) and pa.types.is_decimal(arrow_type):
+        return get_decimal128_array(column_values, arrow_type)
+    if isinstance(column_values, ndarray) and column_values.dtype.kind == 'U':
+        return pa.array(column_values).cast(arrow_type or pa.large_string())
+    return pa.array(column_values, type=arrow_type, from_pandas=True)
+
+
+def concat_batches_by_columns(batches):
+    if isinstance(batches[0], pa.RecordBatch):
+        return pa.RecordBatch.from_arrays([column for batch in batches for column in batch.columns],
+                                          names=[name for batch in batches for name in batch.schema.names])
+    return concat(batches, axis=1)
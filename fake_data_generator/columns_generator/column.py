@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 from typing import Generator
 from pandas import NaT
+from fake_data_generator.columns_generator.foreign_keys import FOREIGN_KEY_DISTRIBUTIONS
 
 
 class Column:
@@ -49,9 +50,9 @@ class CategoricalColumn(Column):
     def get_as_dict(self):
         super_dict = super().get_as_dict()
         if self.data_type == 'date':
-            values = list(map(lambda x: x.strftime("%Y-%m-%d") if x is not NaT else None, self.values))
+            values = list(map(lambda x: x.strftime("%Y-%m-%d") if x is not NaT and x is not None else None, self.values))
         elif 'timestamp' in self.data_type:
-            values = list(map(lambda x: x.strftime("%Y-%m-%d %H:%M:%S") if x is not NaT else None, self.values))
+            values = list(map(lambda x: x.strftime("%Y-%m-%d %H:%M:%S") if x is not NaT and x is not None else None, self.values))
         else:
             values = self.values
         super_dict[self.column_name].update({
@@ -159,46 +160,82 @@ class FioInUpperCaseColumn(Column):
     def __init__(self,
                  column_name: str,
                  data_type: str = None,
-                 generator: Generator = None):
+                 generator: Generator = None,
+                 pool_size: int = None,
+                 number_of_unique_values: int = None):
         super().__init__(column_name, data_type, generator)
+        self.pool_size = pool_size
+        self.number_of_unique_values = number_of_unique_values
 
     def get_as_dict(self):
         super_dict = super().get_as_dict()
         super_dict[self.column_name].update({
             'type': 'FIO_IN_UPPER_CASE',
+            'pool_size': self.pool_size,
+            'number_of_unique_values': self.number_of_unique_values,
         })
         return super_dict
 
+    def get_pool_size(self):
+        return self.pool_size
+
+    def get_number_of_unique_values(self):
+        return self.number_of_unique_values
+
 
 class FioOnlyStartingWithUpperCaseColumn(Column):
     def __init__(self,
                  column_name: str,
                  data_type: str = None,
-                 generator: Generator = None):
+                 generator: Generator = None,
+                 pool_size: int = None,
+                 number_of_unique_values: int = None):
         super().__init__(column_name, data_type, generator)
+        self.pool_size = pool_size
+        self.number_of_unique_values = number_of_unique_values
 
     def get_as_dict(self):
         super_dict = super().get_as_dict()
         super_dict[self.column_name].update({
             'type': 'FIO_ONLY_STARTING_WITH_UPPER_CASE',
+            'pool_size': self.pool_size,
+            'number_of_unique_values': self.number_of_unique_values,
         })
         return super_dict
 
+    def get_pool_size(self):
+        return self.pool_size
+
+    def get_number_of_unique_values(self):
+        return self.number_of_unique_values
+
 
 class EmailColumn(Column):
     def __init__(self,
                  column_name: str,
                  data_type: str = None,
-                 generator: Generator = None):
+                 generator: Generator = None,
+                 pool_size: int = None,
+                 number_of_unique_values: int = None):
         super().__init__(column_name, data_type, generator)
+        self.pool_size = pool_size
+        self.number_of_unique_values = number_of_unique_values
 
     def get_as_dict(self):
         super_dict = super().get_as_dict()
         super_dict[self.column_name].update({
             'type': 'EMAIL',
+            'pool_size': self.pool_size,
+            'number_of_unique_values': self.number_of_unique_values,
         })
         return super_dict
 
+    def get_pool_size(self):
+        return self.pool_size
+
+    def get_number_of_unique_values(self):
+        return self.number_of_unique_values
+
 
 class IncrementalIDColumn(Column):
     def __init__(self,
@@ -221,10 +258,24 @@ class ForeignKeyColumn(Column):
                  foreign_key_table_name: str,
                  foreign_key_column_name: str,
                  data_type: str = None,
-                 generator: Generator = None):
+                 generator: Generator = None,
+                 max_number_of_keys: int = None,
+                 keys_cache_path: str = None,
+                 reload_interval: int = None,
+                 distribution: str = 'uniform',
+                 fan_out_values: list = None,
+                 fan_out_probabilities: list = None):
         super().__init__(column_name, data_type, generator)
+        if distribution not in FOREIGN_KEY_DISTRIBUTIONS:
+            raise ValueError(f'Unknown distribution "{distribution}", expected one of {FOREIGN_KEY_DISTRIBUTIONS}')
         self.foreign_key_table_name = foreign_key_table_name
         self.foreign_key_column_name = foreign_key_column_name
+        self.max_number_of_keys = max_number_of_keys
+        self.keys_cache_path = keys_cache_path
+        self.reload_interval = reload_interval
+        self.distribution = distribution
+        self.fan_out_values = fan_out_values
+        self.fan_out_probabilities = fan_out_probabilities
 
     def get_as_dict(self):
         super_dict = super().get_as_dict()
@@ -232,9 +283,45 @@ class ForeignKeyColumn(Column):
             'type': 'FOREIGN_KEY',
             'foreign_key_table_name': self.foreign_key_table_name,
             'foreign_key_column_name': self.foreign_key_column_name,
+            'max_number_of_keys': self.max_number_of_keys,
+            'keys_cache_path': self.keys_cache_path,
+            'reload_interval': self.reload_interval,
+            'distribution': self.distribution,
+            'fan_out_values': self.fan_out_values,
+            'fan_out_probabilities': self.fan_out_probabilities,
         })
         return super_dict
 
+    def get_foreign_key_table_name(self):
+        return self.foreign_key_table_name
+
+    def get_foreign_key_column_name(self):
+        return self.foreign_key_column_name
+
+    def get_max_number_of_keys(self):
+        return self.max_number_of_keys
+
+    def get_keys_cache_path(self):
+        return self.keys_cache_path
+
+    def get_reload_interval(self):
+        return self.reload_interval
+
+    def get_distribution(self):
+        return self.distribution
+
+    def set_fan_out_values(self, fan_out_values):
+        self.fan_out_values = fan_out_values
+
+    def get_fan_out_values(self):
+        return self.fan_out_values
+
+    def set_fan_out_probabilities(self, fan_out_probabilities):
+        self.fan_out_probabilities = fan_out_probabilities
+
+    def get_fan_out_probabilities(self):
+        return self.fan_out_probabilities
+
 
 class MultipleColumns():
     def __init__(self,
@@ -248,4 +335,64 @@ class MultipleColumns():
         return self.columns
 
     def get_generator(self):
-        return self.generator
\ No newline at end of file
+        return self.generator
+
+
+class JointColumns(MultipleColumns):
+    def __init__(self,
+                 columns: list,
+                 generator: Generator = None,
+                 number_of_intervals: int = None,
+                 dimensions: list = None,
+                 cells: list = None,
+                 probabilities: list = None):
+        self.columns = columns
+        if generator is not None:
+            next(generator)
+        self.generator = generator
+        self.number_of_intervals = number_of_intervals
+        self.dimensions = dimensions
+        self.cells = cells
+        self.probabilities = probabilities
+
+    def get_as_dict(self):
+        first_column_name = self.columns[0].get_column_name()
+        joint_dict = {column.get_column_name(): {'data_type': column.get_data_type(),
+                                                 'type': 'JOINT',
+                                                 'joint_column_name': first_column_name}
+                      for column in self.columns}
+        joint_dict[first_column_name] = {'data_type': self.columns[0].get_data_type(),
+                                         'type': 'JOINT',
+                                         'columns': self.get_column_names(),
+                                         'dimensions': self.dimensions,
+                                         'cells': self.cells,
+                                         'probabilities': self.probabilities}
+        return joint_dict
+
+    def set_generator(self, generator):
+        next(generator)
+        self.generator = generator
+
+    def get_column_names(self):
+        return [column.get_column_name() for column in self.columns]
+
+    def get_number_of_intervals(self):
+        return self.number_of_intervals
+
+    def set_dimensions(self, dimensions):
+        self.dimensions = dimensions
+
+    def get_dimensions(self):
+        return self.dimensions
+
+    def set_cells(self, cells):
+        self.cells = cells
+
+    def get_cells(self):
+        return self.cells
+
+    def set_probabilities(self, probabilities):
+        self.probabilities = probabilities
+
+    def get_probabilities(self):
+        return self.probabilities
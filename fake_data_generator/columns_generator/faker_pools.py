@@ -0,0 +1,105 @@
+import os
+import re
+from loguru import logger
+from numpy import array, empty, flatnonzero, load as load_npz, savez
+
+POOLS_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'fake_data_generator')
+POOL_SEED = 0
+DEFAULT_POOL_SIZE = 10000
+TOKEN_PATTERN = re.compile(r'{{\s*(\w+)\s*}}')
+
+loaded_pools = {}
+
+
+def get_name_pool_arrays(faker, pool_size):
+    person_formats = faker.provider('faker.providers.person').formats
+    formats = list(person_formats)
+    weights = list(person_formats.values()) if isinstance(person_formats, dict) else [1.0] * len(formats)
+    tokens = sorted({token for name_format in formats for token in TOKEN_PATTERN.findall(name_format)})
+    parts = {token: [getattr(faker, token)() for _ in range(pool_size)] for token in tokens}
+    return formats, weights, parts
+
+
+def get_email_pool_arrays(faker, pool_size):
+    user_names, domains = zip(*[faker.email().split('@') for _ in range(pool_size)])
+    return ['{{user_name}}@{{domain}}'], [1.0], {'user_name': list(user_names), 'domain': list(domains)}
+
+
+POOL_BUILDERS = {
+    'name': get_name_pool_arrays,
+    'email': get_email_pool_arrays,
+}
+
+
+def get_pool_cache_path(pool_name, locale, pool_size):
+    from faker import VERSION as FAKER_VERSION
+    return os.path.join(POOLS_CACHE_DIRECTORY, f'{pool_name}-{locale or "default"}-{pool_size}-faker{FAKER_VERSION}.npz')
+
+
+def build_pool(pool_name, locale, pool_size):
+    """
+    Pre-samples parts of values from Faker with fixed seed: tokens of name formats of the locale (first, middle and last names,
+    prefixes) or local parts and domains of emails. Every token gets pool_size samples, so parts keep Faker frequencies.
+    """
+    from faker import Faker
+    faker = Faker(locale)
+    faker.seed_instance(POOL_SEED)
+    formats, weights, parts = POOL_BUILDERS[pool_name](faker, pool_size)
+    pool_arrays = {f'part_{token}': array(token_parts) for token, token_parts in parts.items()}
+    pool_arrays.update({'formats': array(formats), 'weights': array(weights, dtype=float)})
+    return pool_arrays
+
+
+def load_pool_arrays(pool_name, locale, pool_size):
+    cache_path = get_pool_cache_path(pool_name, locale, pool_size)
+    if os.path.exists(cache_path):
+        with load_npz(cache_path) as cached_pool_arrays:
+            return dict(cached_pool_arrays)
+    logger.info(f'Building pool of {pool_size} {pool_name} parts for locale {locale}.')
+    pool_arrays = build_pool(pool_name, locale, pool_size)
+    try:
+        os.makedirs(POOLS_CACHE_DIRECTORY, exist_ok=True)
+        temporary_path = f'{cache_path}.{os.getpid()}.tmp.npz'
+        savez(temporary_path, **pool_arrays)
+        os.replace(temporary_path, cache_path)
+    except OSError as error:
+        logger.warning(f'Pool of {pool_name} parts was not cached into {cache_path}: {error}')
+    return pool_arrays
+
+
+def get_faker_pool(pool_name, locale=None, pool_size=DEFAULT_POOL_SIZE, upper_case=False):
+    """
+    Returns pool of value parts: formats split into literals and tokens, format weights and arrays of sampled parts of every token.
+    Pools are cached on disk per locale and pool size and in memory of the process.
+    """
+    pool_key = (pool_name, locale, pool_size, upper_case)
+    if pool_key not in loaded_pools:
+        pool_arrays = load_pool_arrays(pool_name, locale, pool_size)
+        change_case = str.upper if upper_case else str
+        weights = pool_arrays['weights']
+        loaded_pools[pool_key] = {
+            'formats': [[change_case(piece) if index % 2 == 0 else piece for index, piece in enumerate(TOKEN_PATTERN.split(name_format))]
+                        for name_format in pool_arrays['formats'].tolist()],
+            'probabilities': weights / weights.sum(),
+            'parts': {key[len('part_'):]: array([change_case(part) for part in token_parts.tolist()], dtype=object)
+                      for key, token_parts in pool_arrays.items() if key.startswith('part_')},
+        }
+    return loaded_pools[pool_key]
+
+
+def get_values_from_pool(pool, generator, output_size):
+    """
+    Builds values by vectorized concatenation: every row gets a format and a random part of every token of the format.
+    """
+    format_indices = generator.choice(len(pool['formats']), size=output_size, p=pool['probabilities'])
+    values = empty(output_size, dtype=object)
+    for format_index, format_pieces in enumerate(pool['formats']):
+        rows = flatnonzero(format_indices == format_index)
+        if len(rows) == 0:
+            continue
+        format_values = array([format_pieces[0]] * len(rows), dtype=object)
+        for token, literal in zip(format_pieces[1::2], format_pieces[2::2]):
+            token_parts = pool['parts'][token]
+            format_values = format_values + token_parts[generator.integers(len(token_parts), size=len(rows))] + literal
+        values[rows] = format_values
+    return values
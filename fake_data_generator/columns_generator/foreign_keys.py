@@ -0,0 +1,95 @@
+import os
+import pandas as pd
+from itertools import islice
+from loguru import logger
+from numpy import arange, array, asarray, concatenate, load as load_npy, save as save_npy
+from fake_data_generator.connections import is_sqlalchemy_engine
+
+FOREIGN_KEY_DISTRIBUTIONS = ['uniform', 'observed']
+FOREIGN_KEYS_CHUNK_SIZE = 100000
+
+loaded_foreign_keys = {}
+
+
+def get_foreign_key_chunks(conn, foreign_key_table_name, foreign_key_column_name, chunk_size=FOREIGN_KEYS_CHUNK_SIZE):
+    if is_sqlalchemy_engine(conn):
+        from sqlalchemy import text
+        query = f'SELECT {foreign_key_column_name} AS fk FROM {foreign_key_table_name} WHERE {foreign_key_column_name} IS NOT NULL'
+        with conn.connect().execution_options(stream_results=True) as connection:
+            for foreign_keys_chunk_df in pd.read_sql_query(text(query), connection, chunksize=chunk_size):
+                yield foreign_keys_chunk_df['fk'].values
+    else:
+        rows = conn.table(foreign_key_table_name).select(foreign_key_column_name).dropna().toLocalIterator()
+        while True:
+            chunk_rows = list(islice(rows, chunk_size))
+            if not chunk_rows:
+                break
+            yield array([row[0] for row in chunk_rows])
+
+
+def get_reservoir_sample(chunks, max_number_of_keys, generator):
+    """
+    Reservoir sampling (algorithm R) vectorized over chunks: key number i replaces random reservoir position j < i + 1
+    if j < max_number_of_keys, so every key ends up in the reservoir with the same probability.
+    """
+    reservoir = None
+    number_of_seen_keys = 0
+    for chunk_keys in chunks:
+        chunk_keys = asarray(chunk_keys)
+        if number_of_seen_keys < max_number_of_keys:
+            number_of_free_positions = max_number_of_keys - number_of_seen_keys
+            reservoir = chunk_keys[:number_of_free_positions].copy() if reservoir is None else \
+                concatenate([reservoir, chunk_keys[:number_of_free_positions]])
+            number_of_seen_keys += len(chunk_keys[:number_of_free_positions])
+            chunk_keys = chunk_keys[number_of_free_positions:]
+        if len(chunk_keys) > 0:
+            positions = generator.integers(0, arange(number_of_seen_keys + 1, number_of_seen_keys + len(chunk_keys) + 1))
+            is_replaced = positions < max_number_of_keys
+            reservoir[positions[is_replaced]] = chunk_keys[is_replaced]
+            number_of_seen_keys += len(chunk_keys)
+    return reservoir if reservoir is not None else array([])
+
+
+def load_foreign_keys(conn, foreign_key_table_name, foreign_key_column_name, generator,
+                      max_number_of_keys=None, keys_cache_path=None, reload=False, provided_keys=None):
+    """
+    Returns keys of parent column as numpy array: all of them or reservoir sample of max_number_of_keys keys.
+    Keys are loaded once per process and shared by all columns referencing the same parent column,
+    with keys_cache_path they are also saved to (and on the next run loaded from) .npy file.
+    provided_keys (keys of parent generated in the same run) are used instead of parent table, they are not cached in the process.
+    reload=True queries parent table again and replaces both caches.
+    """
+    cache_key = (foreign_key_table_name, foreign_key_column_name, max_number_of_keys)
+    if provided_keys is None and not reload and cache_key in loaded_foreign_keys:
+        return loaded_foreign_keys[cache_key]
+    if provided_keys is None and not reload and keys_cache_path is not None and os.path.exists(keys_cache_path):
+        foreign_keys = load_npy(keys_cache_path, allow_pickle=True)
+    else:
+        if provided_keys is not None:
+            chunks = [provided_keys]
+        else:
+            chunks = get_foreign_key_chunks(conn, foreign_key_table_name, foreign_key_column_name)
+        if max_number_of_keys is not None:
+            foreign_keys = get_reservoir_sample(chunks, max_number_of_keys, generator)
+        else:
+            foreign_keys = concatenate(list(chunks) or [array([])])
+        if keys_cache_path is not None:
+            save_npy(keys_cache_path, foreign_keys, allow_pickle=True)
+        logger.info(f'{len(foreign_keys)} keys of {foreign_key_table_name}.{foreign_key_column_name} were loaded.')
+    if provided_keys is None:
+        loaded_foreign_keys[cache_key] = foreign_keys
+    return foreign_keys
+
+
+def get_foreign_key_weights(number_of_keys, fan_out_values, fan_out_probabilities, generator):
+    """
+    Gives every parent key a number of children drawn from observed distribution of children per parent,
+    so generated keys have the same skew as keys of the source table. Returns None for uniform distribution.
+    """
+    if fan_out_values is None or number_of_keys == 0:
+        return None
+    fan_out_probabilities = array(fan_out_probabilities, dtype=float)
+    weights = generator.choice(array(fan_out_values, dtype=float), size=number_of_keys, p=fan_out_probabilities / fan_out_probabilities.sum())
+    if weights.sum() == 0:
+        return None
+    return weights / weights.sum()
@@ -1,13 +1,23 @@
 import pandas as pd
-import sqlalchemy
+import pyarrow as pa
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from random import uniform
-from rstr import xeger
+from time import localtime
+from string import digits
+from random import Random
 from pandas import Series
 # from pytz import timezone
-from numpy.random import choice
-from faker import Faker
+from numpy import arange, array, ascontiguousarray, clip, floor, frompyfunc, int64, ones, rint, searchsorted, trunc, unique, where, zeros
+from fake_data_generator.connections import is_sqlalchemy_engine
+from fake_data_generator.columns_generator.arrow_batches import to_arrow_array
+from fake_data_generator.columns_generator.faker_pools import get_faker_pool, get_values_from_pool
+from fake_data_generator.columns_generator.foreign_keys import load_foreign_keys, get_foreign_key_weights
+from fake_data_generator.columns_generator.random_states import ColumnRandomState, get_seed
+from fake_data_generator.columns_generator.samplers import AliasSampler
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
 
 
 def get_generator_for_nulls():
@@ -16,40 +26,128 @@ def get_generator_for_nulls():
         output_size = yield Series([None] * output_size)
 
 
-def get_generator_for_categorical_column(values, probabilities):
+def get_generator_for_categorical_column(values, probabilities, arrow_type=None, random_state=None):
     output_size = yield
+    random_state = random_state or ColumnRandomState()
+    if isinstance(values, pa.Array) and arrow_type is None:
+        values = values.to_pylist()
+    sampler = AliasSampler(probabilities if probabilities is not None else ones(len(values)))
+    if arrow_type is not None:
+        arrow_values = values.cast(arrow_type) if isinstance(values, pa.Array) else to_arrow_array(Series(values, dtype=object), arrow_type)
+        while True:
+            output_size = yield arrow_values.take(sampler.sample(random_state.get_generator(), output_size))
+    values = array(values, dtype=object)
     while True:
-        fake_sample = choice(a=values, p=probabilities, size=output_size, replace=True)
-        fake_series = Series(fake_sample, dtype=object)
+        fake_series = Series(values[sampler.sample(random_state.get_generator(), output_size)], dtype=object)
         output_size = yield fake_series.where(fake_series.notna(), None)
 
 
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SECONDS_IN_DAY = 86400
+INT_TO_DECIMAL = frompyfunc(Decimal, 1, 1)
+DECIMAL_SCALEB = frompyfunc(Decimal.scaleb, 2, 1)
+
+
+def get_utc_offsets_lookup(days):
+    """
+    Returns function of unix timestamps of given days (numbers of days since epoch) returning their local UTC offsets (in seconds),
+    the same ones datetime.fromtimestamp applies. Offsets are looked up once per day (every day between min and max day
+    if there are not more of them than given days, otherwise only distinct days) and per timestamp only on days
+    of daylight saving time transitions, so the number of lookups depends on the number of days, not on the range of dates.
+    """
+    first_day, last_day = int(days.min()), int(days.max())
+    if last_day - first_day < len(days):
+        day_start_offsets = array([localtime(day * SECONDS_IN_DAY).tm_gmtoff for day in range(first_day, last_day + 2)], dtype=int64)
+        day_start_offsets, next_day_start_offsets = day_start_offsets[:-1], day_start_offsets[1:]
+        looked_up_days = None
+    else:
+        looked_up_days = unique(days)
+        day_start_offsets = array([localtime(day * SECONDS_IN_DAY).tm_gmtoff for day in looked_up_days.tolist()], dtype=int64)
+        next_day_start_offsets = array([localtime((day + 1) * SECONDS_IN_DAY).tm_gmtoff for day in looked_up_days.tolist()],
+                                       dtype=int64)
+    is_transition_day = day_start_offsets != next_day_start_offsets
+
+    def get_offsets(timestamps):
+        timestamp_days = floor(timestamps / SECONDS_IN_DAY).astype(int64)
+        day_indices = timestamp_days - first_day if looked_up_days is None else searchsorted(looked_up_days, timestamp_days)
+        offsets = day_start_offsets[day_indices]
+        is_in_transition_day = is_transition_day[day_indices]
+        offsets[is_in_transition_day] = [localtime(second).tm_gmtoff
+                                         for second in floor(timestamps[is_in_transition_day]).astype(int64).tolist()]
+        return offsets
+    return get_offsets
+
+
+def get_utc_offsets(timestamps):
+    """
+    Returns local UTC offsets (in seconds) of given unix timestamps (see get_utc_offsets_lookup).
+    """
+    if len(timestamps) == 0:
+        return zeros(0, dtype=int64)
+    return get_utc_offsets_lookup(floor(timestamps / SECONDS_IN_DAY).astype(int64))(timestamps)
+
+
 def float_to_int():
-    return int
+    return lambda values: trunc(values).astype(int64)
+
+
+def float_to_scaled_int(precision=0):
+    if precision != 0:
+        return lambda values: rint(values * 10 ** precision).astype(int64)
+    else:
+        return lambda values: trunc(values).astype(int64)
 
 
 def float_to_decimal(precision=0):
+    to_scaled_int = float_to_scaled_int(precision)
     if precision != 0:
-        return lambda x: Decimal(str(round(x, precision)))
+        return lambda values: DECIMAL_SCALEB(INT_TO_DECIMAL(to_scaled_int(values).astype(object)), -precision)
     else:
-        return lambda x: Decimal(int(x))
+        return lambda values: INT_TO_DECIMAL(to_scaled_int(values).astype(object))
+
+
+def float_to_datetime64_date():
+    return lambda values: (trunc(values).astype(int64) - UNIX_EPOCH_ORDINAL).astype('datetime64[D]')
 
 
 def float_to_date():
-    return lambda x: date.fromordinal(int(x))
+    to_datetime64_date = float_to_datetime64_date()
+    return lambda values: to_datetime64_date(values).astype(object)
 
 
 def float_to_datetime(date_flag: bool = False):
-    if date_flag:
-        return lambda x: datetime.fromtimestamp(x).replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        return lambda x: datetime.fromtimestamp(x)
+    def convert(values):
+        seconds = floor(values)
+        local_seconds = seconds.astype(int64) + get_utc_offsets(values)
+        microseconds = rint((values - seconds) * 10 ** 6).astype(int64)
+        local_datetimes = (local_seconds * 10 ** 6 + microseconds).astype('datetime64[us]')
+        if date_flag:
+            local_datetimes = local_datetimes.astype('datetime64[D]').astype('datetime64[us]')
+        return local_datetimes
+    return convert
+
+
+def float_to_pandas_datetime(date_flag: bool = False):
+    """
+    Same as float_to_datetime, but values are clipped to pandas.Timestamp.min and pandas.Timestamp.max (years 1677-2262),
+    since pandas before 2.0 stores timestamps only in nanoseconds. Arrow batches keep microseconds of the whole range.
+    """
+    to_datetime = float_to_datetime(date_flag)
+    min_datetime, max_datetime = array([pd.Timestamp.min.value // 1000 + 1, pd.Timestamp.max.value // 1000]).astype('datetime64[us]')
+    return lambda values: clip(to_datetime(values), min_datetime, max_datetime)
 
 
 CONVERTERS_FROM_FLOAT = {
     'int': float_to_int,
     'decimal': float_to_decimal,
     'date': float_to_date,
+    'datetime': float_to_pandas_datetime,
+}
+
+ARROW_CONVERTERS_FROM_FLOAT = {
+    'int': float_to_int,
+    'decimal': float_to_scaled_int,
+    'date': float_to_datetime64_date,
     'datetime': float_to_datetime,
 }
 
@@ -57,24 +155,88 @@ CONVERTERS_FROM_FLOAT = {
 def get_generator_for_continuous_column(intervals,
                                         probabilities,
                                         output_data_type: str,
-                                        params: dict = None):
+                                        params: dict = None,
+                                        arrow_type=None,
+                                        random_state=None):
     output_size = yield
     if params is None:
         params = {}
-    multiplier_for_probabilities = 1 / sum(probabilities)
-    norm_probabilities = list(map(lambda p: p * multiplier_for_probabilities, probabilities))
-    applied_func = CONVERTERS_FROM_FLOAT.get(output_data_type)(**params)
+    random_state = random_state or ColumnRandomState()
+    sampler = AliasSampler(probabilities)
+    lower_bounds, upper_bounds = array(intervals, dtype=float).T
+    if arrow_type is not None:
+        applied_func = ARROW_CONVERTERS_FROM_FLOAT.get(output_data_type)(**params)
+    else:
+        applied_func = CONVERTERS_FROM_FLOAT.get(output_data_type)(**params)
     while True:
-        fake_sample = map(lambda interval_index: applied_func(uniform(intervals[interval_index][0], intervals[interval_index][1])),
-                          choice(a=len(intervals), size=output_size, p=norm_probabilities, replace=True))
-        output_size = yield Series(fake_sample)
+        generator = random_state.get_generator()
+        interval_indices = sampler.sample(generator, output_size)
+        fake_sample = generator.uniform(lower_bounds[interval_indices], upper_bounds[interval_indices])
+        if arrow_type is not None:
+            output_size = yield to_arrow_array(applied_func(fake_sample), arrow_type)
+        else:
+            output_size = yield Series(applied_func(fake_sample))
+
+
+def get_alphabets_for_fixed_length_regex(common_regex):
+    """
+    Compiles regex consisting only of literals and character classes (like '[0-9][A-Z][-]' or '[a-z]{3}')
+    into list of per-position arrays of allowed code points.
+    Code points are repeated as many times as xeger would repeat them, so sampling distribution stays the same.
+    Returns None for any other regex.
+    """
+    alphabets = []
+    for opcode, value in sre_parse.parse(common_regex):
+        number_of_repeats = 1
+        if opcode == sre_parse.MAX_REPEAT and value[0] == value[1] and len(value[2]) == 1:
+            number_of_repeats = value[0]
+            opcode, value = value[2][0]
+        if opcode == sre_parse.LITERAL:
+            alphabet = [value]
+        elif opcode == sre_parse.IN:
+            alphabet = []
+            for item_opcode, item_value in value:
+                if item_opcode == sre_parse.LITERAL:
+                    alphabet.append(item_value)
+                elif item_opcode == sre_parse.RANGE:
+                    alphabet.extend(range(item_value[0], item_value[1] + 1))
+                elif item_opcode == sre_parse.CATEGORY and item_value == sre_parse.CATEGORY_DIGIT:
+                    alphabet.extend(map(ord, digits))
+                else:
+                    return None
+        elif opcode == sre_parse.CATEGORY and value == sre_parse.CATEGORY_DIGIT:
+            alphabet = list(map(ord, digits))
+        else:
+            return None
+        alphabets.extend([array(alphabet, dtype='<u4')] * number_of_repeats)
+    return alphabets
 
 
-def get_generator_for_string_column(common_regex):
+def get_generator_for_string_column(common_regex, arrow_type=None, random_state=None):
     output_size = yield
+    random_state = random_state or ColumnRandomState()
+    alphabets = get_alphabets_for_fixed_length_regex(common_regex)
+    if not alphabets:
+        from rstr import Rstr
+        while True:
+            xeger = Rstr(Random(get_seed(random_state.get_generator()))).xeger
+            list_of_fake_strings = [xeger(common_regex) for _ in range(output_size)]
+            output_size = yield Series(list_of_fake_strings)
+
+    number_of_positions = len(alphabets)
+    alphabet_sizes = array([len(alphabet) for alphabet in alphabets])
+    alphabets_table = zeros((number_of_positions, alphabet_sizes.max()), dtype='<u4')
+    for position, alphabet in enumerate(alphabets):
+        alphabets_table[position, :len(alphabet)] = alphabet
+    positions = arange(number_of_positions)
     while True:
-        list_of_fake_strings = [xeger(common_regex) for _ in range(output_size)]
-        output_size = yield Series(list_of_fake_strings)
+        char_indices = random_state.get_generator().integers(0, alphabet_sizes, size=(output_size, number_of_positions))
+        code_points = ascontiguousarray(alphabets_table[positions, char_indices])
+        fake_strings = code_points.view(f'<U{number_of_positions}').ravel()
+        if arrow_type is not None:
+            output_size = yield to_arrow_array(fake_strings, arrow_type)
+        else:
+            output_size = yield Series(fake_strings, dtype=object)
 
 
 def get_generator_for_current_dttm_column():
@@ -84,54 +246,169 @@ def get_generator_for_current_dttm_column():
         output_size = yield Series(fake_timestamps)
 
 
-def get_generator_for_fio_in_upper_case_column():
+def get_generator_for_faker_pool(output_size, pool, random_state, number_of_unique_values=None):
+    unique_values = None
+    if number_of_unique_values is not None:
+        unique_values = get_values_from_pool(pool, random_state.get_column_generator(), number_of_unique_values)
+    while True:
+        generator = random_state.get_generator()
+        if unique_values is not None:
+            fake_values = unique_values[generator.integers(len(unique_values), size=output_size)]
+        else:
+            fake_values = get_values_from_pool(pool, generator, output_size)
+        output_size = yield Series(fake_values)
+
+
+def get_generator_for_fio_in_upper_case_column(random_state=None, pool_size=None, number_of_unique_values=None):
     output_size = yield
+    random_state = random_state or ColumnRandomState()
+    if pool_size is not None:
+        yield from get_generator_for_faker_pool(output_size, get_faker_pool('name', 'ru_RU', pool_size, upper_case=True),
+                                                random_state, number_of_unique_values)
+    from faker import Faker
     faker = Faker('ru_RU')
     while True:
+        faker.seed_instance(get_seed(random_state.get_generator()))
         fake_emails = [faker.name().upper() for _ in range(output_size)]
         output_size = yield Series(fake_emails)
 
 
-def get_generator_for_fio_only_starting_with_upper_case_column():
+def get_generator_for_fio_only_starting_with_upper_case_column(random_state=None, pool_size=None, number_of_unique_values=None):
     output_size = yield
+    random_state = random_state or ColumnRandomState()
+    if pool_size is not None:
+        yield from get_generator_for_faker_pool(output_size, get_faker_pool('name', 'ru_RU', pool_size),
+                                                random_state, number_of_unique_values)
+    from faker import Faker
     faker = Faker('ru_RU')
     while True:
+        faker.seed_instance(get_seed(random_state.get_generator()))
         fake_emails = [faker.name() for _ in range(output_size)]
         output_size = yield Series(fake_emails)
 
 
-def get_generator_for_email_column():
+def get_generator_for_email_column(random_state=None, pool_size=None, number_of_unique_values=None):
     output_size = yield
+    random_state = random_state or ColumnRandomState()
+    if pool_size is not None:
+        yield from get_generator_for_faker_pool(output_size, get_faker_pool('email', None, pool_size),
+                                                random_state, number_of_unique_values)
+    from faker import Faker
     faker = Faker()
     while True:
+        faker.seed_instance(get_seed(random_state.get_generator()))
         fake_emails = [faker.email() for _ in range(output_size)]
         output_size = yield Series(fake_emails)
 
 
-def get_generator_for_incremental_id_column(conn, table_name, incremental_id_column_name):
-    output_size = yield
-    if isinstance(conn, sqlalchemy.engine.base.Engine) and conn.name == 'postgresql':
+def get_start_id_for_incremental_id_column(conn, table_name, incremental_id_column_name):
+    if is_sqlalchemy_engine(conn) and conn.name == 'postgresql':
         current_max_id_df = pd.read_sql_query(f'SELECT MAX({incremental_id_column_name}) AS id FROM {table_name}', conn)
     else:
         current_max_id_df = pd.DataFrame({'id': [None]})
     if current_max_id_df['id'][0] is not None:
-        start_id = current_max_id_df['id'][0] + 1
+        return int(current_max_id_df['id'][0]) + 1
     else:
-        start_id = 1
+        return 1
+
+
+def get_generator_for_incremental_id_column(conn=None, table_name=None, incremental_id_column_name=None, start_id=None):
+    output_size = yield
+    if start_id is None:
+        start_id = get_start_id_for_incremental_id_column(conn, table_name, incremental_id_column_name)
     while True:
-        output_size = yield Series([i for i in range(start_id, start_id + output_size)])
+        fake_ids = Series(range(start_id, start_id + output_size))
         start_id += output_size
+        output_size = yield fake_ids
 
 
-def get_generator_for_foreign_key_column(conn, foreign_key_table_name, foreign_key_column_name):
+def get_generator_for_foreign_key_column(conn,
+                                         foreign_key_table_name,
+                                         foreign_key_column_name,
+                                         random_state=None,
+                                         max_number_of_keys=None,
+                                         keys_cache_path=None,
+                                         reload_interval=None,
+                                         fan_out_values=None,
+                                         fan_out_probabilities=None,
+                                         provided_keys=None):
+    """
+    provided_keys are keys of parent generated in the same run, they are used instead of parent table and never reloaded.
+    """
     output_size = yield
+    random_state = random_state or ColumnRandomState()
+    if conn is None and provided_keys is None:
+        raise ValueError(f'Keys of {foreign_key_table_name}.{foreign_key_column_name} can not be loaded: '
+                         f'there is neither connection to the parent table nor keys of the parent generated in the same run')
+    column_generator = random_state.get_column_generator()
+    number_of_batches_since_load = 0
+    foreign_keys, weights_keys, weights = None, None, None
     while True:
-        if isinstance(conn, sqlalchemy.engine.base.Engine) and conn.name == 'postgresql':
-            fk_df = pd.read_sql_query(
-                f'SELECT {foreign_key_column_name} AS fk '
-                f'FROM {foreign_key_table_name} '
-                f'ORDER BY RANDOM() LIMIT {output_size}', conn
-            )
+        reload = reload_interval is not None and number_of_batches_since_load >= reload_interval
+        if provided_keys is None or foreign_keys is None:
+            foreign_keys = load_foreign_keys(conn, foreign_key_table_name, foreign_key_column_name, column_generator,
+                                             max_number_of_keys, keys_cache_path, reload, provided_keys)
+        number_of_batches_since_load = 1 if reload else number_of_batches_since_load + 1
+        if weights_keys is not foreign_keys:
+            weights_keys, weights = foreign_keys, get_foreign_key_weights(len(foreign_keys), fan_out_values, fan_out_probabilities,
+                                                                          column_generator)
+            sampler = AliasSampler(weights) if weights is not None else None
+        generator = random_state.get_generator()
+        if len(foreign_keys) == 0:
+            output_size = yield Series([None] * output_size)
+        elif weights is None:
+            output_size = yield Series(foreign_keys[generator.integers(len(foreign_keys), size=output_size)])
         else:
-            fk_df = pd.DataFrame({'fk': [None] * output_size})
-        output_size = yield fk_df['fk'].sample(n=output_size, replace=True).reset_index(drop=True)
+            output_size = yield Series(foreign_keys[sampler.sample(generator, output_size)])
+
+
+def get_generator_for_joint_columns(dimensions,
+                                    cells,
+                                    probabilities,
+                                    output_data_types: list,
+                                    params_list: list = None,
+                                    random_state=None):
+    """
+    Generates group of columns in one draw: every row gets a cell of joint histogram, then string columns take values of the cell
+    and numeric columns take uniform values from intervals of the cell (interval index -1 means null).
+    Yields DataFrame with columns numbered in the order of dimensions.
+    """
+    output_size = yield
+    if probabilities is None or len(probabilities) == 0:
+        while True:
+            output_size = yield pd.DataFrame({index: Series([None] * output_size) for index in range(len(output_data_types))})
+    random_state = random_state or ColumnRandomState()
+    params_list = params_list or [None] * len(dimensions)
+    cells = array(cells, dtype=int64).reshape(len(probabilities), len(dimensions))
+    sampler = AliasSampler(probabilities)
+    dimension_values, dimension_bounds, converters = [], [], []
+    for dimension, output_data_type, params in zip(dimensions, output_data_types, params_list):
+        if 'values' in dimension:
+            dimension_values.append(array(dimension['values'], dtype=object))
+            dimension_bounds.append(None)
+            converters.append(None)
+        else:
+            dimension_values.append(None)
+            dimension_bounds.append(array(dimension['intervals'], dtype=float).reshape(-1, 2).T)
+            converters.append(CONVERTERS_FROM_FLOAT.get(output_data_type)(**(params or {})))
+    while True:
+        generator = random_state.get_generator()
+        fake_cells = cells[sampler.sample(generator, output_size)]
+        fake_columns = {}
+        for index, (values, bounds, converter) in enumerate(zip(dimension_values, dimension_bounds, converters)):
+            value_indices = fake_cells[:, index]
+            if values is not None:
+                fake_series = Series(values[value_indices], dtype=object)
+                fake_columns[index] = fake_series.where(fake_series.notna(), None)
+                continue
+            lower_bounds, upper_bounds = bounds
+            if len(lower_bounds) == 0:
+                fake_columns[index] = Series([None] * output_size)
+                continue
+            is_null = value_indices < 0
+            value_indices = where(is_null, 0, value_indices)
+            fake_series = Series(converter(generator.uniform(lower_bounds[value_indices], upper_bounds[value_indices])))
+            if is_null.any():
+                fake_series = fake_series.astype(object).where(~is_null, None)
+            fake_columns[index] = fake_series
+        output_size = yield pd.DataFrame(fake_columns)
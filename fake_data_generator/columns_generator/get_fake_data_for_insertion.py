@@ -1,22 +1,50 @@
-from loguru import logger
+import pyarrow as pa
+from time import perf_counter
 from pandas import concat
 from fake_data_generator.columns_generator.column import MultipleColumns
+from fake_data_generator.columns_generator.arrow_batches import BATCH_FORMATS, get_arrow_type, to_arrow_array
 
 
 def get_fake_data_for_insertion(output_size,
-                                columns_info_with_set_generator):
+                                columns_info_with_set_generator,
+                                batch_format='pandas',
+                                column_timings: dict = None):
+    """
+    Returns batch of generated data as pandas DataFrame or, if batch_format is 'arrow', as pyarrow RecordBatch.
+    If column_timings dict is given, seconds spent on every column (comma-separated names for multiple columns) are written into it.
+    """
+    if batch_format not in BATCH_FORMATS:
+        raise ValueError(f'Unknown batch format "{batch_format}", expected one of {BATCH_FORMATS}')
     list_of_fake_column_data = []
+    arrow_arrays = []
+    arrow_column_names = []
     for column_info in columns_info_with_set_generator:
-        if type(column_info) == MultipleColumns:
+        if isinstance(column_info, MultipleColumns):
             col_names = [col_info.get_column_name() for col_info in column_info.get_columns()]
+            start_time = perf_counter()
             fake_data_in_df = column_info.get_generator().send(output_size)
+            if column_timings is not None:
+                column_timings[', '.join(col_names)] = perf_counter() - start_time
+            if batch_format == 'arrow':
+                for col_info, (_, fake_column_data) in zip(column_info.get_columns(), fake_data_in_df.items()):
+                    arrow_arrays.append(to_arrow_array(fake_column_data, get_arrow_type(col_info.get_data_type())))
+                arrow_column_names.extend(col_names)
+                continue
             fake_data_in_df.rename(columns={index: name for index, name in enumerate(col_names)}, inplace=True)
             list_of_fake_column_data.append(fake_data_in_df)
         else:
             column_name = column_info.get_column_name()
-            fake_column_data_in_series = column_info.get_generator().send(output_size)
-            fake_column_data_in_series.name = column_name
-            logger.info(f'Data for {column_name} was generated.')
-            list_of_fake_column_data.append(fake_column_data_in_series)
+            start_time = perf_counter()
+            fake_column_data = column_info.get_generator().send(output_size)
+            if column_timings is not None:
+                column_timings[column_name] = perf_counter() - start_time
+            if batch_format == 'arrow':
+                arrow_arrays.append(to_arrow_array(fake_column_data, get_arrow_type(column_info.get_data_type())))
+                arrow_column_names.append(column_name)
+                continue
+            fake_column_data.name = column_name
+            list_of_fake_column_data.append(fake_column_data)
+    if batch_format == 'arrow':
+        return pa.RecordBatch.from_arrays(arrow_arrays, names=arrow_column_names)
     df_to_insert = concat(list_of_fake_column_data, axis=1)
     return df_to_insert
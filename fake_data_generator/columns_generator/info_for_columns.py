@@ -1,44 +1,260 @@
-import re
 import math
-from numpy import linspace, NaN
-from scipy.stats import gaussian_kde
-from pandas import Timestamp
+import pyarrow as pa
+import pyarrow.compute as pc
+from numpy import arange, array, asarray, bincount, concatenate, diff, floor, fromiter, int64, interp, linspace, NaN, \
+    generic, maximum, ones, uint32, where
+from numpy.fft import rfft, irfft
+from pandas import DatetimeTZDtype, Timestamp, unique
+from fake_data_generator.columns_generator.generators import SECONDS_IN_DAY, UNIX_EPOCH_ORDINAL, get_utc_offsets_lookup
 
+REGEX_FOR_FIO_IN_UPPER_CASE = r'[А-Я]{2,} [А-Я]{2,} [А-Я]{2,}\Z'
+REGEX_FOR_FIO_ONLY_STARTING_WITH_UPPER_CASE = r'[А-Я][а-я]+ [А-Я][а-я]+ [А-Я][а-я]+\Z'
+REGEX_FOR_EMAIL = r'[.A-Za-z0-9_-]+@[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\Z'
+REGEXES_FOR_STRING_CLASSES = [REGEX_FOR_FIO_IN_UPPER_CASE, REGEX_FOR_FIO_ONLY_STARTING_WITH_UPPER_CASE, REGEX_FOR_EMAIL]
+STRING_CLASS_THRESHOLD = 0.8
+CHAR_CLASS_RANGES = [('0', '9'), ('A', 'Z'), ('a', 'z'), ('А', 'Я'), ('а', 'я')]
+CHAR_CODE_BITS = 21
+MAX_NUMBER_OF_CHARS_PER_PASS = 2 ** 22
+NUMBER_OF_KDE_GRID_CELLS = 4096
+KDE_KERNEL_RADIUS_IN_BANDWIDTHS = 6
 
-def get_info_for_categorical_column(column_values):
-    normalized_frequencies_of_values = column_values.value_counts(normalize=True, dropna=False)
-    values = normalized_frequencies_of_values.index.tolist()
+
+def get_input_data_type(data_type):
+    if 'decimal' in data_type or 'numeric' in data_type:
+        return 'float'
+    elif 'int' in data_type:
+        return 'int'
+    elif 'date' == data_type:
+        return 'date'
+    elif 'timestamp' in data_type:
+        return 'datetime'
+
+
+def get_correct_categorical_values(values):
     if any(isinstance(value, Timestamp) for value in values):
         values = list(map(lambda x: x.to_pydatetime() if isinstance(x, Timestamp) else x, values))
     elif any(isinstance(value, str) for value in values):
         values = list(map(lambda x: x if x is not NaN else None, values))
     elif any(isinstance(value, float) and not math.isnan(value) for value in values):
-        values = list(map(lambda x: int(x) if not math.isnan(x) else None, values))
+        values = list(map(lambda x: None if x is None or math.isnan(x) else int(x), values))
+    return list(map(lambda x: x.item() if isinstance(x, generic) else x, values))
+
+
+def get_info_for_categorical_column(column_values):
+    normalized_frequencies_of_values = column_values.value_counts(normalize=True, dropna=False)
+    values = get_correct_categorical_values(normalized_frequencies_of_values.index.tolist())
     probabilities = normalized_frequencies_of_values.to_list()
     return values, probabilities
 
 
-CONVERTERS_TO_FLOAT = {
-    'int': float,
-    'float': lambda x: x,
-    'date': lambda x: x.toordinal(),
-    'datetime': lambda x: x.timestamp(),
-}
+def get_ordinals(dates):
+    """
+    Vectorized date.toordinal() of datetime64 values or object array of dates.
+    """
+    dates = pa.array(dates, type=pa.date32()).to_numpy(zero_copy_only=False) if dates.dtype == object else dates.astype('datetime64[D]')
+    return (dates.astype(int64) + UNIX_EPOCH_ORDINAL).astype(float)
+
+
+def get_unix_timestamps_of_local_times(local_timestamps):
+    """
+    Vectorized datetime.timestamp() of naive local times given as seconds since epoch (the same steps as in datetime._mktime,
+    offsets of days around the local times are looked up once):
+    repeated wall clock time is taken at the earlier offset and skipped wall clock time is shifted forward (fold=0).
+    """
+    if len(local_timestamps) == 0:
+        return local_timestamps
+    local_seconds = floor(local_timestamps)
+    local_days = floor(local_seconds / SECONDS_IN_DAY).astype(int64)
+    get_utc_offsets = get_utc_offsets_lookup(concatenate([local_days - 2, local_days - 1, local_days, local_days + 1]))
+    first_guesses = local_seconds - get_utc_offsets(local_seconds)
+    first_guess_offsets = get_utc_offsets(first_guesses)
+    is_first_guess_exact = first_guesses + first_guess_offsets == local_seconds
+    second_offsets = where(is_first_guess_exact, get_utc_offsets(first_guesses - SECONDS_IN_DAY), first_guess_offsets)
+    second_guesses = local_seconds - second_offsets
+    unix_seconds = where(get_utc_offsets(second_guesses) == second_offsets, second_guesses,
+                         where(is_first_guess_exact, first_guesses, maximum(first_guesses, second_guesses)))
+    return unix_seconds + (local_timestamps - local_seconds)
+
+
+def get_unix_timestamps(datetimes):
+    """
+    Vectorized timestamp() of Series of datetimes: naive datetime64 values are taken as UTC like in pandas.Timestamp.timestamp,
+    naive python datetimes of object Series as local time like in datetime.timestamp.
+    """
+    if isinstance(datetimes.dtype, DatetimeTZDtype):
+        datetimes = datetimes.dt.tz_convert(None)
+    if datetimes.dtype != object:
+        return datetimes.values.astype('datetime64[us]').astype(int64) / 10 ** 6
+    timestamps = pa.array(datetimes.values, type=pa.timestamp('us')).to_numpy(zero_copy_only=False).astype(int64) / 10 ** 6
+    if len(datetimes) != 0 and datetimes.iloc[0].tzinfo is None:
+        timestamps = get_unix_timestamps_of_local_times(timestamps)
+    return timestamps
+
+
+def get_float_values_without_null(column_values, input_data_type: str):
+    column_values_without_null = column_values.dropna()
+    if input_data_type in ['int', 'float']:
+        return column_values_without_null.values.astype(float)
+    elif input_data_type == 'date':
+        return get_ordinals(column_values_without_null.values)
+    return get_unix_timestamps(column_values_without_null)
+
+
+def get_uniform_intervals(min_value, max_value, number_of_intervals: int):
+    x = linspace(min_value, max_value, num=(number_of_intervals + 1))
+    return [(value, x[index + 1]) for index, value in enumerate(x[:-1])]
+
+
+def get_scott_bandwidth(values, weights, number_of_values):
+    """
+    Bandwidth of scipy.stats.gaussian_kde(values, bw_method=number_of_values ** (-1 / 5), weights=weights):
+    weighted standard deviation corrected for the effective number of values.
+    """
+    normalized_weights = weights / weights.sum()
+    mean = (normalized_weights * values).sum()
+    variance = (normalized_weights * (values - mean) ** 2).sum() / (1 - (normalized_weights ** 2).sum())
+    return number_of_values ** (-1 / 5) * math.sqrt(variance)
+
+
+def get_linear_binned_grid_counts(values, weights, min_value, cell_width, number_of_cells: int):
+    """
+    Splits weight of every value between two nearest cell centers proportionally to the distances to them.
+    """
+    positions = ((values - min_value) / cell_width - 0.5).clip(0, number_of_cells - 1)
+    left_cells = floor(positions).astype(int64).clip(max=number_of_cells - 2)
+    right_fractions = positions - left_cells
+    return bincount(left_cells, weights * (1 - right_fractions), minlength=number_of_cells) + \
+        bincount(left_cells + 1, weights * right_fractions, minlength=number_of_cells)
+
+
+def get_gaussian_cell_kernel(cell_width, bandwidth, number_of_cells: int):
+    """
+    Probabilities of normal value centered in a cell to fall into cells at offsets from -radius to radius.
+    """
+    radius = min(number_of_cells - 1, math.ceil(KDE_KERNEL_RADIUS_IN_BANDWIDTHS * bandwidth / cell_width))
+    scale = bandwidth * math.sqrt(2)
+    cdf_values = array([math.erf((offset + 0.5) * cell_width / scale) for offset in range(-radius - 1, radius + 1)])
+    return diff(cdf_values) / 2
+
+
+def convolve_with_fft(grid_counts, kernel):
+    size = len(grid_counts) + len(kernel) - 1
+    fft_size = 2 ** math.ceil(math.log2(size))
+    convolution = irfft(rfft(grid_counts, fft_size) * rfft(kernel, fft_size), fft_size)
+    radius = len(kernel) // 2
+    return convolution[radius:radius + len(grid_counts)].clip(min=0)
+
+
+def get_intervals_and_probabilities(values, weights, bandwidth, min_value, max_value, number_of_intervals: int,
+                                    number_of_grid_cells: int = NUMBER_OF_KDE_GRID_CELLS):
+    """
+    Integrates gaussian KDE over number_of_intervals equal intervals of [min_value, max_value] in O(n + grid log grid):
+    weights of values are linearly binned onto grid of cells, grid is convolved via FFT with probabilities
+    of the kernel to fall into cells and masses of intervals are interpolated from cumulative sum of masses of cells.
+    Mass of KDE outside of [min_value, max_value] is dropped, probabilities are normalized.
+    """
+    intervals = get_uniform_intervals(min_value, max_value, number_of_intervals)
+    if not max_value > min_value or not bandwidth > 0:
+        return intervals, [1 / number_of_intervals] * number_of_intervals
+    cell_width = (max_value - min_value) / number_of_grid_cells
+    grid_counts = get_linear_binned_grid_counts(values, weights, min_value, cell_width, number_of_grid_cells)
+    cell_masses = convolve_with_fft(grid_counts, get_gaussian_cell_kernel(cell_width, bandwidth, number_of_grid_cells))
+    cumulative_masses = concatenate([[0.0], cell_masses.cumsum()])
+    probabilities = diff(interp(linspace(0, number_of_grid_cells, num=(number_of_intervals + 1)),
+                                arange(number_of_grid_cells + 1), cumulative_masses))
+    return intervals, (probabilities / probabilities.sum()).tolist()
 
 
 def get_info_for_continuous_column(column_values, input_data_type: str, number_of_intervals: int):
-    float_column_values_without_null = column_values.dropna().apply(CONVERTERS_TO_FLOAT[input_data_type])
-    kde = gaussian_kde(float_column_values_without_null.values)
-    x = linspace(min(float_column_values_without_null), max(float_column_values_without_null), num=(number_of_intervals + 1))
-    intervals = []
-    probabilities = []
-    for index, value in enumerate(x[:-1]):
-        interval = (value, x[index + 1])
-        probability = kde.integrate_box_1d(*interval)
-        intervals.append(interval)
-        probabilities.append(probability)
-    k = 1 / sum(probabilities)
-    return intervals, list(map(lambda p: p * k, probabilities))
+    float_column_values_without_null = get_float_values_without_null(column_values, input_data_type)
+    weights = ones(len(float_column_values_without_null))
+    min_value, max_value = float_column_values_without_null.min(), float_column_values_without_null.max()
+    bandwidth = get_scott_bandwidth(float_column_values_without_null, weights, len(weights)) if max_value > min_value else 0.0
+    return get_intervals_and_probabilities(float_column_values_without_null, weights, bandwidth, min_value, max_value,
+                                           number_of_intervals)
+
+
+def get_info_for_binned_continuous_column(bin_centers, bin_counts, min_value, max_value, number_of_intervals: int):
+    """
+    Same as get_info_for_continuous_column, but KDE is fitted on histogram of values:
+    bin centers are weighted by number of values in bins and bandwidth is chosen by Scott's rule
+    for the number of values rather than for the number of bins.
+    """
+    non_empty_bins_mask = bin_counts > 0
+    if non_empty_bins_mask.sum() < 2:
+        return get_uniform_intervals(min_value, max_value, number_of_intervals), [1 / number_of_intervals] * number_of_intervals
+    bandwidth = get_scott_bandwidth(bin_centers[non_empty_bins_mask], bin_counts[non_empty_bins_mask], bin_counts.sum())
+    return get_intervals_and_probabilities(bin_centers[non_empty_bins_mask], bin_counts[non_empty_bins_mask], bandwidth,
+                                           min_value, max_value, number_of_intervals)
+
+
+def get_char_class(char):
+    if '0' <= char <= '9':
+        return '0-9'
+    elif 'A' <= char <= 'Z':
+        return 'A-Z'
+    elif 'a' <= char <= 'z':
+        return 'a-z'
+    elif 'А' <= char <= 'Я':
+        return 'А-Я'
+    elif 'а' <= char <= 'я':
+        return 'а-я'
+    return char
+
+
+def add_char_classes(common_pattern: dict, strings: list):
+    """
+    Strings are converted into matrix of character codes (padded with zeros up to the longest string), every code in class range
+    is replaced by the first code of the range, and unique pairs of position and code (pandas.unique keeps order of the first occurrence)
+    are added to common pattern.
+    """
+    lengths = fromiter(map(len, strings), dtype=int64, count=len(strings))
+    char_codes = array(strings, dtype=str).view(uint32).reshape(len(strings), -1)
+    char_class_codes = char_codes.astype(int64)
+    for first_char, last_char in CHAR_CLASS_RANGES:
+        char_class_codes[(char_codes >= ord(first_char)) & (char_codes <= ord(last_char))] = ord(first_char)
+    positions = arange(char_codes.shape[1])
+    position_codes = ((positions << CHAR_CODE_BITS) + char_class_codes)[positions < lengths[:, None]]
+    for position_code in unique(position_codes).tolist():
+        char_classes = common_pattern.setdefault(position_code >> CHAR_CODE_BITS, [])
+        char_class = get_char_class(chr(position_code & ((1 << CHAR_CODE_BITS) - 1)))
+        if char_class not in char_classes:
+            char_classes.append(char_class)
+
+
+def update_common_pattern(common_pattern: dict, strings):
+    """
+    Adds character classes of given strings to common pattern, which maps position in string
+    to list of character classes met on that position (in order of the first occurrence).
+    Strings are processed by numpy in passes of at most MAX_NUMBER_OF_CHARS_PER_PASS characters.
+    """
+    strings = list(strings)
+    number_of_strings_per_pass = max(1, MAX_NUMBER_OF_CHARS_PER_PASS // max(max(map(len, strings), default=0), 1))
+    for first_index in range(0, len(strings), number_of_strings_per_pass):
+        add_char_classes(common_pattern, strings[first_index:first_index + number_of_strings_per_pass])
+    return common_pattern
+
+
+def merge_common_patterns(common_pattern: dict, other_common_pattern: dict):
+    for index, other_char_classes in other_common_pattern.items():
+        char_classes = common_pattern.setdefault(index, [])
+        for char_class in other_char_classes:
+            if char_class not in char_classes:
+                char_classes.append(char_class)
+    return common_pattern
+
+
+def escape_char_class(char_class, number_of_char_classes):
+    if char_class in ['\\', ']', '[', '^'] or (char_class == '-' and number_of_char_classes > 1):
+        return '\\' + char_class
+    return char_class
+
+
+def get_common_regex(common_pattern: dict) -> str:
+    common_pattern_string = ''
+    for _, char_classes in sorted(common_pattern.items()):
+        common_pattern_string += '[' + ''.join(escape_char_class(char_class, len(char_classes)) for char_class in char_classes) + ']'
+    return common_pattern_string
 
 
 def get_info_for_string_column(strings) -> str:
@@ -62,38 +278,47 @@ def get_info_for_string_column(strings) -> str:
     # >>> get_common_regex(['1234-2314', '1241-1234', '2514-2141'])
     '[0-9][0-9][0-9][0-9][-][0-9][0-9][0-9][0-9]'
     """
-    common_pattern = {}
-    for string in strings:
-        for index, char in enumerate(string):
-            if re.match(r"[0-9]", char):
-                if '0-9' not in common_pattern.get(index, ''):
-                    common_pattern[index] = common_pattern.get(index, '') + '0-9'
-                else:
-                    continue
-            elif re.match(r"[A-Z]", char):
-                if 'A-Z' not in common_pattern.get(index, ''):
-                    common_pattern[index] = common_pattern.get(index, '') + 'A-Z'
-                else:
-                    continue
-            elif re.match(r"[a-z]", char):
-                if 'a-z' not in common_pattern.get(index, ''):
-                    common_pattern[index] = common_pattern.get(index, '') + 'a-z'
-                else:
-                    continue
-            elif re.match(r"[А-Я]", char):
-                if 'А-Я' not in common_pattern.get(index, ''):
-                    common_pattern[index] = common_pattern.get(index, '') + 'А-Я'
-                else:
-                    continue
-            elif re.match(r"[а-я]", char):
-                if 'а-я' not in common_pattern.get(index, ''):
-                    common_pattern[index] = common_pattern.get(index, '') + 'а-я'
-                else:
-                    continue
-            else:
-                if char not in common_pattern.get(index, ''):
-                    common_pattern[index] = common_pattern.get(index, '') + char
-    common_pattern_string = ''
-    for _, symbol_regex in sorted(common_pattern.items()):
-        common_pattern_string += '[' + symbol_regex + ']'
-    return common_pattern_string
+    return get_common_regex(update_common_pattern({}, strings))
+
+
+def get_anchored_regex(regex):
+    """
+    Regex matching the whole string for RE2 (used by pyarrow and Spark), which has no \\Z.
+    """
+    return '^(?:' + regex.replace(r'\Z', '') + r')\z'
+
+
+def is_string_class_decided(string_class_matchings, number_of_evaluated_classes, number_of_strings_left, number_of_strings,
+                            max_number_of_strings=None, threshold=STRING_CLASS_THRESHOLD):
+    """
+    Returns True if class of strings chosen by share of matchings above threshold is known before matching the rest of regexes:
+    some class is matched by more than threshold of max_number_of_strings (upper bound of the number of strings including strings
+    added later, by default number_of_strings) or none of classes from number_of_evaluated_classes on can exceed threshold,
+    even if it matches all number_of_strings_left strings not matched yet and all strings added later.
+    """
+    max_number_of_strings = max(max_number_of_strings or 0, number_of_strings)
+    if any(matchings > threshold * max_number_of_strings for matchings in string_class_matchings):
+        return True
+    number_of_strings_to_add = max_number_of_strings - number_of_strings
+    return all(matchings + number_of_strings_left + (1 - threshold) * number_of_strings_to_add <= threshold * number_of_strings
+               for matchings in string_class_matchings[number_of_evaluated_classes:])
+
+
+def get_string_class_matchings(strings, counts=None, is_decided=None):
+    """
+    Returns numbers of strings matching REGEXES_FOR_STRING_CLASSES (every string is counted for the first matched regex).
+    If counts are given, every string is counted as many times as specified in counts.
+    Regexes are matched by pyarrow on the whole array, every next regex only on strings not matched by previous ones.
+    If is_decided is given, it is called with numbers of matchings, the number of matched regexes and the number of strings
+    not matched yet before every regex, matching stops when it returns True (numbers of the rest regexes are left 0).
+    """
+    strings = pa.array(list(strings), type=pa.large_string())
+    counts = asarray(counts, dtype=int64) if counts is not None else ones(len(strings), dtype=int64)
+    matchings = [0] * len(REGEXES_FOR_STRING_CLASSES)
+    for index, regex in enumerate(REGEXES_FOR_STRING_CLASSES):
+        if is_decided is not None and is_decided(matchings, index, int(counts.sum())):
+            break
+        matched_mask = pc.match_substring_regex(strings, get_anchored_regex(regex)).to_numpy(zero_copy_only=False)
+        matchings[index] = int(counts[matched_mask].sum())
+        strings, counts = strings.filter(pa.array(~matched_mask)), counts[~matched_mask]
+    return matchings
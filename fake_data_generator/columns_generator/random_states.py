@@ -0,0 +1,51 @@
+from zlib import crc32
+from numpy.random import SeedSequence, default_rng
+
+MAX_SEED = 2 ** 32
+
+
+def get_seed(generator):
+    return int(generator.integers(MAX_SEED))
+
+
+class ColumnRandomState:
+    """
+    Source of independent numpy Generators for batches of one column: generator of batch k
+    is derived from seed with spawn key (column key, k), so any batch of any column can be regenerated on its own.
+    Column key is computed from column name, so it does not depend on the order of columns.
+    Batch index is increased after every batch and can be set explicitly with set_batch_index.
+    Generator returned by get_column_generator does not depend on batch index and is used for data shared by all batches.
+    """
+    def __init__(self, entropy=None, column_name: str = ''):
+        self.entropy = SeedSequence(entropy).entropy
+        self.column_key = crc32(column_name.encode())
+        self.batch_index = 0
+
+    def set_batch_index(self, batch_index):
+        self.batch_index = batch_index
+
+    def get_generator(self):
+        generator = default_rng(SeedSequence(self.entropy, spawn_key=(self.column_key, self.batch_index)))
+        self.batch_index += 1
+        return generator
+
+    def get_column_generator(self):
+        return default_rng(SeedSequence(self.entropy, spawn_key=(self.column_key,)))
+
+
+class RandomState:
+    """
+    Seed of a table: keeps random states of its columns, so that all of them can be moved to the same batch.
+    """
+    def __init__(self, seed=None):
+        self.entropy = SeedSequence(seed).entropy
+        self.column_random_states = []
+
+    def get_column_random_state(self, column_name):
+        column_random_state = ColumnRandomState(self.entropy, column_name)
+        self.column_random_states.append(column_random_state)
+        return column_random_state
+
+    def set_batch_index(self, batch_index):
+        for column_random_state in self.column_random_states:
+            column_random_state.set_batch_index(batch_index)
@@ -1,13 +1,16 @@
 import re
+import pyarrow as pa
 from datetime import datetime
+from functools import partial
 from loguru import logger
 from fake_data_generator.columns_generator.column import \
     Column, CategoricalColumn, ContinuousColumn, StringFromRegexColumn, CurrentTimestampColumn, \
-    FioInUpperCaseColumn, FioOnlyStartingWithUpperCaseColumn, EmailColumn
+    FioInUpperCaseColumn, FioOnlyStartingWithUpperCaseColumn, EmailColumn, ForeignKeyColumn, JointColumns
 from fake_data_generator.columns_generator.info_for_columns import \
-    get_info_for_categorical_column,\
-    get_info_for_continuous_column,\
-    get_info_for_string_column
+    get_string_class_matchings, is_string_class_decided, STRING_CLASS_THRESHOLD
+from fake_data_generator.columns_generator.accumulators import ColumnAccumulator
+from fake_data_generator.columns_generator.arrow_batches import get_arrow_type
+from fake_data_generator.columns_generator.random_states import RandomState
 from fake_data_generator.columns_generator.generators import \
     get_generator_for_nulls,\
     get_generator_for_categorical_column,\
@@ -18,18 +21,8 @@ from fake_data_generator.columns_generator.generators import \
     get_generator_for_fio_only_starting_with_upper_case_column, \
     get_generator_for_email_column, \
     get_generator_for_incremental_id_column, \
-    get_generator_for_foreign_key_column
-
-
-def get_input_data_type(data_type):
-    if 'decimal' in data_type or 'numeric' in data_type:
-        return 'float'
-    elif 'int' in data_type:
-        return 'int'
-    elif 'date' == data_type:
-        return 'date'
-    elif 'timestamp' in data_type:
-        return 'datetime'
+    get_generator_for_foreign_key_column, \
+    get_generator_for_joint_columns
 
 
 def get_output_data_type(data_type):
@@ -42,119 +35,203 @@ def get_output_data_type(data_type):
     elif 'timestamp' in data_type:
         return 'datetime'
 
-REGEX_FOR_FIO_IN_UPPER_CASE = r'[А-Я]{2,} [А-Я]{2,} [А-Я]{2,}\Z'
-REGEX_FOR_FIO_ONLY_STARTING_WITH_UPPER_CASE = r'[А-Я][а-я]+ [А-Я][а-я]+ [А-Я][а-я]+\Z'
-REGEX_FOR_EMAIL = r'[.A-Za-z0-9_-]+@[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\Z'
 
+def get_output_params(data_type, date_flag=False):
+    if date_flag:
+        return {'date_flag': True}
+    if 'decimal' in data_type:
+        precision = int(re.search(r'decimal\((\d+),(\d+)\)', data_type).groups()[1])
+        return {'precision': precision}
 
-def get_string_column_class(strings):
-    matchings_cnt_fio_in_upper_case = 0
-    matchings_cnt_fio_only_starting_with_upper_case = 0
-    matchings_cnt_email = 0
-    for string in strings:
-        if re.match(REGEX_FOR_FIO_IN_UPPER_CASE, string):
-            matchings_cnt_fio_in_upper_case += 1
-        elif re.match(REGEX_FOR_FIO_ONLY_STARTING_WITH_UPPER_CASE, string):
-            matchings_cnt_fio_only_starting_with_upper_case += 1
-        elif re.match(REGEX_FOR_EMAIL, string):
-            matchings_cnt_email += 1
-    if matchings_cnt_fio_in_upper_case / len(strings) > 0.8:
+
+def get_generator_for_joint_columns_info(joint_columns, random_state=None):
+    data_types = [column.get_data_type() for column in joint_columns.get_columns()]
+    return get_generator_for_joint_columns(dimensions=joint_columns.get_dimensions(),
+                                           cells=joint_columns.get_cells(),
+                                           probabilities=joint_columns.get_probabilities(),
+                                           output_data_types=[get_output_data_type(data_type) for data_type in data_types],
+                                           params_list=[get_output_params(data_type) for data_type in data_types],
+                                           random_state=random_state)
+
+
+def get_string_column_class_by_matchings(string_class_matchings, number_of_strings):
+    if number_of_strings == 0:
+        return None
+    matchings_cnt_fio_in_upper_case, matchings_cnt_fio_only_starting_with_upper_case, matchings_cnt_email = string_class_matchings
+    if matchings_cnt_fio_in_upper_case / number_of_strings > STRING_CLASS_THRESHOLD:
         return FioInUpperCaseColumn
-    elif matchings_cnt_fio_only_starting_with_upper_case / len(strings) > 0.8:
+    elif matchings_cnt_fio_only_starting_with_upper_case / number_of_strings > STRING_CLASS_THRESHOLD:
         return FioOnlyStartingWithUpperCaseColumn
-    elif matchings_cnt_email / len(strings) > 0.8:
+    elif matchings_cnt_email / number_of_strings > STRING_CLASS_THRESHOLD:
         return EmailColumn
 
 
-def get_rich_column_info(column_values,
-                         column_info,
-                         number_of_intervals,
-                         categorical_threshold):
+def get_string_column_class(strings):
+    strings = list(strings)
+    is_decided = partial(is_string_class_decided, number_of_strings=len(strings))
+    return get_string_column_class_by_matchings(get_string_class_matchings(strings, is_decided=is_decided), len(strings))
+
+
+def get_rich_column_info(column_values=None,
+                         column_info=None,
+                         number_of_intervals=None,
+                         categorical_threshold=None,
+                         column_accumulator=None,
+                         random_state=None,
+                         conn=None):
+    """
+    Builds column info with set generator from column values or, if column_accumulator is given,
+    from ColumnAccumulator fed with column values chunk by chunk.
+    random_state is ColumnRandomState passed to the generator, conn is used by generators of foreign keys to load parent keys.
+    """
     column_data_type = column_info.get_data_type()
     column_name = column_info.get_column_name()
-    categorical_column_flag = (isinstance(column_info, CategoricalColumn) or (column_values.nunique() / column_values.count() < categorical_threshold) or column_values.nunique() in [0, 1]) and \
+    if column_accumulator is None:
+        column_accumulator = ColumnAccumulator(column_data_type,
+                                               stop_on_overflow=not isinstance(column_info, CategoricalColumn),
+                                               max_number_of_strings=len(column_values)).update(column_values)
+    number_of_unique_values = column_accumulator.get_number_of_unique_values()
+    number_of_values = column_accumulator.get_number_of_values()
+    categorical_column_flag = (isinstance(column_info, CategoricalColumn) or (number_of_values != 0 and number_of_unique_values / number_of_values < categorical_threshold) or number_of_unique_values in [0, 1]) and \
         'decimal' not in column_data_type and 'numeric' not in column_data_type and type(column_info) in [Column, CategoricalColumn]
+    if categorical_column_flag and column_accumulator.categorical.is_overflowed and column_accumulator.categorical.stop_on_overflow:
+        logger.warning(f'Column "{column_name}" has {number_of_unique_values} unique values of {number_of_values}, '
+                       f'but more than max_number_of_categories of them, so it is not considered categorical')
+        categorical_column_flag = False
 
     if categorical_column_flag:
         logger.info(f'Column "{column_name}" — CATEGORICAL COLUMN')
         if not isinstance(column_info, CategoricalColumn):
             column_info = CategoricalColumn(column_name=column_name, data_type=column_data_type)
         if column_info.get_values() is None or column_info.get_probabilities() is None:
-            values, probabilities = get_info_for_categorical_column(column_values)
+            values, probabilities = column_accumulator.categorical.get_values_and_probabilities()
             column_info.set_values(values)
             column_info.set_probabilities(probabilities)
         generator = get_generator_for_categorical_column(values=column_info.get_values(),
-                                                         probabilities=column_info.get_probabilities())
+                                                         probabilities=column_info.get_probabilities(),
+                                                         random_state=random_state)
+
+    elif isinstance(column_info, ForeignKeyColumn):
+        logger.info(f'Column "{column_name}" — FOREIGN KEY COLUMN')
+        observed_distribution_flag = column_info.get_distribution() == 'observed'
+        generator = get_generator_for_foreign_key_column(conn,
+                                                         column_info.get_foreign_key_table_name(),
+                                                         column_info.get_foreign_key_column_name(),
+                                                         random_state,
+                                                         column_info.get_max_number_of_keys(),
+                                                         column_info.get_keys_cache_path(),
+                                                         column_info.get_reload_interval(),
+                                                         column_info.get_fan_out_values() if observed_distribution_flag else None,
+                                                         column_info.get_fan_out_probabilities())
 
     elif column_data_type == 'string' or 'varchar' in column_data_type:
         detected_string_class = None
-        if not isinstance(column_info, StringFromRegexColumn):
-            detected_string_class = get_string_column_class(column_values.dropna())
+        if isinstance(column_info, (FioInUpperCaseColumn, FioOnlyStartingWithUpperCaseColumn, EmailColumn)):
+            detected_string_class = type(column_info)
+        elif not isinstance(column_info, StringFromRegexColumn):
+            detected_string_class = get_string_column_class_by_matchings(column_accumulator.string.string_class_matchings,
+                                                                         column_accumulator.string.number_of_strings)
             if detected_string_class is not None:
                 column_info = detected_string_class(column_name=column_name, data_type=column_data_type)
-                if FioInUpperCaseColumn == detected_string_class:
-                    logger.info(f'Column "{column_name}" — FIO_IN_UPPER_CASE')
-                    generator = get_generator_for_fio_in_upper_case_column()
-                elif FioOnlyStartingWithUpperCaseColumn == detected_string_class:
-                    logger.info(f'Column "{column_name}" — FIO_ONLY_STARTING_WITH_UPPER_CASE')
-                    generator = get_generator_for_fio_only_starting_with_upper_case_column()
-                elif EmailColumn == detected_string_class:
-                    logger.info(f'Column "{column_name}" — EMAIL')
-                    generator = get_generator_for_email_column()
+        if detected_string_class is not None:
+            pool_size, number_of_unique_values = column_info.get_pool_size(), column_info.get_number_of_unique_values()
+            if FioInUpperCaseColumn == detected_string_class:
+                logger.info(f'Column "{column_name}" — FIO_IN_UPPER_CASE')
+                generator = get_generator_for_fio_in_upper_case_column(random_state, pool_size, number_of_unique_values)
+            elif FioOnlyStartingWithUpperCaseColumn == detected_string_class:
+                logger.info(f'Column "{column_name}" — FIO_ONLY_STARTING_WITH_UPPER_CASE')
+                generator = get_generator_for_fio_only_starting_with_upper_case_column(random_state, pool_size, number_of_unique_values)
+            elif EmailColumn == detected_string_class:
+                logger.info(f'Column "{column_name}" — EMAIL')
+                generator = get_generator_for_email_column(random_state, pool_size, number_of_unique_values)
 
         if detected_string_class is None:
             logger.info(f'Column "{column_name}" — STRING FROM REGEX')
             if not isinstance(column_info, StringFromRegexColumn):
                 column_info = StringFromRegexColumn(column_name=column_name, data_type=column_data_type)
             if column_info.get_common_regex() is None:
-                common_regex = get_info_for_string_column(column_values.dropna())
+                common_regex = column_accumulator.string.get_common_regex()
                 column_info.set_common_regex(common_regex)
-            generator = get_generator_for_string_column(common_regex=column_info.get_common_regex())
+            generator = get_generator_for_string_column(common_regex=column_info.get_common_regex(), random_state=random_state)
 
     elif isinstance(column_info, CurrentTimestampColumn):
         logger.info(f'Column "{column_name}" — CURRENT_TIMESTAMP COLUMN')
         generator = get_generator_for_current_dttm_column()
 
     else:
-        logger.info(f'Column "{column_values.name}" — CONTINUOUS {column_data_type.upper()} COLUMN')
+        logger.info(f'Column "{column_name}" — CONTINUOUS {column_data_type.upper()} COLUMN')
         if not isinstance(column_info, ContinuousColumn):
-            column_info = ContinuousColumn(data_type=column_data_type)
+            column_info = ContinuousColumn(column_name=column_name, data_type=column_data_type)
 
-        params = None
-        if 'decimal' in column_data_type:
-            precision = int(re.search(r'decimal\((\d+),(\d+)\)', column_data_type).groups()[1])
-            params = {'precision': precision}
-        if column_info.get_date_flag():
-            params = {'date_flag': True}
+        params = get_output_params(column_data_type, column_info.get_date_flag())
 
-        if column_info.get_intervals() is None or column_info.get_probabilities():
-            if column_values.nunique() in [0, 1] and 'decimal' in column_data_type:
+        if column_info.get_intervals() is None or column_info.get_probabilities() is None:
+            if number_of_unique_values in [0, 1] and 'decimal' in column_data_type:
                 column_info.set_generator(get_generator_for_nulls())
                 return column_info
-            intervals, probabilities = get_info_for_continuous_column(column_values=column_values,
-                                                                      input_data_type=get_input_data_type(column_data_type),
-                                                                      number_of_intervals=number_of_intervals)
+            intervals, probabilities = column_accumulator.continuous.get_intervals_and_probabilities(number_of_intervals)
             column_info.set_intervals(intervals)
             column_info.set_probabilities(probabilities)
         generator = get_generator_for_continuous_column(intervals=column_info.get_intervals(),
                                                         probabilities=column_info.get_probabilities(),
                                                         output_data_type=get_output_data_type(column_data_type),
-                                                        params=params)
+                                                        params=params,
+                                                        random_state=random_state)
 
     column_info.set_generator(generator)
     return column_info
 
 
-def get_columns_info_with_set_generators(rich_columns_info_dict, conn=None, table_name=None):
+def get_rich_joint_columns_info(joint_columns, joint_accumulator, number_of_intervals, random_state=None):
+    """
+    Builds joint histogram of group of columns from JointAccumulator and sets generator drawing the whole group at once.
+    number_of_intervals of JointColumns (if set) overrides the one of the table.
+    """
+    column_names = joint_columns.get_column_names()
+    logger.info(f'Columns "{", ".join(column_names)}" — JOINT COLUMNS')
+    if joint_columns.get_cells() is None or joint_columns.get_probabilities() is None:
+        dimensions, cells, probabilities = \
+            joint_accumulator.get_dimensions_cells_and_probabilities(joint_columns.get_number_of_intervals() or number_of_intervals)
+        joint_columns.set_dimensions(dimensions)
+        joint_columns.set_cells(cells)
+        joint_columns.set_probabilities(probabilities)
+    joint_columns.set_generator(get_generator_for_joint_columns_info(joint_columns, random_state))
+    return joint_columns
+
+
+def get_columns_info_with_set_generators(rich_columns_info_dict, conn=None, table_name=None, batch_format='pandas', random_state=None,
+                                         provided_foreign_keys=None):
+    """
+    random_state is RandomState of the table, every column gets its own ColumnRandomState from it.
+    provided_foreign_keys is dict {(parent table name, parent column name): keys} of parents generated in the same run.
+    """
+    random_state = random_state or RandomState()
     columns_info_with_set_generators = []
     for column_name, column_info_dict in rich_columns_info_dict.items():
         column_type = column_info_dict.get('type')
         column_data_type = column_info_dict.get('data_type')
-        if column_type == 'CUSTOM_COLUMN':
+        if column_type == 'CUSTOM_COLUMN' or (column_type == 'JOINT' and 'columns' not in column_info_dict):
             continue
+        arrow_type = get_arrow_type(column_data_type) if batch_format == 'arrow' else None
+        column_random_state = random_state.get_column_random_state(column_name)
         generator = None
+        if column_type == 'JOINT':
+            joint_columns = JointColumns(columns=[Column(column_name=joint_column_name,
+                                                         data_type=rich_columns_info_dict[joint_column_name]['data_type'])
+                                                  for joint_column_name in column_info_dict['columns']],
+                                         dimensions=column_info_dict.get('dimensions'),
+                                         cells=column_info_dict.get('cells'),
+                                         probabilities=column_info_dict.get('probabilities'))
+            joint_columns.set_generator(get_generator_for_joint_columns_info(joint_columns, column_random_state))
+            columns_info_with_set_generators.append(joint_columns)
+            continue
+
         if column_type == 'CATEGORICAL':
-            if column_data_type == 'date':
+            if isinstance(column_info_dict.get('values'), pa.Array):
+                values = column_info_dict.get('values')
+                if column_data_type == 'date' or 'timestamp' in column_data_type:
+                    values = values.cast(get_arrow_type(column_data_type))
+            elif column_data_type == 'date':
                 values = list(map(lambda x: datetime.strptime(x, "%Y-%m-%d").date() if isinstance(x, str) else x,
                                   column_info_dict['values']))
             elif 'timestamp' in column_data_type:
@@ -164,7 +241,9 @@ def get_columns_info_with_set_generators(rich_columns_info_dict, conn=None, tabl
                 values = column_info_dict.get('values')
             probabilities = column_info_dict.get('probabilities')
             generator = get_generator_for_categorical_column(values=values,
-                                                             probabilities=probabilities)
+                                                             probabilities=probabilities,
+                                                             arrow_type=arrow_type,
+                                                             random_state=column_random_state)
 
         elif column_type == 'CONTINUES':
             intervals = column_info_dict.get('intervals')
@@ -172,32 +251,35 @@ def get_columns_info_with_set_generators(rich_columns_info_dict, conn=None, tabl
             if intervals is None or probabilities is None:
                 generator = get_generator_for_nulls()
             else:
-                params = None
-                if 'decimal' in column_data_type:
-                    precision = int(re.search(r'decimal\((\d+),(\d+)\)', column_data_type).groups()[1])
-                    params = {'precision': precision}
-                if column_info_dict.get('date_flag'):
-                    params = {'date_flag': True}
-
+                params = get_output_params(column_data_type, column_info_dict.get('date_flag'))
                 generator = get_generator_for_continuous_column(intervals=intervals,
                                                                 probabilities=probabilities,
                                                                 output_data_type=get_output_data_type(column_data_type),
-                                                                params=params)
+                                                                params=params,
+                                                                arrow_type=arrow_type,
+                                                                random_state=column_random_state)
         elif column_type == 'STRING_FROM_REGEX':
             common_regex = column_info_dict.get('common_regex')
-            generator = get_generator_for_string_column(common_regex=common_regex)
+            generator = get_generator_for_string_column(common_regex=common_regex, arrow_type=arrow_type,
+                                                        random_state=column_random_state)
 
         elif column_type == 'CURRENT_TIMESTAMP':
             generator = get_generator_for_current_dttm_column()
 
         elif column_type == 'FIO_IN_UPPER_CASE':
-            generator = get_generator_for_fio_in_upper_case_column()
+            generator = get_generator_for_fio_in_upper_case_column(column_random_state,
+                                                                   column_info_dict.get('pool_size'),
+                                                                   column_info_dict.get('number_of_unique_values'))
 
         elif column_type == 'FIO_ONLY_STARTING_WITH_UPPER_CASE':
-            generator = get_generator_for_fio_only_starting_with_upper_case_column()
+            generator = get_generator_for_fio_only_starting_with_upper_case_column(column_random_state,
+                                                                                   column_info_dict.get('pool_size'),
+                                                                                   column_info_dict.get('number_of_unique_values'))
 
         elif column_type == 'EMAIL':
-            generator = get_generator_for_email_column()
+            generator = get_generator_for_email_column(column_random_state,
+                                                       column_info_dict.get('pool_size'),
+                                                       column_info_dict.get('number_of_unique_values'))
 
         elif column_type == 'INCREMENTAL_ID':
             generator = get_generator_for_incremental_id_column(conn=conn,
@@ -206,7 +288,16 @@ def get_columns_info_with_set_generators(rich_columns_info_dict, conn=None, tabl
         elif column_type == 'FOREIGN_KEY':
             foreign_key_table_name = column_info_dict.get('foreign_key_table_name')
             foreign_key_column_name = column_info_dict.get('foreign_key_column_name')
-            generator = get_generator_for_foreign_key_column(conn, foreign_key_table_name, foreign_key_column_name)
+            observed_distribution_flag = column_info_dict.get('distribution') == 'observed'
+            generator = get_generator_for_foreign_key_column(conn, foreign_key_table_name, foreign_key_column_name,
+                                                             random_state=column_random_state,
+                                                             max_number_of_keys=column_info_dict.get('max_number_of_keys'),
+                                                             keys_cache_path=column_info_dict.get('keys_cache_path'),
+                                                             reload_interval=column_info_dict.get('reload_interval'),
+                                                             fan_out_values=column_info_dict.get('fan_out_values') if observed_distribution_flag else None,
+                                                             fan_out_probabilities=column_info_dict.get('fan_out_probabilities'),
+                                                             provided_keys=(provided_foreign_keys or {}).get((foreign_key_table_name,
+                                                                                                              foreign_key_column_name)))
 
         column_info = Column(column_name=column_name, data_type=column_data_type)
         column_info.set_generator(generator)
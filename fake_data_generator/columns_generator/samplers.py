@@ -0,0 +1,64 @@
+from numpy import arange, asarray, bincount, cumsum, int64, ones, searchsorted, where
+
+MAX_NUMBER_OF_ALIAS_ROUNDS = 64
+MAX_NUMBER_OF_SEQUENTIAL_ALIAS_COLUMNS = 10000
+ALIAS_TOLERANCE = 1e-12
+
+
+def fill_alias_table_sequentially(scaled_probabilities, thresholds, aliases, small_indices, large_indices):
+    small_indices, large_indices = small_indices.tolist(), large_indices.tolist()
+    while small_indices and large_indices:
+        small_index, large_index = small_indices.pop(), large_indices[-1]
+        thresholds[small_index] = scaled_probabilities[small_index]
+        aliases[small_index] = large_index
+        scaled_probabilities[large_index] -= 1 - scaled_probabilities[small_index]
+        if scaled_probabilities[large_index] < 1:
+            small_indices.append(large_indices.pop())
+
+
+def get_alias_table(probabilities):
+    """
+    Builds table of Walker's alias method in vectorized rounds instead of pairing columns one by one:
+    in every round each small column (scaled probability below 1) gets an alias among large columns,
+    small columns are spread over large columns by cumulative sums of their deficits and surpluses.
+    Large columns dropping below 1 become small columns of the next round. When few columns are left,
+    they are paired one by one as in Vose's algorithm.
+    """
+    probabilities = asarray(probabilities, dtype=float)
+    number_of_values = len(probabilities)
+    scaled_probabilities = probabilities * number_of_values / probabilities.sum()
+    thresholds = ones(number_of_values)
+    aliases = arange(number_of_values)
+    active_indices = arange(number_of_values)
+    for _ in range(MAX_NUMBER_OF_ALIAS_ROUNDS):
+        active_indices = active_indices[abs(scaled_probabilities[active_indices] - 1) > ALIAS_TOLERANCE]
+        is_small = scaled_probabilities[active_indices] < 1
+        small_indices, large_indices = active_indices[is_small], active_indices[~is_small]
+        if len(small_indices) == 0 or len(large_indices) == 0:
+            break
+        if len(active_indices) <= MAX_NUMBER_OF_SEQUENTIAL_ALIAS_COLUMNS:
+            fill_alias_table_sequentially(scaled_probabilities, thresholds, aliases, small_indices, large_indices)
+            break
+        deficits = 1 - scaled_probabilities[small_indices]
+        large_positions = searchsorted(cumsum(scaled_probabilities[large_indices] - 1), cumsum(deficits) - deficits, side='right')
+        large_positions = large_positions.clip(max=len(large_indices) - 1)
+        thresholds[small_indices] = scaled_probabilities[small_indices]
+        aliases[small_indices] = large_indices[large_positions]
+        large_probabilities = scaled_probabilities[large_indices] - bincount(large_positions, weights=deficits, minlength=len(large_indices))
+        scaled_probabilities[large_indices] = large_probabilities.clip(min=0)
+        active_indices = large_indices
+    return thresholds, aliases
+
+
+class AliasSampler:
+    """
+    Draws indices of values with given probabilities in O(1) per index: one uniform number chooses a column of alias table
+    and is compared with the threshold of the column. The table is built once, so batches do not revalidate probabilities.
+    """
+    def __init__(self, probabilities):
+        self.thresholds, self.aliases = get_alias_table(probabilities)
+
+    def sample(self, generator, size):
+        uniform_values = generator.random(size) * len(self.thresholds)
+        column_indices = uniform_values.astype(int64).clip(max=len(self.thresholds) - 1)
+        return where(uniform_values - column_indices < self.thresholds[column_indices], column_indices, self.aliases[column_indices])
@@ -0,0 +1,18 @@
+import sys
+
+
+def is_sqlalchemy_engine(conn):
+    """
+    sqlalchemy is imported only when it is used: conn can not be an engine if sqlalchemy was not imported by the caller.
+    """
+    if 'sqlalchemy' not in sys.modules:
+        return False
+    import sqlalchemy
+    return isinstance(conn, sqlalchemy.engine.base.Engine)
+
+
+def is_sqlalchemy_url(conn):
+    if 'sqlalchemy' not in sys.modules:
+        return False
+    import sqlalchemy
+    return isinstance(conn, sqlalchemy.engine.URL)
@@ -1,3 +1,6 @@
 from fake_data_generator.sources_formats.generate_fake_table import generate_fake_table
 from fake_data_generator.sources_formats.generate_table_profile import generate_table_profile
 from fake_data_generator.sources_formats.generate_table_from_profile import generate_table_from_profile
+from fake_data_generator.sources_formats.generate_tables_from_profiles import generate_tables_from_profiles
+from fake_data_generator.sources_formats.file_sinks import FileSink
+from fake_data_generator.sources_formats.metrics import GenerationMetrics
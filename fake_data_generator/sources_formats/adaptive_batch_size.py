@@ -0,0 +1,96 @@
+import pyarrow as pa
+from loguru import logger
+
+ADAPTIVE_BATCH_SIZE = 'adaptive'
+INITIAL_ADAPTIVE_BATCH_SIZE = 100
+BATCH_SIZE_GROWTH_FACTOR = 2
+NUMBER_OF_BATCHES_PER_MEASUREMENT = 2
+MIN_THROUGHPUT_GAIN = 0.05
+MIN_THROUGHPUT_RATIO_TO_KEEP_BATCH_SIZE = 0.5
+DEFAULT_MAX_BATCH_MEMORY_BYTES = 256 * 2 ** 20
+
+
+def get_batch_memory_bytes(fake_data_in_df):
+    if isinstance(fake_data_in_df, pa.RecordBatch):
+        return fake_data_in_df.nbytes
+    return int(fake_data_in_df.memory_usage(deep=True, index=False).sum())
+
+
+def check_batch_size(batch_size, queue_size=None, number_of_workers=1, number_of_partitions=None):
+    if batch_size == ADAPTIVE_BATCH_SIZE and (queue_size is not None or number_of_workers > 1 or number_of_partitions is not None):
+        raise ValueError('Adaptive batch size can be used only without queue_size, number_of_workers and number_of_partitions')
+
+
+class AdaptiveBatchSize:
+    """
+    Chooses batch size by measured throughput (rows per second of generation and insertion of batches).
+    Starting from initial_batch_size, batch size is multiplied by BATCH_SIZE_GROWTH_FACTOR while throughput grows
+    by more than MIN_THROUGHPUT_GAIN, then the best measured size is kept. Every size is measured on
+    NUMBER_OF_BATCHES_PER_MEASUREMENT batches, the first batch of the run is not measured (it includes loading of keys, pools etc.).
+    If throughput of the kept size drops below MIN_THROUGHPUT_RATIO_TO_KEEP_BATCH_SIZE of measured one, the search starts again
+    from half of the kept size. Batch size never exceeds max_batch_memory_bytes divided by bytes per row of generated batches,
+    which is estimated on the first batch of every size.
+    Values generated with seed depend on batch sizes, so runs with adaptive batch size are not reproducible: the chosen size is logged
+    to be passed as batch_size.
+    """
+    def __init__(self, table_name, max_batch_memory_bytes=DEFAULT_MAX_BATCH_MEMORY_BYTES, initial_batch_size=INITIAL_ADAPTIVE_BATCH_SIZE):
+        self.table_name = table_name
+        self.max_batch_memory_bytes = max_batch_memory_bytes or DEFAULT_MAX_BATCH_MEMORY_BYTES
+        self.batch_size = initial_batch_size
+        self.bytes_per_row = None
+        self.is_searching = True
+        self.is_first_batch = True
+        self.best_batch_size, self.best_throughput = None, 0.0
+        self.measured_rows, self.measured_seconds, self.number_of_measured_batches = 0, 0.0, 0
+
+    def get_max_batch_size(self):
+        if self.bytes_per_row is None:
+            return None
+        return max(1, int(self.max_batch_memory_bytes / self.bytes_per_row))
+
+    def get_batch_size(self):
+        return self.batch_size
+
+    def set_batch_size(self, batch_size):
+        max_batch_size = self.get_max_batch_size()
+        self.batch_size = max(1, min(batch_size, max_batch_size) if max_batch_size is not None else batch_size)
+        self.measured_rows, self.measured_seconds, self.number_of_measured_batches = 0, 0.0, 0
+
+    def update(self, fake_data_in_df, seconds):
+        """
+        Takes generated batch and seconds spent on its generation and insertion, changes batch size for the next batches.
+        """
+        if self.number_of_measured_batches == 0:
+            self.bytes_per_row = max(self.bytes_per_row or 0, get_batch_memory_bytes(fake_data_in_df) / max(len(fake_data_in_df), 1))
+            if self.get_max_batch_size() < self.batch_size:
+                self.set_batch_size(self.batch_size)
+        if self.is_first_batch:
+            self.is_first_batch = False
+            return
+        if len(fake_data_in_df) < self.batch_size:
+            return
+        self.measured_rows += len(fake_data_in_df)
+        self.measured_seconds += seconds
+        self.number_of_measured_batches += 1
+        if self.number_of_measured_batches < NUMBER_OF_BATCHES_PER_MEASUREMENT:
+            return
+        throughput = self.measured_rows / max(self.measured_seconds, 1e-9)
+        if not self.is_searching:
+            if throughput < MIN_THROUGHPUT_RATIO_TO_KEEP_BATCH_SIZE * self.best_throughput:
+                logger.info(f'Throughput of {self.table_name} dropped to {throughput:.0f} rows/sec, batch size is searched again.')
+                self.is_searching = True
+                self.best_batch_size, self.best_throughput = None, 0.0
+                self.set_batch_size(max(1, self.batch_size // BATCH_SIZE_GROWTH_FACTOR))
+            else:
+                self.set_batch_size(self.batch_size)
+            return
+        if throughput > (1 + MIN_THROUGHPUT_GAIN) * self.best_throughput:
+            self.best_batch_size, self.best_throughput = self.batch_size, throughput
+            if self.get_max_batch_size() is None or self.batch_size * BATCH_SIZE_GROWTH_FACTOR <= self.get_max_batch_size():
+                self.set_batch_size(self.batch_size * BATCH_SIZE_GROWTH_FACTOR)
+                return
+        self.is_searching = False
+        self.set_batch_size(self.best_batch_size)
+        logger.info(f'Batch size {self.batch_size} was chosen for {self.table_name}: {self.best_throughput:.0f} rows/sec, '
+                    f'{self.bytes_per_row:.0f} bytes per row (at most {self.get_max_batch_size()} rows per batch). '
+                    f'Pass batch_size={self.batch_size} to use it in later runs.')
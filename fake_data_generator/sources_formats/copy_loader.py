@@ -0,0 +1,84 @@
+import pyarrow as pa
+from contextlib import contextmanager
+from io import StringIO, BytesIO
+from pandas import Series
+from pyarrow.csv import write_csv, WriteOptions
+from fake_data_generator.connections import is_sqlalchemy_engine
+
+INSERTION_METHODS = ['copy', 'insert']
+
+
+def get_insertion_method(conn, insertion_method=None):
+    is_postgresql = is_sqlalchemy_engine(conn) and conn.name == 'postgresql'
+    if insertion_method is None:
+        return 'copy' if is_postgresql else 'insert'
+    if insertion_method not in INSERTION_METHODS:
+        raise ValueError(f'Unknown insertion method "{insertion_method}", expected one of {INSERTION_METHODS}')
+    if insertion_method == 'copy' and not is_postgresql:
+        raise ValueError('Insertion method "copy" is supported only for postgresql engines')
+    return insertion_method
+
+
+@contextmanager
+def open_copy_connection(conn, insertion_method=None):
+    """
+    Yields raw DBAPI connection reused by COPY for all batches
+    or None if data should be inserted with DataFrame.to_sql / saveAsTable.
+    """
+    if get_insertion_method(conn, insertion_method) != 'copy':
+        yield None
+        return
+    copy_connection = conn.raw_connection()
+    try:
+        yield copy_connection
+    finally:
+        copy_connection.close()
+
+
+def get_csv_column_values(column_values: Series) -> Series:
+    null_mask = column_values.isna()
+    csv_column_values = column_values.astype(str)
+    if column_values.dtype == object:
+        csv_column_values = '"' + csv_column_values.str.replace('"', '""', regex=False) + '"'
+    return csv_column_values.where(~null_mask, '')
+
+
+def get_csv_for_copy(fake_data_in_df):
+    """
+    Encodes DataFrame in CSV format of COPY: NULL is an unquoted empty value, while every non-null value
+    of object columns (strings, decimals, dates) is quoted, so empty strings stay empty strings.
+    Numeric, boolean and datetime64 columns are written unquoted.
+    RecordBatch is encoded by Arrow CSV writer into bytes with the same rules (only strings are quoted).
+    """
+    if isinstance(fake_data_in_df, pa.RecordBatch):
+        csv_buffer = BytesIO()
+        write_csv(fake_data_in_df, csv_buffer, WriteOptions(include_header=False))
+        return csv_buffer.getvalue()
+    if fake_data_in_df.empty:
+        return ''
+    csv_columns = [get_csv_column_values(column_values).reset_index(drop=True) for _, column_values in fake_data_in_df.items()]
+    csv_lines = csv_columns[0].str.cat(csv_columns[1:], sep=',') if len(csv_columns) > 1 else csv_columns[0]
+    return '\n'.join(csv_lines) + '\n'
+
+
+def copy_fake_data(copy_connection, dest_table_name_with_schema, fake_data_in_df):
+    if isinstance(fake_data_in_df, pa.RecordBatch):
+        column_names = ', '.join(f'"{column_name}"' for column_name in fake_data_in_df.schema.names)
+    else:
+        column_names = ', '.join(f'"{column_name}"' for column_name in fake_data_in_df.columns)
+    copy_query = f'COPY {dest_table_name_with_schema} ({column_names}) FROM STDIN WITH (FORMAT csv)'
+    csv_data = get_csv_for_copy(fake_data_in_df)
+    csv_buffer = BytesIO(csv_data) if isinstance(csv_data, bytes) else StringIO(csv_data)
+    cursor = copy_connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(copy_query, csv_buffer)
+        else:
+            with cursor.copy(copy_query) as copy:
+                copy.write(csv_buffer.getvalue())
+        copy_connection.commit()
+    except BaseException:
+        copy_connection.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,121 @@
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow.csv import CSVWriter, WriteOptions
+from loguru import logger
+from fake_data_generator.columns_generator.arrow_batches import to_arrow_array
+
+FILE_FORMATS = ['parquet', 'csv', 'jsonl']
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'zstd': '.zst', 'lz4': '.lz4'}
+
+
+def get_json_lines(table):
+    for index, field in enumerate(table.schema):
+        if pa.types.is_date(field.type):
+            table = table.set_column(index, field.name, table.column(index).cast(pa.string()))
+    json_lines = table.to_pandas().to_json(orient='records', lines=True, force_ascii=False,
+                                           date_format='iso', date_unit='us', default_handler=str)
+    return json_lines if json_lines.endswith('\n') else json_lines + '\n'
+
+
+class FileSink:
+    """
+    Destination that writes generated batches into local (or mounted) files instead of a database.
+    It is passed as conn to generate_table_from_profile, files are named after dest_table_name_with_schema.
+    Parquet files get one row group per batch, csv files get a header, jsonl files get one json object per row.
+    A new file is started when current one has max_rows_per_file rows (batches are split between files)
+    or, checked after every batch, at least max_bytes_per_file bytes.
+    """
+    def __init__(self,
+                 directory: str,
+                 file_format: str = 'parquet',
+                 max_rows_per_file: int = None,
+                 max_bytes_per_file: int = None,
+                 compression: str = None):
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f'Unknown file format "{file_format}", expected one of {FILE_FORMATS}')
+        if file_format != 'parquet' and compression is not None and compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f'Unknown compression "{compression}" for {file_format} files, '
+                             f'expected one of {list(COMPRESSION_EXTENSIONS)}')
+        self.directory = directory
+        self.file_format = file_format
+        self.max_rows_per_file = max_rows_per_file
+        self.max_bytes_per_file = max_bytes_per_file
+        self.compression = compression
+        self.open_files = {}
+        self.file_indices = {}
+        self.schemas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_file_path(self, dest_table_name_with_schema):
+        extension = self.file_format
+        if self.file_format != 'parquet' and self.compression is not None:
+            extension += COMPRESSION_EXTENSIONS[self.compression]
+        file_index = self.file_indices.get(dest_table_name_with_schema, 0)
+        self.file_indices[dest_table_name_with_schema] = file_index + 1
+        return os.path.join(self.directory, f'{dest_table_name_with_schema}-{file_index:05d}.{extension}')
+
+    def open_file(self, dest_table_name_with_schema, schema):
+        os.makedirs(self.directory, exist_ok=True)
+        file_path = self.get_file_path(dest_table_name_with_schema)
+        if self.file_format == 'parquet':
+            stream = None
+            writer = pq.ParquetWriter(file_path, schema, compression=self.compression or 'snappy')
+        else:
+            stream = pa.OSFile(file_path, 'wb')
+            if self.compression is not None:
+                stream = pa.CompressedOutputStream(stream, self.compression)
+            writer = CSVWriter(stream, schema, write_options=WriteOptions()) if self.file_format == 'csv' else None
+        self.open_files[dest_table_name_with_schema] = {'path': file_path, 'schema': schema, 'writer': writer,
+                                                        'stream': stream, 'number_of_rows': 0}
+        logger.info(f'File {file_path} was opened.')
+        return self.open_files[dest_table_name_with_schema]
+
+    def close_file(self, dest_table_name_with_schema):
+        open_file = self.open_files.pop(dest_table_name_with_schema)
+        if open_file['writer'] is not None:
+            open_file['writer'].close()
+        if open_file['stream'] is not None:
+            open_file['stream'].close()
+        logger.info(f'File {open_file["path"]} was closed. Number of rows written: {open_file["number_of_rows"]}')
+
+    def close(self):
+        for dest_table_name_with_schema in list(self.open_files):
+            self.close_file(dest_table_name_with_schema)
+
+    def write_batch(self, dest_table_name_with_schema, fake_data_in_df, arrow_types=None):
+        """
+        Writes pandas DataFrame or pyarrow RecordBatch. Pandas columns are converted with given arrow types
+        (types are inferred for columns missing in arrow_types), all batches are cast to schema of the first batch written for the table.
+        """
+        if not isinstance(fake_data_in_df, pa.RecordBatch):
+            arrow_types = arrow_types or {}
+            fake_data_in_df = pa.RecordBatch.from_arrays([to_arrow_array(column_values, arrow_types.get(column_name))
+                                                          for column_name, column_values in fake_data_in_df.items()],
+                                                         names=list(fake_data_in_df.columns))
+        table = pa.Table.from_batches([fake_data_in_df])
+        while table.num_rows > 0:
+            open_file = self.open_files.get(dest_table_name_with_schema) or \
+                self.open_file(dest_table_name_with_schema, self.schemas.setdefault(dest_table_name_with_schema, table.schema))
+            number_of_rows_to_write = table.num_rows
+            if self.max_rows_per_file is not None:
+                number_of_rows_to_write = min(number_of_rows_to_write, self.max_rows_per_file - open_file['number_of_rows'])
+            self.write_table(open_file, table.slice(0, number_of_rows_to_write))
+            table = table.slice(number_of_rows_to_write)
+            if (self.max_rows_per_file is not None and open_file['number_of_rows'] >= self.max_rows_per_file) or \
+                    (self.max_bytes_per_file is not None and os.path.getsize(open_file['path']) >= self.max_bytes_per_file):
+                self.close_file(dest_table_name_with_schema)
+
+    def write_table(self, open_file, table):
+        if not table.schema.equals(open_file['schema']):
+            table = table.cast(open_file['schema'])
+        if self.file_format in ['parquet', 'csv']:
+            open_file['writer'].write_table(table)
+        else:
+            open_file['stream'].write(get_json_lines(table).encode())
+        open_file['number_of_rows'] += table.num_rows
@@ -1,5 +1,7 @@
 from fake_data_generator.sources_formats.helper_functions import \
     get_rich_columns_info, create_table_if_not_exists, execute_insertion
+from fake_data_generator.sources_formats.pipelined_insertion import execute_pipelined_insertion
+from fake_data_generator.sources_formats.adaptive_batch_size import check_batch_size
 
 
 def generate_fake_table(conn,
@@ -11,9 +13,27 @@ def generate_fake_table(conn,
                         columns_to_include: list = None,
                         batch_size=100,
                         number_of_intervals=99,
-                        categorical_threshold=0.2):
+                        categorical_threshold=0.2,
+                        queue_size=None,
+                        insertion_method=None,
+                        chunk_size=100000,
+                        sampling_method='system',
+                        max_number_of_categories=100000,
+                        number_of_bins=2048,
+                        batch_format='pandas',
+                        seed=None,
+                        metrics=None,
+                        max_batch_memory_bytes=None,
+                        number_of_profiling_workers=1):
+    check_batch_size(batch_size, queue_size)
     rich_columns_info = get_rich_columns_info(conn, source_table_name_with_schema,
                                               number_of_rows_from_which_to_create_pattern, columns_info, columns_to_include,
-                                              number_of_intervals, categorical_threshold)
+                                              number_of_intervals, categorical_threshold, chunk_size, sampling_method,
+                                              max_number_of_categories, number_of_bins, seed, number_of_profiling_workers)
     create_table_if_not_exists(conn, source_table_name_with_schema, dest_table_name_with_schema, columns_to_include)
-    execute_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert, rich_columns_info, batch_size)
+    if queue_size is not None:
+        execute_pipelined_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert, rich_columns_info, batch_size, queue_size,
+                                    insertion_method, batch_format, metrics)
+    else:
+        execute_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert, rich_columns_info, batch_size, insertion_method,
+                          batch_format, metrics, max_batch_memory_bytes)
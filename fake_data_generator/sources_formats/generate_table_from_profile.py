@@ -1,20 +1,24 @@
-import json
 from fake_data_generator.columns_generator import get_columns_info_with_set_generators
 from fake_data_generator.columns_generator.column import Column, MultipleColumns
+from fake_data_generator.columns_generator.random_states import RandomState
 from fake_data_generator.sources_formats.helper_functions import \
     get_create_query, create_table_if_not_exists, execute_insertion
+from fake_data_generator.sources_formats.adaptive_batch_size import check_batch_size
+from fake_data_generator.sources_formats.file_sinks import FileSink
+from fake_data_generator.sources_formats.profile_files import load_profile
+from fake_data_generator.sources_formats.parallel_insertion import execute_parallel_insertion
+from fake_data_generator.sources_formats.pipelined_insertion import execute_pipelined_insertion
+from fake_data_generator.sources_formats.spark_generation import execute_spark_insertion
 
 
-def generate_table_from_profile(conn,
-                                dest_table_name_with_schema: str,
-                                number_of_rows_to_insert: int,
-                                source_table_profile_path: str = None,
-                                columns_info=None,
-                                batch_size=100):
+def get_rich_columns_info_dict(source_table_profile_path=None, columns_info=None, columns_to_include=None):
+    """
+    Loads profile dict (only columns_to_include, if given) and updates it with columns_info.
+    Returns the dict and columns with generators passed as parameter.
+    """
     rich_columns_info_dict = {}
     if source_table_profile_path is not None:
-        with open(source_table_profile_path, 'r') as file:
-            rich_columns_info_dict = json.load(file)
+        rich_columns_info_dict = load_profile(source_table_profile_path, columns_to_include)
 
     columns_with_generators_as_parameter = []
     for column_info in columns_info or []:
@@ -26,11 +30,51 @@ def generate_table_from_profile(conn,
             if type(column_info) == Column and column_info.get_generator() is not None:
                 columns_with_generators_as_parameter.append(column_info)
             rich_columns_info_dict.update(column_info.get_as_dict())
+    return rich_columns_info_dict, columns_with_generators_as_parameter
+
 
+def generate_table_from_profile(conn,
+                                dest_table_name_with_schema: str,
+                                number_of_rows_to_insert: int,
+                                source_table_profile_path: str = None,
+                                columns_info=None,
+                                batch_size=100,
+                                number_of_workers=1,
+                                queue_size=None,
+                                insertion_method=None,
+                                number_of_partitions=None,
+                                batch_format='pandas',
+                                seed=None,
+                                columns_to_include: list = None,
+                                metrics=None,
+                                max_batch_memory_bytes=None):
+    check_batch_size(batch_size, queue_size, number_of_workers, number_of_partitions)
+    rich_columns_info_dict, columns_with_generators_as_parameter = get_rich_columns_info_dict(source_table_profile_path, columns_info,
+                                                                                              columns_to_include)
     create_table_if_not_exists(conn=conn,
                                dest_table_name_with_schema=dest_table_name_with_schema,
                                create_query=get_create_query(dest_table_name_with_schema, rich_columns_info_dict))
 
-    columns_with_set_generators = get_columns_info_with_set_generators(rich_columns_info_dict, conn, dest_table_name_with_schema)
-    execute_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert,
-                      columns_with_set_generators + columns_with_generators_as_parameter, batch_size)
+    try:
+        if number_of_partitions is not None:
+            execute_spark_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert,
+                                    rich_columns_info_dict, columns_with_generators_as_parameter, batch_size, number_of_partitions,
+                                    seed, metrics)
+        elif number_of_workers > 1:
+            execute_parallel_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert,
+                                       rich_columns_info_dict, columns_with_generators_as_parameter, batch_size, number_of_workers,
+                                       insertion_method, batch_format, seed, metrics)
+        else:
+            columns_with_set_generators = get_columns_info_with_set_generators(rich_columns_info_dict, conn, dest_table_name_with_schema,
+                                                                               batch_format, RandomState(seed))
+            if queue_size is not None:
+                execute_pipelined_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert,
+                                            columns_with_set_generators + columns_with_generators_as_parameter, batch_size, queue_size,
+                                            insertion_method, batch_format, metrics)
+            else:
+                execute_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert,
+                                  columns_with_set_generators + columns_with_generators_as_parameter, batch_size, insertion_method,
+                                  batch_format, metrics, max_batch_memory_bytes)
+    finally:
+        if isinstance(conn, FileSink):
+            conn.close()
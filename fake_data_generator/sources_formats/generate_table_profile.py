@@ -1,6 +1,6 @@
-import json
 from loguru import logger
 from fake_data_generator.sources_formats.helper_functions import get_rich_columns_info
+from fake_data_generator.sources_formats.profile_files import save_profile
 
 
 def generate_table_profile(output_table_profile_path: str,
@@ -10,19 +10,30 @@ def generate_table_profile(output_table_profile_path: str,
                            columns_info: list = None,
                            columns_to_include: list = None,
                            number_of_intervals=5,
-                           categorical_threshold=0.2):
+                           categorical_threshold=0.2,
+                           chunk_size=100000,
+                           sampling_method='system',
+                           max_number_of_categories=100000,
+                           number_of_bins=2048,
+                           seed=None,
+                           number_of_profiling_workers=1):
     rich_columns_info = get_rich_columns_info(conn=conn,
                                               source_table_name_with_schema=source_table_name_with_schema,
                                               number_of_rows_from_which_to_create_pattern=number_of_rows_from_which_to_create_pattern,
                                               columns_info=columns_info,
                                               columns_to_include=columns_to_include,
                                               number_of_intervals=number_of_intervals,
-                                              categorical_threshold=categorical_threshold)
+                                              categorical_threshold=categorical_threshold,
+                                              chunk_size=chunk_size,
+                                              sampling_method=sampling_method,
+                                              max_number_of_categories=max_number_of_categories,
+                                              number_of_bins=number_of_bins,
+                                              seed=seed,
+                                              number_of_profiling_workers=number_of_profiling_workers)
 
     dict_to_dump = {}
     for column_info in rich_columns_info:
         dict_to_dump.update(column_info.get_as_dict())
 
-    with open(output_table_profile_path, 'w') as file:
-        json.dump(dict_to_dump, file)
+    save_profile(dict_to_dump, output_table_profile_path)
     logger.info(f'Profile was loaded into {output_table_profile_path}.')
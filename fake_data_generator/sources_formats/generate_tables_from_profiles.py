@@ -0,0 +1,200 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from zlib import crc32
+from loguru import logger
+from numpy import concatenate
+from numpy.random import SeedSequence
+from pyarrow import Array
+from fake_data_generator.connections import is_sqlalchemy_engine, is_sqlalchemy_url
+from fake_data_generator.columns_generator import get_columns_info_with_set_generators
+from fake_data_generator.columns_generator.random_states import RandomState
+from fake_data_generator.sources_formats.adaptive_batch_size import check_batch_size
+from fake_data_generator.sources_formats.file_sinks import FileSink
+from fake_data_generator.sources_formats.generate_table_from_profile import get_rich_columns_info_dict
+from fake_data_generator.sources_formats.metrics import GenerationMetrics
+from fake_data_generator.sources_formats.helper_functions import get_create_query, create_table_if_not_exists, execute_insertion
+from fake_data_generator.sources_formats.pipelined_insertion import execute_pipelined_insertion
+
+
+def get_recording_generator(generator, recorded_batches):
+    output_size = yield
+    while True:
+        fake_values = generator.send(output_size)
+        recorded_batches.append(fake_values.to_numpy(zero_copy_only=False) if isinstance(fake_values, Array) else fake_values.values)
+        output_size = yield fake_values
+
+
+def get_parent_table_names(rich_columns_info_dict, dest_table_names):
+    return {column_info_dict['foreign_key_table_name'] for column_info_dict in rich_columns_info_dict.values()
+            if column_info_dict.get('type') == 'FOREIGN_KEY' and column_info_dict.get('foreign_key_table_name') in dest_table_names}
+
+
+def get_tables_in_dependency_order(table_name_to_parent_table_names):
+    """
+    Topological order of tables (parents before children), raises ValueError if foreign keys form a cycle.
+    """
+    ordered_table_names = []
+    table_name_to_state = {}
+
+    def visit(table_name, path):
+        if table_name_to_state.get(table_name) == 'visited':
+            return
+        if table_name_to_state.get(table_name) == 'visiting':
+            raise ValueError(f'Foreign keys of tables form a cycle: {" -> ".join(path + [table_name])}')
+        table_name_to_state[table_name] = 'visiting'
+        for parent_table_name in sorted(table_name_to_parent_table_names[table_name]):
+            visit(parent_table_name, path + [table_name])
+        table_name_to_state[table_name] = 'visited'
+        ordered_table_names.append(table_name)
+
+    for table_name in table_name_to_parent_table_names:
+        visit(table_name, [])
+    return ordered_table_names
+
+
+def get_table_seed(seed, dest_table_name_with_schema):
+    if seed is None:
+        return None
+    return int(SeedSequence(seed, spawn_key=(crc32(dest_table_name_with_schema.encode()),)).generate_state(1)[0])
+
+
+def generate_table(conn,
+                   dest_table_name_with_schema,
+                   number_of_rows_to_insert,
+                   rich_columns_info_dict,
+                   columns_with_generators_as_parameter,
+                   referenced_column_names,
+                   parent_keys,
+                   batch_size,
+                   max_batch_memory_bytes,
+                   queue_size,
+                   insertion_method,
+                   batch_format,
+                   seed,
+                   metrics=None,
+                   record_events=False):
+    """
+    Generates one table with keys of already generated parents and returns generated values of its columns referenced by children.
+    conn is sqlalchemy URL when the table is generated in a separate process, then metrics events are recorded (if record_events)
+    and returned together with the values to be passed to metrics of the main process.
+    """
+    recorded_events = None
+    if record_events:
+        recorded_events = []
+        metrics = GenerationMetrics(hooks=[recorded_events.append])
+    if is_sqlalchemy_url(conn):
+        from sqlalchemy import create_engine
+        conn = create_engine(conn)
+
+    create_table_if_not_exists(conn=conn,
+                               dest_table_name_with_schema=dest_table_name_with_schema,
+                               create_query=get_create_query(dest_table_name_with_schema, rich_columns_info_dict))
+    columns_info_with_set_generators = get_columns_info_with_set_generators(rich_columns_info_dict, conn, dest_table_name_with_schema,
+                                                                           batch_format, RandomState(seed), parent_keys)
+    columns_info_with_set_generators += columns_with_generators_as_parameter
+    column_name_to_recorded_batches = {}
+    for column_info in columns_info_with_set_generators:
+        if hasattr(column_info, 'get_column_name') and column_info.get_column_name() in referenced_column_names:
+            column_name_to_recorded_batches[column_info.get_column_name()] = []
+            column_info.set_generator(get_recording_generator(column_info.get_generator(),
+                                                              column_name_to_recorded_batches[column_info.get_column_name()]))
+    for column_name in set(referenced_column_names) - set(column_name_to_recorded_batches):
+        logger.warning(f'Values of {dest_table_name_with_schema}.{column_name} can not be recorded, '
+                       f'child tables will read them from the table.')
+
+    if queue_size is not None:
+        execute_pipelined_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert, columns_info_with_set_generators,
+                                    batch_size, queue_size, insertion_method, batch_format, metrics)
+    else:
+        execute_insertion(conn, dest_table_name_with_schema, number_of_rows_to_insert, columns_info_with_set_generators,
+                          batch_size, insertion_method, batch_format, metrics, max_batch_memory_bytes)
+    return {(dest_table_name_with_schema, column_name): concatenate(recorded_batches) if recorded_batches else None
+            for column_name, recorded_batches in column_name_to_recorded_batches.items()}, recorded_events
+
+
+def generate_tables_from_profiles(conn,
+                                  tables: dict,
+                                  batch_size=100,
+                                  number_of_workers=1,
+                                  queue_size=None,
+                                  insertion_method=None,
+                                  batch_format='pandas',
+                                  seed=None,
+                                  metrics=None,
+                                  max_batch_memory_bytes=None):
+    """
+    Generates several tables in one run. tables maps dest_table_name_with_schema to dict with number_of_rows_to_insert
+    and source_table_profile_path and/or columns_info, optionally columns_to_include (same as parameters of generate_table_from_profile).
+    Foreign keys referencing tables of the same run form dependency graph: a table is started as soon as all of its parents
+    are generated, up to number_of_workers tables at once (in processes for sqlalchemy engines, in threads otherwise).
+    Generated values of referenced parent columns are passed to child tables in memory instead of being read from the database.
+    Events of tables generated in processes are passed to metrics when the table is finished.
+    """
+    check_batch_size(batch_size, queue_size)
+    table_name_to_rich_columns_info = {dest_table_name_with_schema: get_rich_columns_info_dict(table_info.get('source_table_profile_path'),
+                                                                                               table_info.get('columns_info'),
+                                                                                               table_info.get('columns_to_include'))
+                                       for dest_table_name_with_schema, table_info in tables.items()}
+    table_name_to_parent_table_names = {dest_table_name_with_schema: get_parent_table_names(rich_columns_info_dict, tables)
+                                        for dest_table_name_with_schema, (rich_columns_info_dict, _) in table_name_to_rich_columns_info.items()}
+    ordered_table_names = get_tables_in_dependency_order(table_name_to_parent_table_names)
+    logger.info(f'Tables will be generated in order: {", ".join(ordered_table_names)}')
+
+    table_name_to_referenced_column_names = {dest_table_name_with_schema: set() for dest_table_name_with_schema in tables}
+    for rich_columns_info_dict, _ in table_name_to_rich_columns_info.values():
+        for column_info_dict in rich_columns_info_dict.values():
+            if column_info_dict.get('type') == 'FOREIGN_KEY' and column_info_dict.get('foreign_key_table_name') in tables:
+                table_name_to_referenced_column_names[column_info_dict['foreign_key_table_name']].add(column_info_dict['foreign_key_column_name'])
+
+    if is_sqlalchemy_engine(conn):
+        if any(columns_with_generators_as_parameter for _, columns_with_generators_as_parameter in table_name_to_rich_columns_info.values()):
+            raise ValueError('Columns with generators passed as parameter can not be generated in separate processes')
+        executor, table_conn = ProcessPoolExecutor(max_workers=number_of_workers), conn.url
+    else:
+        executor, table_conn = ThreadPoolExecutor(max_workers=number_of_workers), conn
+    tables_in_processes = isinstance(executor, ProcessPoolExecutor)
+
+    generated_keys = {}
+    generated_table_names = set()
+    try:
+        with executor:
+            pending_tables = {}
+            while len(generated_table_names) < len(ordered_table_names):
+                for dest_table_name_with_schema in ordered_table_names:
+                    parent_table_names = table_name_to_parent_table_names[dest_table_name_with_schema]
+                    if dest_table_name_with_schema in generated_table_names or dest_table_name_with_schema in pending_tables.values() or \
+                            not parent_table_names <= generated_table_names:
+                        continue
+                    rich_columns_info_dict, columns_with_generators_as_parameter = table_name_to_rich_columns_info[dest_table_name_with_schema]
+                    logger.info(f'Start generating table {dest_table_name_with_schema}.')
+                    pending_table = executor.submit(generate_table,
+                                                    table_conn,
+                                                    dest_table_name_with_schema,
+                                                    tables[dest_table_name_with_schema]['number_of_rows_to_insert'],
+                                                    rich_columns_info_dict,
+                                                    columns_with_generators_as_parameter,
+                                                    table_name_to_referenced_column_names[dest_table_name_with_schema],
+                                                    {parent_key: foreign_keys for parent_key, foreign_keys in generated_keys.items()
+                                                     if parent_key[0] in parent_table_names},
+                                                    batch_size,
+                                                    max_batch_memory_bytes,
+                                                    queue_size,
+                                                    insertion_method,
+                                                    batch_format,
+                                                    get_table_seed(seed, dest_table_name_with_schema),
+                                                    None if tables_in_processes else metrics,
+                                                    tables_in_processes and metrics is not None)
+                    pending_tables[pending_table] = dest_table_name_with_schema
+                finished_tables, _ = wait(pending_tables, return_when=FIRST_COMPLETED)
+                for finished_table in finished_tables:
+                    dest_table_name_with_schema = pending_tables.pop(finished_table)
+                    table_keys, recorded_events = finished_table.result()
+                    generated_keys.update({parent_key: foreign_keys for parent_key, foreign_keys in table_keys.items()
+                                           if foreign_keys is not None})
+                    for recorded_event in recorded_events or []:
+                        metrics.record(**recorded_event)
+                    generated_table_names.add(dest_table_name_with_schema)
+                    logger.info(f'Table {dest_table_name_with_schema} was generated. '
+                                f'Tables left: {len(ordered_table_names) - len(generated_table_names)}')
+    finally:
+        if isinstance(conn, FileSink):
+            conn.close()
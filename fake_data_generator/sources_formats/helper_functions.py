@@ -1,16 +1,23 @@
 import pandas as pd
-import sqlalchemy
+import pyarrow as pa
 import re
 from copy import deepcopy
+from time import perf_counter
 from loguru import logger
 from numpy import int64
-from pandas import concat, to_datetime, Series
-from pyspark.sql.types import StructType, StructField, StringType, IntegerType, DateType, TimestampType, DecimalType
-from fake_data_generator.columns_generator import get_rich_column_info, get_fake_data_for_insertion, Column
-
-
-def get_string_for_column_names(columns_to_include):
-    return ','.join(map(lambda x: '`' + x + '`', columns_to_include)) if columns_to_include is not None else '*'
+from pandas import concat, to_datetime, to_timedelta, Series
+from pandas.api.types import is_datetime64_any_dtype
+from fake_data_generator.connections import is_sqlalchemy_engine
+from fake_data_generator.columns_generator import get_rich_column_info, get_rich_joint_columns_info, get_fake_data_for_insertion, \
+    Column, MultipleColumns, CategoricalColumn, ForeignKeyColumn, JointColumns
+from fake_data_generator.columns_generator.arrow_batches import get_arrow_type
+from fake_data_generator.columns_generator.random_states import RandomState
+from fake_data_generator.columns_generator.accumulators import \
+    ColumnAccumulator, JointAccumulator, DEFAULT_MAX_NUMBER_OF_CATEGORIES, DEFAULT_NUMBER_OF_BINS
+from fake_data_generator.sources_formats.adaptive_batch_size import AdaptiveBatchSize, ADAPTIVE_BATCH_SIZE
+from fake_data_generator.sources_formats.copy_loader import open_copy_connection, copy_fake_data
+from fake_data_generator.sources_formats.file_sinks import FileSink
+from fake_data_generator.sources_formats.sampling import get_string_for_column_names, get_table_data_chunks
 
 
 def get_create_query(dest_table_name_with_schema, rich_columns_info_dict):
@@ -20,7 +27,7 @@ def get_create_query(dest_table_name_with_schema, rich_columns_info_dict):
 
 def get_describe_data_df(conn, source_table_name_with_schema) -> pd.DataFrame:
     table_schema, table_name = source_table_name_with_schema.split('.')
-    if isinstance(conn, sqlalchemy.engine.base.Engine) and conn.name == 'postgresql':
+    if is_sqlalchemy_engine(conn) and conn.name == 'postgresql':
         describe_query = f'''
             SELECT
                 column_name AS col_name, data_type,
@@ -31,31 +38,19 @@ def get_describe_data_df(conn, source_table_name_with_schema) -> pd.DataFrame:
     else:
         describe_query = f"DESCRIBE {source_table_name_with_schema};"
 
-    if isinstance(conn, sqlalchemy.engine.base.Engine):
+    if is_sqlalchemy_engine(conn):
         describe_data_in_df = pd.read_sql_query(describe_query, conn).rename(columns={'name': 'col_name', 'type': 'data_type'})
     else:
         describe_data_in_df = conn.sql(describe_query).toPandas().rename(columns={'name': 'col_name', 'type': 'data_type'})
     return describe_data_in_df
 
 
-def get_table_data_df(conn, source_table_name_with_schema, columns_to_include, number_of_rows_from_which_to_create_pattern) -> pd.DataFrame:
-    limit_clause = f"LIMIT {number_of_rows_from_which_to_create_pattern}" if number_of_rows_from_which_to_create_pattern is not None else ''
-    select_query = f"SELECT {get_string_for_column_names(columns_to_include)} " \
-                   f"FROM {source_table_name_with_schema} " \
-                   f"ORDER BY RANDOM() {limit_clause};"
-    if isinstance(conn, sqlalchemy.engine.base.Engine):
-        table_data_df = pd.read_sql_query(select_query, conn)
-    else:
-        table_data_df = conn.sql(select_query).toPandas()
-    return table_data_df
-
-
 def get_correct_data_type(data_type, character_maximum_length=None, numeric_precision=None, numeric_scale=None):
     if 'numeric' in data_type and not pd.isnull(numeric_scale):
         return f'decimal({int(numeric_precision)},{int(numeric_scale)})'
     elif 'character varying' in data_type:
         if not pd.isnull(character_maximum_length):
-            return f'varchar({int(character_maximum_length)}'
+            return f'varchar({int(character_maximum_length)})'
         else:
             return 'varchar'
     else:
@@ -63,6 +58,7 @@ def get_correct_data_type(data_type, character_maximum_length=None, numeric_prec
 
 
 def get_inferred_data_type(column_data_type):
+    from pyspark.sql.types import StringType, IntegerType, DateType, TimestampType, DecimalType
     if column_data_type == 'string':
         return StringType()
     elif 'int' in column_data_type:
@@ -90,47 +86,187 @@ def get_correct_column_values(column_values: Series,
     elif column_data_type == 'date':
         return to_datetime(column_values).dt.date
     elif 'timestamp' in column_data_type:
+        if is_datetime64_any_dtype(column_values):
+            return column_values - to_timedelta(column_values.dt.nanosecond, unit='ns')
         return column_values.apply(lambda x: x.to_pydatetime())
     else:
         return column_values
 
 
+def update_column_accumulator(column_accumulator, column_values, column_data_type):
+    """
+    Feeds chunk of column values into accumulator of the column, returns the accumulator and seconds spent.
+    """
+    start_time = perf_counter()
+    column_accumulator.update(get_correct_column_values(column_values=column_values, column_data_type=column_data_type))
+    return column_accumulator, perf_counter() - start_time
+
+
+def update_joint_accumulators(joint_accumulators, table_data_chunk_df, column_name_to_data_type):
+    table_data_chunk_df = table_data_chunk_df.assign(**{column_name: get_correct_column_values(table_data_chunk_df[column_name],
+                                                                                               column_data_type)
+                                                        for column_name, column_data_type in column_name_to_data_type.items()
+                                                        if column_data_type == 'date' or 'timestamp' in column_data_type})
+    for joint_accumulator in joint_accumulators:
+        joint_accumulator.update(table_data_chunk_df)
+
+
+def log_column_profiling_seconds(source_table_name_with_schema, column_name_to_seconds):
+    logger.info(f'Profiling time of columns of {source_table_name_with_schema}: ' +
+                ', '.join(f'"{column_name}" {seconds:.3f}s' for column_name, seconds
+                          in sorted(column_name_to_seconds.items(), key=lambda item: item[1], reverse=True)))
+
+
+def get_foreign_key_fan_out(conn, source_table_name_with_schema, column_name, foreign_key_table_name, foreign_key_column_name):
+    """
+    Returns distribution of the number of children per parent key computed on the whole child table
+    (keys of parent table without children are counted as parents with 0 children).
+    """
+    fan_out_query = f'SELECT number_of_children, COUNT(*) AS number_of_parents ' \
+                    f'FROM (SELECT {column_name}, COUNT(*) AS number_of_children FROM {source_table_name_with_schema} ' \
+                    f'WHERE {column_name} IS NOT NULL GROUP BY {column_name}) AS children ' \
+                    f'GROUP BY number_of_children'
+    number_of_parents_query = f'SELECT COUNT(DISTINCT {foreign_key_column_name}) AS number_of_parents FROM {foreign_key_table_name}'
+    if is_sqlalchemy_engine(conn):
+        fan_out_df = pd.read_sql_query(fan_out_query, conn)
+        number_of_parents = pd.read_sql_query(number_of_parents_query, conn)['number_of_parents'][0]
+    else:
+        fan_out_df = conn.sql(fan_out_query).toPandas()
+        number_of_parents = conn.sql(number_of_parents_query).toPandas()['number_of_parents'][0]
+    fan_out = dict(zip(fan_out_df['number_of_children'].astype(int), fan_out_df['number_of_parents'].astype(float)))
+    number_of_parents_without_children = number_of_parents - sum(fan_out.values())
+    if number_of_parents_without_children > 0:
+        fan_out[0] = float(number_of_parents_without_children)
+    total_number_of_parents = sum(fan_out.values())
+    fan_out_values = sorted(fan_out)
+    return fan_out_values, [fan_out[value] / total_number_of_parents for value in fan_out_values]
+
+
 def get_rich_columns_info(conn,
                           source_table_name_with_schema: str,
                           number_of_rows_from_which_to_create_pattern: int,
                           columns_info: list,
                           columns_to_include: list,
                           number_of_intervals: int,
-                          categorical_threshold: float):
+                          categorical_threshold: float,
+                          chunk_size: int = 100000,
+                          sampling_method: str = 'system',
+                          max_number_of_categories: int = DEFAULT_MAX_NUMBER_OF_CATEGORIES,
+                          number_of_bins: int = DEFAULT_NUMBER_OF_BINS,
+                          seed: int = None,
+                          number_of_profiling_workers: int = 1):
+    """
+    Reads sample of table chunk by chunk and feeds every chunk into per-column accumulators,
+    so memory used for profiling does not depend on the number of sampled rows.
+    For Spark sessions accumulators are filled with aggregations computed on executors instead.
+    seed makes both the sample and generators of returned columns reproducible.
+    Distribution of children per parent key of foreign key columns with observed distribution is computed on the whole table.
+    Columns of JointColumns groups are profiled together with JointAccumulator and generated by one generator of the group.
+    If number_of_profiling_workers > 1, chunks of sqlalchemy samples are fed into column accumulators in a pool of processes
+    (see update_accumulators_in_parallel). Time spent on every column is logged at the end.
+    """
     if source_table_name_with_schema is None:
         return columns_info
 
     describe_data_df = get_describe_data_df(conn, source_table_name_with_schema)
+    column_name_to_data_type = {}
+    for _, row in describe_data_df.iterrows():
+        if columns_to_include is None or row['col_name'] in columns_to_include:
+            column_name_to_data_type[row['col_name']] = get_correct_data_type(row['data_type'],
+                                                                              row.get('character_maximum_length'),
+                                                                              row.get('numeric_precision'),
+                                                                              row.get('numeric_scale'))
 
-    logger.info(f'Start making select-query from table {source_table_name_with_schema}')
-    table_data_df = get_table_data_df(conn, source_table_name_with_schema, columns_to_include, number_of_rows_from_which_to_create_pattern)
-    logger.info(f'Select-query result was read into Dataframe. Number of rows fetched is {table_data_df.shape[0]}.')
+    columns_info = deepcopy(columns_info) or []
+    joint_columns_list = [column_info for column_info in columns_info if isinstance(column_info, JointColumns)]
+    column_name_to_column_info_in_dict = {column_info.get_column_name(): column_info for column_info in columns_info
+                                          if not isinstance(column_info, JointColumns)}
+    column_name_to_joint_columns = {}
+    for joint_columns in joint_columns_list:
+        for column_info in joint_columns.get_columns():
+            if column_info.get_column_name() not in column_name_to_data_type:
+                raise ValueError(f'Column "{column_info.get_column_name()}" of joint columns is not found in {source_table_name_with_schema}')
+            column_info.set_data_type(column_name_to_data_type[column_info.get_column_name()])
+            column_name_to_joint_columns[column_info.get_column_name()] = joint_columns
+    joint_accumulators = [JointAccumulator(joint_columns.get_column_names(),
+                                           [column_info.get_data_type() for column_info in joint_columns.get_columns()])
+                          for joint_columns in joint_columns_list]
+    column_name_to_accumulator = {column_name: ColumnAccumulator(column_data_type,
+                                                                 max_number_of_categories=max_number_of_categories,
+                                                                 number_of_bins=number_of_bins,
+                                                                 stop_on_overflow=not isinstance(column_name_to_column_info_in_dict.get(column_name),
+                                                                                                 CategoricalColumn),
+                                                                 max_number_of_strings=number_of_rows_from_which_to_create_pattern)
+                                  for column_name, column_data_type in column_name_to_data_type.items()}
 
-    if table_data_df.empty:
+    logger.info(f'Start sampling rows from table {source_table_name_with_schema}')
+    column_name_to_seconds = {column_name: 0.0 for column_name in column_name_to_data_type}
+    if is_sqlalchemy_engine(conn):
+        table_data_chunks = get_table_data_chunks(conn, source_table_name_with_schema, columns_to_include,
+                                                  number_of_rows_from_which_to_create_pattern, chunk_size, sampling_method, seed)
+        if number_of_profiling_workers > 1:
+            from fake_data_generator.sources_formats.parallel_profiling import update_accumulators_in_parallel
+            number_of_fetched_rows = update_accumulators_in_parallel(table_data_chunks, column_name_to_data_type,
+                                                                     column_name_to_accumulator, joint_accumulators,
+                                                                     number_of_profiling_workers, column_name_to_seconds)
+        else:
+            number_of_fetched_rows = 0
+            for table_data_chunk_df in table_data_chunks:
+                number_of_fetched_rows += table_data_chunk_df.shape[0]
+                for column_name, column_data_type in column_name_to_data_type.items():
+                    _, seconds = update_column_accumulator(column_name_to_accumulator[column_name], table_data_chunk_df[column_name],
+                                                           column_data_type)
+                    column_name_to_seconds[column_name] += seconds
+                if joint_accumulators:
+                    update_joint_accumulators(joint_accumulators, table_data_chunk_df, column_name_to_data_type)
+                logger.info(f'Chunk of sample was read. Number of rows fetched is {number_of_fetched_rows}.')
+    else:
+        from fake_data_generator.sources_formats.spark_profiling import update_accumulators_with_spark_aggregations
+        number_of_fetched_rows = update_accumulators_with_spark_aggregations(conn, source_table_name_with_schema, columns_to_include,
+                                                                             number_of_rows_from_which_to_create_pattern,
+                                                                             column_name_to_accumulator, seed, joint_accumulators)
+
+    if number_of_fetched_rows == 0:
         logger.info(f'Specified table is empty. Only column names and column data types will be loaded in profile.')
 
-    column_name_to_column_info_in_dict = {column_info.get_column_name(): column_info for column_info in deepcopy(columns_info) or []}
+    random_state = RandomState(seed)
     rich_columns_info = []
-    for _, row in describe_data_df.iterrows():
-        if columns_to_include is None or row['col_name'] in columns_to_include:
-            column_info = column_name_to_column_info_in_dict.get(row['col_name'], Column(column_name=row['col_name']))
-            correct_data_type = get_correct_data_type(row['data_type'], row['character_maximum_length'], row['numeric_precision'], row['numeric_scale'])
-            column_info.set_data_type(correct_data_type)
-            if not table_data_df.empty:
-                correct_column_values = get_correct_column_values(column_values=table_data_df[column_info.get_column_name()],
-                                                                  column_data_type=column_info.get_data_type())
-                rich_column_info = get_rich_column_info(column_values=correct_column_values,
-                                                        column_info=column_info,
-                                                        number_of_intervals=number_of_intervals,
-                                                        categorical_threshold=categorical_threshold)
-                rich_columns_info.append(rich_column_info)
-            else:
-                rich_columns_info.append(column_info)
+    column_name_to_joint_accumulator = {joint_accumulator.column_names[0]: joint_accumulator for joint_accumulator in joint_accumulators}
+    for column_name, column_data_type in column_name_to_data_type.items():
+        start_time = perf_counter()
+        if column_name in column_name_to_joint_columns:
+            joint_columns = column_name_to_joint_columns[column_name]
+            if column_name not in column_name_to_joint_accumulator:
+                continue
+            if number_of_fetched_rows != 0:
+                joint_columns = get_rich_joint_columns_info(joint_columns=joint_columns,
+                                                            joint_accumulator=column_name_to_joint_accumulator[column_name],
+                                                            number_of_intervals=number_of_intervals,
+                                                            random_state=random_state.get_column_random_state(column_name))
+            rich_columns_info.append(joint_columns)
+            column_name_to_seconds[column_name] += perf_counter() - start_time
+            continue
+        column_info = column_name_to_column_info_in_dict.get(column_name, Column(column_name=column_name))
+        column_info.set_data_type(column_data_type)
+        if isinstance(column_info, ForeignKeyColumn) and column_info.get_distribution() == 'observed' and \
+                column_info.get_fan_out_values() is None:
+            fan_out_values, fan_out_probabilities = get_foreign_key_fan_out(conn, source_table_name_with_schema, column_name,
+                                                                            column_info.get_foreign_key_table_name(),
+                                                                            column_info.get_foreign_key_column_name())
+            column_info.set_fan_out_values(fan_out_values)
+            column_info.set_fan_out_probabilities(fan_out_probabilities)
+        if number_of_fetched_rows != 0:
+            rich_column_info = get_rich_column_info(column_info=column_info,
+                                                    number_of_intervals=number_of_intervals,
+                                                    categorical_threshold=categorical_threshold,
+                                                    column_accumulator=column_name_to_accumulator.pop(column_name),
+                                                    random_state=random_state.get_column_random_state(column_name),
+                                                    conn=conn)
+            rich_columns_info.append(rich_column_info)
+        else:
+            rich_columns_info.append(column_info)
+        column_name_to_seconds[column_name] += perf_counter() - start_time
+    log_column_profiling_seconds(source_table_name_with_schema, column_name_to_seconds)
     return rich_columns_info
 
 
@@ -139,45 +275,110 @@ def create_table_if_not_exists(conn,
                                dest_table_name_with_schema=None,
                                columns_to_include=None,
                                create_query=None):
+    if isinstance(conn, FileSink):
+        return
     if create_query is None:
         create_query = f'CREATE TABLE IF NOT EXISTS {dest_table_name_with_schema} AS ' \
-                       f'SELECT {get_string_for_column_names(columns_to_include)} ' \
+                       f'SELECT {get_string_for_column_names(columns_to_include, conn)} ' \
                        f'FROM {source_table_name_with_schema} WHERE 1<>1;'
-    if isinstance(conn, sqlalchemy.engine.base.Engine):
+    if is_sqlalchemy_engine(conn):
+        from sqlalchemy import text
         with conn.begin() as c:
-            c.execute(sqlalchemy.text(create_query))
+            c.execute(text(create_query))
             logger.info(f'Table {dest_table_name_with_schema} was created')
     else:
         conn.sql(create_query)
 
 
+def get_flat_columns_info(columns_info):
+    flat_columns_info = []
+    for column_info in columns_info:
+        if isinstance(column_info, MultipleColumns):
+            flat_columns_info.extend(column_info.get_columns())
+        else:
+            flat_columns_info.append(column_info)
+    return flat_columns_info
+
+
+def get_spark_schema(columns_info):
+    from pyspark.sql.types import StructType, StructField
+    return StructType([StructField(column_info.get_column_name(), get_inferred_data_type(column_info.get_data_type()), True)
+                       for column_info in get_flat_columns_info(columns_info)])
+
+
+def get_insertion_schema(conn, columns_info):
+    """
+    Returns schema passed to insert_fake_data: None for SQLAlchemy engines, dict of column names to arrow types
+    for file sinks and Spark schema for Spark sessions.
+    """
+    if is_sqlalchemy_engine(conn):
+        return None
+    elif isinstance(conn, FileSink):
+        return {column_info.get_column_name(): get_arrow_type(column_info.get_data_type())
+                for column_info in get_flat_columns_info(columns_info)}
+    return get_spark_schema(columns_info)
+
+
+def insert_fake_data(conn, dest_table_name_with_schema, fake_data_in_df, schema=None, copy_connection=None):
+    if isinstance(conn, FileSink):
+        conn.write_batch(dest_table_name_with_schema, fake_data_in_df, schema)
+        return
+    if isinstance(fake_data_in_df, pa.RecordBatch) and copy_connection is None:
+        fake_data_in_df = fake_data_in_df.to_pandas()
+    if copy_connection is not None:
+        copy_fake_data(copy_connection, dest_table_name_with_schema, fake_data_in_df)
+    elif is_sqlalchemy_engine(conn):
+        fake_data_in_df.to_sql(con=conn,
+                               name=dest_table_name_with_schema.split('.')[1],
+                               schema=dest_table_name_with_schema.split('.')[0],
+                               if_exists='append',
+                               index=False)
+    else:
+        fake_data_in_df_spark = conn.createDataFrame(fake_data_in_df, schema=schema)
+        fake_data_in_df_spark.write.format('hive').mode('append').saveAsTable(dest_table_name_with_schema)
+
+
 def execute_insertion(conn,
                       dest_table_name_with_schema,
                       number_of_rows_to_insert,
                       columns_info_with_set_generators,
-                      batch_size):
-    schema = None
-    if not isinstance(conn, sqlalchemy.engine.base.Engine):
-        schema = StructType([StructField(column_info.get_column_name(), get_inferred_data_type(column_info.get_data_type()), True)
-                             for column_info in columns_info_with_set_generators])
-
-    number_of_rows_left_to_insert = number_of_rows_to_insert
-    while number_of_rows_left_to_insert != 0:
-        logger.info(f'-----------Start generating batch of fake data-----------')
-        fake_data_in_df = get_fake_data_for_insertion(output_size=min(batch_size, number_of_rows_left_to_insert),
-                                                      columns_info_with_set_generator=columns_info_with_set_generators)
-        logger.info(f'--------Finished generating batch of fake data-----------')
-
-        logger.info(f'Start inserting generated fake data into {dest_table_name_with_schema} table.')
-        if isinstance(conn, sqlalchemy.engine.base.Engine):
-            fake_data_in_df.to_sql(con=conn,
-                                   name=dest_table_name_with_schema.split('.')[1],
-                                   schema=dest_table_name_with_schema.split('.')[0],
-                                   if_exists='append',
-                                   index=False)
-        else:
-            fake_data_in_df_spark = conn.createDataFrame(fake_data_in_df, schema=schema)
-            fake_data_in_df_spark.write.format('hive').mode('append').saveAsTable(dest_table_name_with_schema)
-        number_of_rows_left_to_insert -= min(batch_size, number_of_rows_left_to_insert)
-        logger.info(f'Insertion of fake data into {dest_table_name_with_schema} was finished.\n'
-                    f'\tNumber of rows left to insert: {number_of_rows_left_to_insert}')
+                      batch_size,
+                      insertion_method=None,
+                      batch_format='pandas',
+                      metrics=None,
+                      max_batch_memory_bytes=None):
+    """
+    If batch_size is 'adaptive', batch size is chosen by AdaptiveBatchSize from measured throughput of batches.
+    """
+    schema = get_insertion_schema(conn, columns_info_with_set_generators)
+    adaptive_batch_size = AdaptiveBatchSize(dest_table_name_with_schema, max_batch_memory_bytes) \
+        if batch_size == ADAPTIVE_BATCH_SIZE else None
+
+    table_start_time = perf_counter()
+    if metrics is not None:
+        metrics.record_table_started(dest_table_name_with_schema, number_of_rows_to_insert)
+    with open_copy_connection(conn, insertion_method) as copy_connection:
+        number_of_rows_left_to_insert = number_of_rows_to_insert
+        while number_of_rows_left_to_insert != 0:
+            column_timings = {} if metrics is not None else None
+            start_time = perf_counter()
+            current_batch_size = adaptive_batch_size.get_batch_size() if adaptive_batch_size is not None else batch_size
+            fake_data_in_df = get_fake_data_for_insertion(output_size=min(current_batch_size, number_of_rows_left_to_insert),
+                                                          columns_info_with_set_generator=columns_info_with_set_generators,
+                                                          batch_format=batch_format,
+                                                          column_timings=column_timings)
+            generation_seconds = perf_counter() - start_time
+
+            start_time = perf_counter()
+            insert_fake_data(conn, dest_table_name_with_schema, fake_data_in_df, schema, copy_connection)
+            insertion_seconds = perf_counter() - start_time
+            number_of_rows_left_to_insert -= len(fake_data_in_df)
+            if metrics is not None:
+                metrics.record_batch_generated(dest_table_name_with_schema, len(fake_data_in_df), generation_seconds, column_timings)
+                metrics.record_batch_inserted(dest_table_name_with_schema, len(fake_data_in_df), insertion_seconds)
+            logger.info(f'{len(fake_data_in_df)} rows were generated in {generation_seconds:.3f}s and inserted into '
+                        f'{dest_table_name_with_schema} in {insertion_seconds:.3f}s. Number of rows left to insert: {number_of_rows_left_to_insert}')
+            if adaptive_batch_size is not None:
+                adaptive_batch_size.update(fake_data_in_df, generation_seconds + insertion_seconds)
+    if metrics is not None:
+        metrics.record_table_generated(dest_table_name_with_schema, number_of_rows_to_insert, perf_counter() - table_start_time)
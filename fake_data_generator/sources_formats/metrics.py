@@ -0,0 +1,166 @@
+import os
+import sys
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter, time
+from loguru import logger
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+METRIC_EVENTS = ['table_started', 'column_generated', 'batch_generated', 'batch_inserted', 'table_generated']
+PROMETHEUS_WRITE_INTERVAL = 5.0
+PROMETHEUS_METRIC_PREFIX = 'fake_data_generator'
+PROMETHEUS_TABLE_METRICS = {
+    'rows_generated': ('counter', 'Number of generated rows'),
+    'generation_seconds': ('counter', 'Time spent generating batches'),
+    'rows_inserted': ('counter', 'Number of inserted rows'),
+    'batches_inserted': ('counter', 'Number of inserted batches'),
+    'insertion_seconds': ('counter', 'Time spent inserting batches'),
+    'last_insertion_seconds': ('gauge', 'Insertion latency of the last batch'),
+    'rows_per_second': ('gauge', 'Inserted rows per second of wall time since the start of the table'),
+    'queue_depth': ('gauge', 'Number of generated batches waiting for insertion'),
+}
+
+
+def get_max_rss_bytes():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def log_event(event):
+    """
+    Hook logging every event (including per-column ones), for example GenerationMetrics(hooks=[log_event]).
+    """
+    logger.info(', '.join(f'{key}={value:.6f}' if isinstance(value, float) else f'{key}={value}' for key, value in event.items()))
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class GenerationMetrics:
+    """
+    Instrumentation of generation runs passed as metrics to generate_table_from_profile, generate_fake_table and
+    generate_tables_from_profiles. Events are dicts with keys event, table, time and values of the event:
+    - table_started: number_of_rows;
+    - column_generated: column, number_of_rows, seconds (for joint columns column is comma-separated list of names);
+    - batch_generated: number_of_rows, seconds;
+    - batch_inserted: number_of_rows, seconds, queue_depth, rows_per_second, max_rss_bytes (queue_depth is the number of batches
+      waiting in the queue of pipelined insertion or being generated by workers of parallel insertion, None otherwise);
+    - table_generated: number_of_rows, seconds, rows_per_second.
+    Every event is passed to hooks (callables taking event dict) and added to totals of its table returned by get_summary.
+    If prometheus_file_path is given, totals are written there in Prometheus text format (e.g. for node_exporter
+    textfile collector) at most every PROMETHEUS_WRITE_INTERVAL seconds and after every table.
+    In parallel insertion batches are generated in worker processes, their column timings are reported by the main process.
+    rows_per_second already present in batch_inserted event (e.g. replayed from the process which generated the table) is kept.
+    Spark generation reports only table_generated.
+    """
+    def __init__(self, hooks: list = None, prometheus_file_path: str = None):
+        self.hooks = list(hooks or [])
+        self.prometheus_file_path = prometheus_file_path
+        self.table_totals = defaultdict(lambda: defaultdict(float))
+        self.column_seconds = defaultdict(float)
+        self.table_starts = {}
+        self.max_rss_bytes = None
+        self.last_write_time = None
+        self.lock = Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def record(self, event, table, **values):
+        event = {'event': event, 'table': table, 'time': time(), **values}
+        with self.lock:
+            self.update_totals(event)
+        for hook in self.hooks:
+            hook(event)
+        if self.prometheus_file_path is not None and (event['event'] == 'table_generated' or self.last_write_time is None or
+                                                      perf_counter() - self.last_write_time >= PROMETHEUS_WRITE_INTERVAL):
+            self.write_prometheus_file()
+
+    def update_totals(self, event):
+        table_totals = self.table_totals[event['table']]
+        if event['event'] == 'table_started' or event['table'] not in self.table_starts:
+            self.table_starts[event['table']] = (perf_counter(), table_totals['rows_inserted'])
+        if event['event'] == 'column_generated':
+            self.column_seconds[(event['table'], event['column'])] += event['seconds']
+        elif event['event'] == 'batch_generated':
+            table_totals['rows_generated'] += event['number_of_rows']
+            table_totals['generation_seconds'] += event['seconds']
+        elif event['event'] == 'batch_inserted':
+            table_totals['rows_inserted'] += event['number_of_rows']
+            table_totals['batches_inserted'] += 1
+            table_totals['insertion_seconds'] += event['seconds']
+            table_totals['last_insertion_seconds'] = event['seconds']
+            if event.get('queue_depth') is not None:
+                table_totals['queue_depth'] = event['queue_depth']
+            if event.get('max_rss_bytes') is not None:
+                self.max_rss_bytes = event['max_rss_bytes']
+            if event.get('rows_per_second') is None:
+                table_start_time, table_start_rows_inserted = self.table_starts[event['table']]
+                event['rows_per_second'] = (table_totals['rows_inserted'] - table_start_rows_inserted) / \
+                    max(perf_counter() - table_start_time, 1e-9)
+            table_totals['rows_per_second'] = event['rows_per_second']
+        elif event['event'] == 'table_generated' and event['rows_per_second'] is not None:
+            table_totals['rows_per_second'] = event['rows_per_second']
+
+    def record_table_started(self, table, number_of_rows):
+        self.record('table_started', table, number_of_rows=number_of_rows)
+
+    def record_batch_generated(self, table, number_of_rows, seconds, column_timings=None):
+        for column, column_seconds in (column_timings or {}).items():
+            self.record('column_generated', table, column=column, number_of_rows=number_of_rows, seconds=column_seconds)
+        self.record('batch_generated', table, number_of_rows=number_of_rows, seconds=seconds)
+
+    def record_batch_inserted(self, table, number_of_rows, seconds, queue_depth=None):
+        self.record('batch_inserted', table, number_of_rows=number_of_rows, seconds=seconds, queue_depth=queue_depth,
+                    max_rss_bytes=get_max_rss_bytes())
+
+    def record_table_generated(self, table, number_of_rows, seconds):
+        self.record('table_generated', table, number_of_rows=number_of_rows, seconds=seconds,
+                    rows_per_second=number_of_rows / seconds if seconds > 0 else None)
+
+    def get_summary(self):
+        """
+        Returns totals of tables with seconds spent on every column.
+        """
+        with self.lock:
+            return {table: {**table_totals,
+                            'column_seconds': {column: seconds for (column_table, column), seconds in self.column_seconds.items()
+                                               if column_table == table}}
+                    for table, table_totals in self.table_totals.items()}
+
+    def get_prometheus_text(self):
+        lines = []
+        with self.lock:
+            for metric_name, (metric_type, metric_help) in PROMETHEUS_TABLE_METRICS.items():
+                full_metric_name = f'{PROMETHEUS_METRIC_PREFIX}_{metric_name}' + ('_total' if metric_type == 'counter' else '')
+                lines += [f'# HELP {full_metric_name} {metric_help}', f'# TYPE {full_metric_name} {metric_type}']
+                lines += [f'{full_metric_name}{{table="{escape_label_value(table)}"}} {table_totals[metric_name]}'
+                          for table, table_totals in self.table_totals.items() if metric_name in table_totals]
+            full_metric_name = f'{PROMETHEUS_METRIC_PREFIX}_column_generation_seconds_total'
+            lines += [f'# HELP {full_metric_name} Time spent generating values of column', f'# TYPE {full_metric_name} counter']
+            lines += [f'{full_metric_name}{{table="{escape_label_value(table)}",column="{escape_label_value(column)}"}} {seconds}'
+                      for (table, column), seconds in self.column_seconds.items()]
+            if self.max_rss_bytes is not None:
+                full_metric_name = f'{PROMETHEUS_METRIC_PREFIX}_max_rss_bytes'
+                lines += [f'# HELP {full_metric_name} Peak resident memory of the process', f'# TYPE {full_metric_name} gauge',
+                          f'{full_metric_name} {self.max_rss_bytes}']
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus_file(self):
+        """
+        Writes metrics into temporary file and renames it, so that collectors never read partially written file.
+        """
+        prometheus_text = self.get_prometheus_text()
+        with self.lock:
+            self.last_write_time = perf_counter()
+            temporary_path = f'{self.prometheus_file_path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'w') as file:
+                file.write(prometheus_text)
+            os.replace(temporary_path, self.prometheus_file_path)
@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from time import perf_counter
+from loguru import logger
+from fake_data_generator.connections import is_sqlalchemy_engine
+from fake_data_generator.columns_generator import get_columns_info_with_set_generators, get_fake_data_for_insertion, Column
+from fake_data_generator.columns_generator.arrow_batches import concat_batches_by_columns
+from fake_data_generator.columns_generator.random_states import RandomState
+from fake_data_generator.columns_generator.generators import \
+    get_generator_for_incremental_id_column, get_start_id_for_incremental_id_column
+from fake_data_generator.sources_formats.copy_loader import open_copy_connection
+from fake_data_generator.sources_formats.helper_functions import get_insertion_schema, insert_fake_data
+
+worker_state = {}
+
+
+def init_worker(rich_columns_info_dict, conn_url, dest_table_name_with_schema, incremental_id_start_ids, batch_format='pandas',
+                entropy=None):
+    conn = None
+    if conn_url is not None:
+        from sqlalchemy import create_engine
+        conn = create_engine(conn_url)
+    worker_state['random_state'] = RandomState(entropy)
+    worker_state['columns_info_with_set_generators'] = get_columns_info_with_set_generators(rich_columns_info_dict, conn,
+                                                                                           dest_table_name_with_schema, batch_format,
+                                                                                           worker_state['random_state'])
+    worker_state['incremental_id_start_ids'] = incremental_id_start_ids
+    worker_state['batch_format'] = batch_format
+
+
+def generate_batch(output_size, rows_offset, batch_index, column_timings=None):
+    """
+    Returns generated batch, time of its generation and column_timings filled by get_fake_data_for_insertion.
+    """
+    start_time = perf_counter()
+    worker_state['random_state'].set_batch_index(batch_index)
+    columns_info_with_set_generators = worker_state['columns_info_with_set_generators']
+    for column_info in filter(lambda column_info: isinstance(column_info, Column), columns_info_with_set_generators):
+        start_id = worker_state['incremental_id_start_ids'].get(column_info.get_column_name())
+        if start_id is not None:
+            column_info.set_generator(get_generator_for_incremental_id_column(start_id=start_id + rows_offset))
+    fake_data_in_df = get_fake_data_for_insertion(output_size=output_size,
+                                                  columns_info_with_set_generator=columns_info_with_set_generators,
+                                                  batch_format=worker_state['batch_format'],
+                                                  column_timings=column_timings)
+    return fake_data_in_df, perf_counter() - start_time, column_timings
+
+
+def execute_parallel_insertion(conn,
+                               dest_table_name_with_schema,
+                               number_of_rows_to_insert,
+                               rich_columns_info_dict,
+                               columns_with_generators_as_parameter,
+                               batch_size,
+                               number_of_workers,
+                               insertion_method=None,
+                               batch_format='pandas',
+                               seed=None,
+                               metrics=None):
+    """
+    Generates batches in a pool of processes from picklable profile dict while the main process inserts them
+    in order of completion. Every batch gets generators of its index from the table random state and a pre-assigned block
+    of incremental ids, so the result does not depend on which worker generated the batch and is the same as of serial insertion.
+    Columns with generators passed as parameter are not picklable and are generated in the main process.
+    """
+    rich_columns_info_dict = {column_name: column_info_dict for column_name, column_info_dict in rich_columns_info_dict.items()
+                              if column_info_dict.get('type') != 'CUSTOM_COLUMN'}
+    incremental_id_start_ids = {column_name: get_start_id_for_incremental_id_column(conn, dest_table_name_with_schema, column_name)
+                                for column_name, column_info_dict in rich_columns_info_dict.items()
+                                if column_info_dict.get('type') == 'INCREMENTAL_ID'}
+    schema = get_insertion_schema(conn,
+                                  [Column(column_name=column_name, data_type=column_info_dict.get('data_type'))
+                                   for column_name, column_info_dict in rich_columns_info_dict.items()] +
+                                  columns_with_generators_as_parameter)
+    conn_url = conn.url if is_sqlalchemy_engine(conn) else None
+
+    entropy = RandomState(seed).entropy
+    table_start_time = perf_counter()
+    if metrics is not None:
+        metrics.record_table_started(dest_table_name_with_schema, number_of_rows_to_insert)
+    batches = enumerate(range(0, number_of_rows_to_insert, batch_size))
+    number_of_rows_left_to_insert = number_of_rows_to_insert
+    with open_copy_connection(conn, insertion_method) as copy_connection, \
+            ProcessPoolExecutor(max_workers=number_of_workers,
+                                initializer=init_worker,
+                                initargs=(rich_columns_info_dict, conn_url, dest_table_name_with_schema, incremental_id_start_ids,
+                                          batch_format, entropy)) as executor:
+        pending_batches = set()
+        while True:
+            for batch_index, rows_offset in islice(batches, 2 * number_of_workers - len(pending_batches)):
+                pending_batches.add(executor.submit(generate_batch,
+                                                    min(batch_size, number_of_rows_to_insert - rows_offset),
+                                                    rows_offset,
+                                                    batch_index,
+                                                    {} if metrics is not None else None))
+            if not pending_batches:
+                break
+            generated_batches, pending_batches = wait(pending_batches, return_when=FIRST_COMPLETED)
+            for generated_batch in generated_batches:
+                fake_data_in_df, generation_seconds, column_timings = generated_batch.result()
+                if columns_with_generators_as_parameter:
+                    start_time = perf_counter()
+                    fake_data_in_df = concat_batches_by_columns([
+                        fake_data_in_df,
+                        get_fake_data_for_insertion(output_size=len(fake_data_in_df),
+                                                    columns_info_with_set_generator=columns_with_generators_as_parameter,
+                                                    batch_format=batch_format,
+                                                    column_timings=column_timings)])
+                    generation_seconds += perf_counter() - start_time
+                start_time = perf_counter()
+                insert_fake_data(conn, dest_table_name_with_schema, fake_data_in_df, schema, copy_connection)
+                insertion_seconds = perf_counter() - start_time
+                number_of_rows_left_to_insert -= len(fake_data_in_df)
+                if metrics is not None:
+                    metrics.record_batch_generated(dest_table_name_with_schema, len(fake_data_in_df), generation_seconds, column_timings)
+                    metrics.record_batch_inserted(dest_table_name_with_schema, len(fake_data_in_df), insertion_seconds, len(pending_batches))
+                logger.info(f'{len(fake_data_in_df)} rows were inserted into {dest_table_name_with_schema} in {insertion_seconds:.3f}s. '
+                            f'Number of rows left to insert: {number_of_rows_left_to_insert}')
+    if metrics is not None:
+        metrics.record_table_generated(dest_table_name_with_schema, number_of_rows_to_insert, perf_counter() - table_start_time)
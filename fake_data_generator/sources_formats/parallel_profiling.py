@@ -0,0 +1,47 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from loguru import logger
+from fake_data_generator.sources_formats.helper_functions import update_column_accumulator, update_joint_accumulators
+
+
+def update_accumulators_in_parallel(table_data_chunks,
+                                    column_name_to_data_type,
+                                    column_name_to_accumulator,
+                                    joint_accumulators,
+                                    number_of_workers,
+                                    column_name_to_seconds):
+    """
+    Feeds chunks of sample into column accumulators in a pool of processes. Every column of every chunk is a separate task
+    getting only values of the column and an empty accumulator with parameters of the column accumulator,
+    the returned partial accumulator is merged into the column accumulator by the main process. Partial accumulators are merged
+    in order of chunks, so the result does not depend on scheduling, and up to number_of_workers chunks are processed at once
+    while the main process reads the next chunk. Joint accumulators are updated in the main process.
+    Returns the number of fetched rows, seconds spent by workers on columns are added to column_name_to_seconds.
+    """
+    number_of_fetched_rows = 0
+    column_name_to_empty_accumulator = deepcopy(column_name_to_accumulator)
+    pending_chunks = deque()
+
+    def merge_oldest_chunk():
+        for column_name, partial_accumulator_future in pending_chunks.popleft():
+            partial_accumulator, seconds = partial_accumulator_future.result()
+            column_name_to_accumulator[column_name].merge(partial_accumulator)
+            column_name_to_seconds[column_name] += seconds
+
+    with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+        for table_data_chunk_df in table_data_chunks:
+            number_of_fetched_rows += table_data_chunk_df.shape[0]
+            pending_chunks.append([(column_name, executor.submit(update_column_accumulator,
+                                                                 column_name_to_empty_accumulator[column_name],
+                                                                 table_data_chunk_df[column_name],
+                                                                 column_data_type))
+                                   for column_name, column_data_type in column_name_to_data_type.items()])
+            if joint_accumulators:
+                update_joint_accumulators(joint_accumulators, table_data_chunk_df, column_name_to_data_type)
+            logger.info(f'Chunk of sample was read. Number of rows fetched is {number_of_fetched_rows}.')
+            while len(pending_chunks) > number_of_workers:
+                merge_oldest_chunk()
+        while pending_chunks:
+            merge_oldest_chunk()
+    return number_of_fetched_rows
@@ -0,0 +1,113 @@
+from queue import Queue, Full
+from threading import Thread, Event
+from time import perf_counter
+from loguru import logger
+from fake_data_generator.columns_generator import get_fake_data_for_insertion
+from fake_data_generator.sources_formats.copy_loader import open_copy_connection
+from fake_data_generator.sources_formats.helper_functions import get_insertion_schema, insert_fake_data
+
+GENERATION_IS_FINISHED = None
+QUEUE_POLL_INTERVAL = 0.1
+
+
+def put_until_stopped(batches_queue, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            batches_queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+            return
+        except Full:
+            continue
+
+
+def generate_batches(batches_queue,
+                     stop_event,
+                     number_of_rows_to_insert,
+                     columns_info_with_set_generators,
+                     batch_size,
+                     stage_timings,
+                     batch_format='pandas',
+                     metrics=None,
+                     dest_table_name_with_schema=None):
+    try:
+        number_of_rows_left_to_generate = number_of_rows_to_insert
+        while number_of_rows_left_to_generate != 0 and not stop_event.is_set():
+            column_timings = {} if metrics is not None else None
+            start_time = perf_counter()
+            fake_data_in_df = get_fake_data_for_insertion(output_size=min(batch_size, number_of_rows_left_to_generate),
+                                                          columns_info_with_set_generator=columns_info_with_set_generators,
+                                                          batch_format=batch_format,
+                                                          column_timings=column_timings)
+            generation_seconds = perf_counter() - start_time
+            stage_timings['generation'] += generation_seconds
+            if metrics is not None:
+                metrics.record_batch_generated(dest_table_name_with_schema, len(fake_data_in_df), generation_seconds, column_timings)
+            number_of_rows_left_to_generate -= len(fake_data_in_df)
+
+            start_time = perf_counter()
+            put_until_stopped(batches_queue, fake_data_in_df, stop_event)
+            stage_timings['waiting_for_insertion'] += perf_counter() - start_time
+        put_until_stopped(batches_queue, GENERATION_IS_FINISHED, stop_event)
+    except BaseException as exception:
+        put_until_stopped(batches_queue, exception, stop_event)
+
+
+def execute_pipelined_insertion(conn,
+                                dest_table_name_with_schema,
+                                number_of_rows_to_insert,
+                                columns_info_with_set_generators,
+                                batch_size,
+                                queue_size,
+                                insertion_method=None,
+                                batch_format='pandas',
+                                metrics=None):
+    """
+    Overlaps generation and insertion: a generator thread fills a queue of at most queue_size ready batches
+    while the calling thread inserts them. Time spent by each stage and time each stage waited for the other one
+    are logged at the end, so it can be seen whether the run is generation-bound or insertion-bound.
+    """
+    schema = get_insertion_schema(conn, columns_info_with_set_generators)
+
+    table_start_time = perf_counter()
+    if metrics is not None:
+        metrics.record_table_started(dest_table_name_with_schema, number_of_rows_to_insert)
+    stage_timings = {'generation': 0.0, 'waiting_for_insertion': 0.0, 'insertion': 0.0, 'waiting_for_generation': 0.0}
+    batches_queue = Queue(maxsize=queue_size)
+    stop_event = Event()
+    generator_thread = Thread(target=generate_batches,
+                              args=(batches_queue, stop_event, number_of_rows_to_insert, columns_info_with_set_generators,
+                                    batch_size, stage_timings, batch_format, metrics, dest_table_name_with_schema),
+                              daemon=True)
+    with open_copy_connection(conn, insertion_method) as copy_connection:
+        generator_thread.start()
+        try:
+            number_of_rows_left_to_insert = number_of_rows_to_insert
+            while True:
+                start_time = perf_counter()
+                fake_data_in_df = batches_queue.get()
+                stage_timings['waiting_for_generation'] += perf_counter() - start_time
+                if fake_data_in_df is GENERATION_IS_FINISHED:
+                    break
+                if isinstance(fake_data_in_df, BaseException):
+                    raise fake_data_in_df
+
+                start_time = perf_counter()
+                insert_fake_data(conn, dest_table_name_with_schema, fake_data_in_df, schema, copy_connection)
+                insertion_seconds = perf_counter() - start_time
+                stage_timings['insertion'] += insertion_seconds
+                number_of_rows_left_to_insert -= len(fake_data_in_df)
+                if metrics is not None:
+                    metrics.record_batch_inserted(dest_table_name_with_schema, len(fake_data_in_df), insertion_seconds,
+                                                  batches_queue.qsize())
+                logger.info(f'Insertion of fake data into {dest_table_name_with_schema} was finished.\n'
+                            f'\tNumber of rows left to insert: {number_of_rows_left_to_insert}. '
+                            f'Batches waiting in queue: {batches_queue.qsize()}')
+        finally:
+            stop_event.set()
+            generator_thread.join()
+
+    bound_stage = 'generation' if stage_timings['waiting_for_generation'] > stage_timings['waiting_for_insertion'] else 'insertion'
+    logger.info(f'Pipelined insertion into {dest_table_name_with_schema} was finished ({bound_stage}-bound).\n'
+                f'\tGeneration: {stage_timings["generation"]:.2f}s, waiting for insertion: {stage_timings["waiting_for_insertion"]:.2f}s\n'
+                f'\tInsertion: {stage_timings["insertion"]:.2f}s, waiting for generation: {stage_timings["waiting_for_generation"]:.2f}s')
+    if metrics is not None:
+        metrics.record_table_generated(dest_table_name_with_schema, number_of_rows_to_insert, perf_counter() - table_start_time)
@@ -0,0 +1,134 @@
+import os
+import json
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+
+BINARY_PROFILE_EXTENSION = '.arrow'
+PROFILE_ARRAY_KEYS = ['values', 'probabilities', 'intervals', 'cells', 'fan_out_values', 'fan_out_probabilities']
+PROFILE_ARRAY_TYPES = {'cells': pa.list_(pa.list_(pa.int32()))}
+
+
+def is_binary_profile_path(profile_path):
+    return os.path.splitext(profile_path)[1] == BINARY_PROFILE_EXTENSION
+
+
+def get_binary_profile_path(profile_path):
+    return os.path.splitext(profile_path)[0] + BINARY_PROFILE_EXTENSION
+
+
+def save_binary_profile(rich_columns_info_dict, profile_path):
+    """
+    Saves profile as Arrow IPC file: lists of values, probabilities, intervals and cells are stored as typed arrays
+    (one list field per column and key in a single-row record batch), everything else is stored as json in schema metadata.
+    Lists that can not be stored as one typed array (like values of different types) stay in json.
+    """
+    profile_header = {'columns': {}, 'arrays': {}}
+    fields, profile_arrays = [], []
+    for column_name, column_info_dict in rich_columns_info_dict.items():
+        column_header = {}
+        for key, value in column_info_dict.items():
+            if key in PROFILE_ARRAY_KEYS and value is not None:
+                try:
+                    profile_array = pa.array([value], type=PROFILE_ARRAY_TYPES.get(key))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    column_header[key] = value
+                    continue
+                profile_header['arrays'].setdefault(column_name, {})[key] = len(profile_arrays)
+                fields.append(pa.field(f'{column_name}.{key}', profile_array.type))
+                profile_arrays.append(profile_array)
+            else:
+                column_header[key] = value
+        profile_header['columns'][column_name] = column_header
+    schema = pa.schema(fields, metadata={'profile': json.dumps(profile_header)})
+    temporary_path = f'{profile_path}.{os.getpid()}.tmp'
+    with pa.OSFile(temporary_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        if profile_arrays:
+            writer.write_batch(pa.RecordBatch.from_arrays(profile_arrays, schema=schema))
+    os.replace(temporary_path, profile_path)
+
+
+def is_numeric_without_nulls(profile_array):
+    return (pa.types.is_integer(profile_array.type) or pa.types.is_floating(profile_array.type)) and profile_array.null_count == 0
+
+
+def get_profile_array(profile_list_array):
+    """
+    Returns list of the single row as numpy array for numeric lists without nulls (lists of pairs become 2-d arrays),
+    as pyarrow Array for other lists and as python list for lists of lists of different lengths.
+    Numeric arrays are zero-copy views of memory-mapped file.
+    """
+    profile_array = profile_list_array.flatten()
+    if len(profile_array) == 0:
+        return []
+    if pa.types.is_list(profile_array.type):
+        list_lengths = pc.list_value_length(profile_array)
+        values = profile_array.flatten()
+        if profile_array.null_count == 0 and pc.min(list_lengths) == pc.max(list_lengths) and is_numeric_without_nulls(values):
+            return values.to_numpy().reshape(len(profile_array), list_lengths[0].as_py())
+        return profile_array.to_pylist()
+    if is_numeric_without_nulls(profile_array):
+        return profile_array.to_numpy()
+    return profile_array
+
+
+def get_profile_column_names(column_name_to_column_header, column_names=None):
+    """
+    Returns names of columns to load in the order of profile: all columns or given ones together with all columns of their joint groups.
+    """
+    if column_names is None:
+        return list(column_name_to_column_header)
+    column_names_to_load = set()
+    for column_name in column_names:
+        column_header = column_name_to_column_header.get(column_name)
+        if column_header is None:
+            continue
+        first_joint_column_name = column_header.get('joint_column_name', column_name)
+        column_names_to_load.update(column_name_to_column_header[first_joint_column_name].get('columns', [column_name]))
+        column_names_to_load.add(first_joint_column_name)
+    return [column_name for column_name in column_name_to_column_header if column_name in column_names_to_load]
+
+
+def load_binary_profile(profile_path, column_names=None):
+    """
+    Memory-maps Arrow IPC profile and loads only given columns, arrays of other columns are never read.
+    """
+    reader = pa.ipc.open_file(pa.memory_map(profile_path))
+    profile_header = json.loads(reader.schema.metadata[b'profile'])
+    profile_batch = reader.get_batch(0) if reader.num_record_batches != 0 else None
+    rich_columns_info_dict = {}
+    for column_name in get_profile_column_names(profile_header['columns'], column_names):
+        column_info_dict = dict(profile_header['columns'][column_name])
+        for key, field_index in profile_header['arrays'].get(column_name, {}).items():
+            column_info_dict[key] = get_profile_array(profile_batch.column(field_index))
+        rich_columns_info_dict[column_name] = column_info_dict
+    return rich_columns_info_dict
+
+
+def save_profile(rich_columns_info_dict, profile_path):
+    if is_binary_profile_path(profile_path):
+        save_binary_profile(rich_columns_info_dict, profile_path)
+    else:
+        with open(profile_path, 'w') as file:
+            json.dump(rich_columns_info_dict, file)
+
+
+def load_profile(profile_path, column_names=None):
+    """
+    Loads profile with given columns (all columns if column_names is None). Json profile is converted into binary profile
+    next to it (same name with .arrow extension) on the first load and binary profile is used while it is newer than json.
+    """
+    if not is_binary_profile_path(profile_path):
+        binary_profile_path = get_binary_profile_path(profile_path)
+        if not os.path.exists(binary_profile_path) or os.path.getmtime(binary_profile_path) < os.path.getmtime(profile_path):
+            with open(profile_path, 'r') as file:
+                rich_columns_info_dict = json.load(file)
+            try:
+                save_binary_profile(rich_columns_info_dict, binary_profile_path)
+                logger.info(f'Profile {profile_path} was converted into {binary_profile_path}.')
+            except OSError as error:
+                logger.warning(f'Profile {profile_path} was not converted into {binary_profile_path}: {error}')
+                return {column_name: rich_columns_info_dict[column_name]
+                        for column_name in get_profile_column_names(rich_columns_info_dict, column_names)}
+        profile_path = binary_profile_path
+    return load_binary_profile(profile_path, column_names)
@@ -0,0 +1,109 @@
+import pandas as pd
+from itertools import islice
+from loguru import logger
+from fake_data_generator.connections import is_sqlalchemy_engine
+
+SAMPLING_METHODS = ['system', 'bernoulli']
+SAMPLE_OVERSIZE_FACTOR = 1.2
+
+
+def is_postgresql(conn):
+    return is_sqlalchemy_engine(conn) and conn.name == 'postgresql'
+
+
+def get_string_for_column_names(columns_to_include, conn=None):
+    quote = '"' if is_postgresql(conn) else '`'
+    return ','.join(map(lambda x: quote + x + quote, columns_to_include)) if columns_to_include is not None else '*'
+
+
+def get_estimated_number_of_rows(conn, source_table_name_with_schema):
+    if is_postgresql(conn):
+        estimated_number_of_rows = pd.read_sql_query(
+            f"SELECT reltuples AS cnt FROM pg_class WHERE oid = '{source_table_name_with_schema}'::regclass", conn)['cnt'][0]
+        if estimated_number_of_rows > 0:
+            return estimated_number_of_rows
+        return pd.read_sql_query(f'SELECT COUNT(*) AS cnt FROM {source_table_name_with_schema}', conn)['cnt'][0]
+    else:
+        return conn.table(source_table_name_with_schema).count()
+
+
+def get_sample_percentage(conn, source_table_name_with_schema, number_of_rows_from_which_to_create_pattern):
+    """
+    Returns percentage of table rows to sample so that sample contains at least requested number of rows
+    (with some margin, since both TABLESAMPLE and Spark sample() return approximately requested share of rows).
+    """
+    estimated_number_of_rows = get_estimated_number_of_rows(conn, source_table_name_with_schema)
+    if estimated_number_of_rows == 0:
+        return 100.0
+    return min(100.0, 100.0 * SAMPLE_OVERSIZE_FACTOR * number_of_rows_from_which_to_create_pattern / estimated_number_of_rows)
+
+
+def get_sample_query(conn,
+                     source_table_name_with_schema,
+                     columns_to_include,
+                     number_of_rows_from_which_to_create_pattern,
+                     sampling_method='system',
+                     seed=None):
+    if sampling_method not in SAMPLING_METHODS:
+        raise ValueError(f'Unknown sampling method "{sampling_method}", expected one of {SAMPLING_METHODS}')
+    select_clause = f'SELECT {get_string_for_column_names(columns_to_include, conn)} FROM {source_table_name_with_schema}'
+    if number_of_rows_from_which_to_create_pattern is None:
+        return select_clause
+    if is_postgresql(conn):
+        sample_percentage = get_sample_percentage(conn, source_table_name_with_schema, number_of_rows_from_which_to_create_pattern)
+        if sample_percentage == 100.0:
+            return f'{select_clause} LIMIT {number_of_rows_from_which_to_create_pattern}'
+        repeatable_clause = f' REPEATABLE ({seed})' if seed is not None else ''
+        return f'{select_clause} TABLESAMPLE {sampling_method.upper()} ({sample_percentage}){repeatable_clause} ' \
+               f'LIMIT {number_of_rows_from_which_to_create_pattern}'
+    return f'{select_clause} ORDER BY RANDOM() LIMIT {number_of_rows_from_which_to_create_pattern}'
+
+
+def get_spark_table_sample(conn,
+                           source_table_name_with_schema,
+                           columns_to_include,
+                           number_of_rows_from_which_to_create_pattern,
+                           seed=None):
+    table_data = conn.table(source_table_name_with_schema)
+    if columns_to_include is not None:
+        table_data = table_data.select(*columns_to_include)
+    if number_of_rows_from_which_to_create_pattern is not None:
+        sample_percentage = get_sample_percentage(conn, source_table_name_with_schema, number_of_rows_from_which_to_create_pattern)
+        if sample_percentage < 100.0:
+            table_data = table_data.sample(withReplacement=False, fraction=sample_percentage / 100, seed=seed)
+        table_data = table_data.limit(number_of_rows_from_which_to_create_pattern)
+    return table_data
+
+
+def get_table_data_chunks(conn,
+                          source_table_name_with_schema,
+                          columns_to_include,
+                          number_of_rows_from_which_to_create_pattern,
+                          chunk_size=100000,
+                          sampling_method='system',
+                          seed=None):
+    """
+    Yields sample of table rows as pandas DataFrames of at most chunk_size rows.
+
+    SQLAlchemy engines read query result with server-side cursor, postgresql tables are sampled with
+    TABLESAMPLE SYSTEM/BERNOULLI instead of full sort by RANDOM(). Spark tables are sampled with DataFrame.sample()
+    and read with toLocalIterator(), so neither the driver nor the client ever holds more than one chunk.
+    If seed is given, the same rows are sampled on every run (TABLESAMPLE ... REPEATABLE and seeded sample()).
+    """
+    if is_sqlalchemy_engine(conn):
+        from sqlalchemy import text
+        sample_query = get_sample_query(conn, source_table_name_with_schema, columns_to_include,
+                                        number_of_rows_from_which_to_create_pattern, sampling_method, seed)
+        logger.info(f'Sample query: {sample_query}')
+        with conn.connect().execution_options(stream_results=True) as connection:
+            for table_data_chunk_df in pd.read_sql_query(text(sample_query), connection, chunksize=chunk_size):
+                yield table_data_chunk_df
+    else:
+        table_data = get_spark_table_sample(conn, source_table_name_with_schema, columns_to_include,
+                                            number_of_rows_from_which_to_create_pattern, seed)
+        rows = table_data.toLocalIterator()
+        while True:
+            chunk_rows = list(islice(rows, chunk_size))
+            if not chunk_rows:
+                break
+            yield pd.DataFrame.from_records(chunk_rows, columns=table_data.columns)
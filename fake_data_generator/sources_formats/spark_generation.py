@@ -0,0 +1,91 @@
+from time import perf_counter
+from loguru import logger
+from fake_data_generator.connections import is_sqlalchemy_engine
+from fake_data_generator.columns_generator import get_columns_info_with_set_generators, get_fake_data_for_insertion, Column
+from fake_data_generator.columns_generator.random_states import RandomState
+from fake_data_generator.columns_generator.generators import \
+    get_generator_for_incremental_id_column, get_start_id_for_incremental_id_column
+from fake_data_generator.columns_generator.foreign_keys import load_foreign_keys
+from fake_data_generator.sources_formats.helper_functions import get_spark_schema
+
+
+def get_foreign_keys_for_executors(conn, rich_columns_info_dict, random_state):
+    """
+    Loads keys of parents of foreign key columns on the driver (reservoir sample of max_number_of_keys keys if it is given),
+    since executors have no Spark session to query parent tables.
+    """
+    provided_foreign_keys = {}
+    for column_name, column_info_dict in rich_columns_info_dict.items():
+        if column_info_dict.get('type') == 'FOREIGN_KEY':
+            parent_key = (column_info_dict.get('foreign_key_table_name'), column_info_dict.get('foreign_key_column_name'))
+            provided_foreign_keys[parent_key] = load_foreign_keys(conn, *parent_key,
+                                                                  random_state.get_column_random_state(column_name).get_column_generator(),
+                                                                  column_info_dict.get('max_number_of_keys'),
+                                                                  column_info_dict.get('keys_cache_path'))
+    return provided_foreign_keys
+
+
+def get_partitions_generator(rich_columns_info_broadcast, foreign_keys_broadcast, entropy, incremental_id_start_ids, batch_size):
+    def generate_partition(ids_dfs):
+        random_state = RandomState(entropy)
+        columns_info_with_set_generators = get_columns_info_with_set_generators(rich_columns_info_broadcast.value,
+                                                                               random_state=random_state,
+                                                                               provided_foreign_keys=foreign_keys_broadcast.value)
+        for ids_df in ids_dfs:
+            for batch_offset in range(0, ids_df.shape[0], batch_size):
+                rows_offset = int(ids_df['id'].iloc[batch_offset])
+                random_state.set_batch_index(rows_offset)
+                for column_info in filter(lambda column_info: isinstance(column_info, Column), columns_info_with_set_generators):
+                    start_id = incremental_id_start_ids.get(column_info.get_column_name())
+                    if start_id is not None:
+                        column_info.set_generator(get_generator_for_incremental_id_column(start_id=start_id + rows_offset))
+                yield get_fake_data_for_insertion(output_size=min(batch_size, ids_df.shape[0] - batch_offset),
+                                                  columns_info_with_set_generator=columns_info_with_set_generators)
+    return generate_partition
+
+
+def execute_spark_insertion(conn,
+                            dest_table_name_with_schema,
+                            number_of_rows_to_insert,
+                            rich_columns_info_dict,
+                            columns_with_generators_as_parameter,
+                            batch_size,
+                            number_of_partitions,
+                            seed=None,
+                            metrics=None):
+    """
+    Generates rows inside executors: spark.range(n) is split into number_of_partitions partitions,
+    every partition builds generators from broadcast profile dict and turns its range of ids into pandas batches
+    with mapInPandas. Generators of a batch are derived from seed and id of its first row,
+    so the result does not depend on how Spark schedules partitions. The table is written with a single saveAsTable,
+    so the driver never holds generated data. Keys of parents of foreign key columns are loaded on the driver and broadcast. Only the time of the whole table is reported to metrics.
+    """
+    if is_sqlalchemy_engine(conn):
+        raise ValueError('Generation inside Spark executors is supported only for Spark sessions')
+    if columns_with_generators_as_parameter:
+        raise ValueError('Columns with generators passed as parameter can not be generated inside Spark executors')
+    rich_columns_info_dict = {column_name: column_info_dict for column_name, column_info_dict in rich_columns_info_dict.items()
+                              if column_info_dict.get('type') != 'CUSTOM_COLUMN'}
+    incremental_id_start_ids = {column_name: get_start_id_for_incremental_id_column(conn, dest_table_name_with_schema, column_name)
+                                for column_name, column_info_dict in rich_columns_info_dict.items()
+                                if column_info_dict.get('type') == 'INCREMENTAL_ID'}
+    schema = get_spark_schema([Column(column_name=column_name, data_type=column_info_dict.get('data_type'))
+                               for column_name, column_info_dict in rich_columns_info_dict.items()])
+    rich_columns_info_broadcast = conn.sparkContext.broadcast(rich_columns_info_dict)
+    foreign_keys_broadcast = conn.sparkContext.broadcast(get_foreign_keys_for_executors(conn, rich_columns_info_dict, RandomState(seed)))
+    generate_partition = get_partitions_generator(rich_columns_info_broadcast, foreign_keys_broadcast, RandomState(seed).entropy,
+                                                  incremental_id_start_ids, batch_size)
+
+    table_start_time = perf_counter()
+    if metrics is not None:
+        metrics.record_table_started(dest_table_name_with_schema, number_of_rows_to_insert)
+    logger.info(f'Start generating {number_of_rows_to_insert} rows into {dest_table_name_with_schema} table '
+                f'in {number_of_partitions} Spark partitions.')
+    conn.range(0, number_of_rows_to_insert, numPartitions=number_of_partitions) \
+        .mapInPandas(generate_partition, schema=schema) \
+        .write.format('hive').mode('append').saveAsTable(dest_table_name_with_schema)
+    rich_columns_info_broadcast.unpersist()
+    foreign_keys_broadcast.unpersist()
+    logger.info(f'Insertion of fake data into {dest_table_name_with_schema} was finished.')
+    if metrics is not None:
+        metrics.record_table_generated(dest_table_name_with_schema, number_of_rows_to_insert, perf_counter() - table_start_time)
@@ -0,0 +1,159 @@
+import math
+from loguru import logger
+from numpy import zeros
+from pandas import Series, Index
+from pyspark.sql import functions as F
+from fake_data_generator.columns_generator.accumulators import get_bin_width_exponent
+from fake_data_generator.columns_generator.generators import UNIX_EPOCH_ORDINAL
+from fake_data_generator.columns_generator.info_for_columns import REGEXES_FOR_STRING_CLASSES, get_anchored_regex
+from fake_data_generator.sources_formats.sampling import get_spark_table_sample
+
+SPARK_CHAR_CLASSES = [('0', '9', '0-9'), ('A', 'Z', 'A-Z'), ('a', 'z', 'a-z'), ('А', 'Я', 'А-Я'), ('а', 'я', 'а-я')]
+
+
+def get_spark_float_column(column, input_data_type):
+    if input_data_type == 'date':
+        return F.datediff(column, F.lit('1970-01-01').cast('date')) + UNIX_EPOCH_ORDINAL
+    return column.cast('double')
+
+
+def get_spark_char_class(char):
+    char_class = None
+    for first_char, last_char, class_name in SPARK_CHAR_CLASSES:
+        condition = char.between(first_char, last_char)
+        char_class = F.when(condition, class_name) if char_class is None else char_class.when(condition, class_name)
+    return char_class.otherwise(char)
+
+
+def get_spark_string_class_index(column):
+    string_class_index = None
+    for index, regex in enumerate(REGEXES_FOR_STRING_CLASSES):
+        condition = column.rlike(get_anchored_regex(regex))
+        string_class_index = F.when(condition, index) if string_class_index is None else string_class_index.when(condition, index)
+    return string_class_index
+
+
+def get_summary_aggregations(column_name_to_accumulator):
+    aggregations = [F.count(F.lit(1)).alias('number_of_rows')]
+    for index, (column_name, column_accumulator) in enumerate(column_name_to_accumulator.items()):
+        column = F.col(f'`{column_name}`')
+        aggregations.append(F.count(column).alias(f'{index}_count'))
+        aggregations.append(F.approx_count_distinct(column).alias(f'{index}_approx_count_distinct'))
+        if column_accumulator.continuous is not None:
+            float_column = get_spark_float_column(column, column_accumulator.input_data_type)
+            aggregations.append(F.min(float_column).alias(f'{index}_min'))
+            aggregations.append(F.max(float_column).alias(f'{index}_max'))
+        if column_accumulator.string is not None:
+            string_class_index = get_spark_string_class_index(column)
+            for string_class_index_value in range(len(REGEXES_FOR_STRING_CLASSES)):
+                aggregations.append(F.count(F.when(string_class_index == string_class_index_value, 1))
+                                    .alias(f'{index}_string_class_{string_class_index_value}'))
+    return aggregations
+
+
+def add_spark_value_counts(table_data, column_name, column_accumulator, number_of_values, number_of_nulls, approx_count_distinct):
+    categorical_accumulator = column_accumulator.categorical
+    if categorical_accumulator.stop_on_overflow and approx_count_distinct > categorical_accumulator.max_number_of_values:
+        categorical_accumulator.add_value_counts(Series(dtype=float), number_of_values, number_of_nulls, is_overflowed=True,
+                                                 number_of_unique_values=approx_count_distinct)
+        return
+    column = F.col(f'`{column_name}`')
+    value_counts_rows = table_data.where(column.isNotNull()).groupBy(column.alias('value')).count() \
+        .orderBy(F.desc('count')).limit(categorical_accumulator.max_number_of_values + 1).collect()
+    is_overflowed = len(value_counts_rows) > categorical_accumulator.max_number_of_values
+    value_counts_rows = value_counts_rows[:categorical_accumulator.max_number_of_values]
+    value_counts = Series([float(row['count']) for row in value_counts_rows],
+                          index=Index([row['value'] for row in value_counts_rows], dtype=object))
+    categorical_accumulator.add_value_counts(value_counts, number_of_values, number_of_nulls, is_overflowed,
+                                             number_of_unique_values=approx_count_distinct)
+
+
+def add_spark_histogram(table_data, column_name, column_accumulator, min_value, max_value):
+    continuous_accumulator = column_accumulator.continuous
+    bin_width_exponent = get_bin_width_exponent(min_value, max_value, continuous_accumulator.number_of_bins)
+    float_column = get_spark_float_column(F.col(f'`{column_name}`'), column_accumulator.input_data_type)
+    bins_rows = table_data.select(F.floor(float_column / 2.0 ** bin_width_exponent).alias('bin')) \
+        .where(F.col('bin').isNotNull()).groupBy('bin').count().collect()
+    first_bin_index = min(row['bin'] for row in bins_rows)
+    bin_counts = zeros(max(row['bin'] for row in bins_rows) - first_bin_index + 1)
+    for row in bins_rows:
+        bin_counts[row['bin'] - first_bin_index] = row['count']
+    continuous_accumulator.add_histogram(bin_width_exponent, first_bin_index, bin_counts, min_value, max_value)
+
+
+def add_spark_common_pattern(table_data, column_name, column_accumulator):
+    chars = table_data.select(F.posexplode(F.split(F.col(f'`{column_name}`'), '')).alias('position', 'char')) \
+        .where(F.col('char') != '')
+    char_classes_rows = chars.select('position', get_spark_char_class(F.col('char')).alias('char_class')).distinct().collect()
+    common_pattern = {}
+    for row in sorted(char_classes_rows, key=lambda row: (row['position'], row['char_class'])):
+        common_pattern.setdefault(row['position'], []).append(row['char_class'])
+    column_accumulator.string.common_pattern = common_pattern
+
+
+def add_spark_joint_counts(table_data, joint_accumulator, column_name_to_accumulator):
+    """
+    Counts combinations of values of group of columns with one groupBy. Numeric columns with more distinct values than
+    number of joint bins are replaced with bin indices, bin widths are chosen by min/max already collected for the columns.
+    """
+    keys, bin_width_exponents, min_values, max_values = [], [], [], []
+    for index, (column_name, input_data_type) in enumerate(zip(joint_accumulator.column_names, joint_accumulator.input_data_types)):
+        column_accumulator = column_name_to_accumulator[column_name]
+        key = F.col(f'`{column_name}`')
+        bin_width_exponent, min_value, max_value = None, math.inf, -math.inf
+        if input_data_type is not None:
+            key = get_spark_float_column(key, input_data_type)
+            if column_accumulator.continuous.number_of_values != 0:
+                min_value, max_value = column_accumulator.continuous.min_value, column_accumulator.continuous.max_value
+                if column_accumulator.get_number_of_unique_values() > joint_accumulator.number_of_bins:
+                    bin_width_exponent = get_bin_width_exponent(min_value, max_value, joint_accumulator.number_of_bins)
+                    key = F.floor(key / 2.0 ** bin_width_exponent).cast('double')
+        keys.append(key.alias(f'key_{index}'))
+        bin_width_exponents.append(bin_width_exponent)
+        min_values.append(min_value)
+        max_values.append(max_value)
+    cell_counts = table_data.groupBy(*keys).count().toPandas()
+    cell_counts.columns = list(range(len(keys))) + ['count']
+    joint_accumulator.add_cell_counts(cell_counts.astype({'count': float}), bin_width_exponents, min_values, max_values)
+
+
+def update_accumulators_with_spark_aggregations(conn,
+                                                source_table_name_with_schema,
+                                                columns_to_include,
+                                                number_of_rows_from_which_to_create_pattern,
+                                                column_name_to_accumulator,
+                                                seed=None,
+                                                joint_accumulators=None):
+    """
+    Fills column accumulators with Spark aggregations computed on executors: null counts and approximate distinct counts,
+    value frequencies of categorical candidates, min/max and histogram bins of continuous columns,
+    per-position character classes and FIO/email matchings of string columns, counts of combinations for joint accumulators.
+    Only aggregated results are collected to the driver. Returns the number of sampled rows.
+    """
+    table_data = get_spark_table_sample(conn, source_table_name_with_schema, columns_to_include,
+                                        number_of_rows_from_which_to_create_pattern, seed).cache()
+    try:
+        summary = table_data.agg(*get_summary_aggregations(column_name_to_accumulator)).collect()[0]
+        number_of_rows = summary['number_of_rows']
+        logger.info(f'Sample of table {source_table_name_with_schema} was aggregated. Number of sampled rows is {number_of_rows}.')
+        if number_of_rows == 0:
+            return 0
+        for index, (column_name, column_accumulator) in enumerate(column_name_to_accumulator.items()):
+            number_of_values = summary[f'{index}_count']
+            add_spark_value_counts(table_data, column_name, column_accumulator, number_of_values, number_of_rows - number_of_values,
+                                   summary[f'{index}_approx_count_distinct'])
+            if column_accumulator.continuous is not None and number_of_values != 0:
+                add_spark_histogram(table_data, column_name, column_accumulator, summary[f'{index}_min'], summary[f'{index}_max'])
+            if column_accumulator.string is not None:
+                add_spark_common_pattern(table_data, column_name, column_accumulator)
+                column_accumulator.string.add_string_class_matchings(
+                    [summary[f'{index}_string_class_{string_class_index_value}']
+                     for string_class_index_value in range(len(REGEXES_FOR_STRING_CLASSES))],
+                    number_of_values)
+            logger.info(f'Column "{column_name}" was aggregated.')
+        for joint_accumulator in joint_accumulators or []:
+            add_spark_joint_counts(table_data, joint_accumulator, column_name_to_accumulator)
+            logger.info(f'Columns "{", ".join(joint_accumulator.column_names)}" were aggregated together.')
+        return number_of_rows
+    finally:
+        table_data.unpersist()
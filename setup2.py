@@ -13,7 +13,11 @@ setup(
         "pyspark==3.3.0",
         "sqlalchemy==1.4.15",
         "Faker==19.6.1",
+        "pyarrow==6.0.1",
     ],
+    entry_points={
+        'console_scripts': ['fake_data_generator=fake_data_generator.cli:main'],
+    },
     author='Alexander Maksimovich',
     python_requires="==3.6.5",
     author_email='cahr2001@mail.com',